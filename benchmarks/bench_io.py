@@ -0,0 +1,129 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Benchmark the page cache impact of each file reader.
+
+The test file is dropped from the page cache before each run, the growth
+of the kernel's `Cached` memory while hashing shows how much of the
+cache the reader filled, and so how much data of other programs it could
+have evicted.  Each reader is then run again with the whole file already
+cached, as it would be while a torrent client seeds it, and the share of
+the file still cached afterwards shows whether the reader evicted pages
+it didn't bring in.  Linux only, the file should be on a disk backed file
+system rather than tmpfs.
+
+Usage: python benchmarks/bench_io.py [--size MiB] [--dir PATH]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from torrentfileQt.hasher import hash_v1_task
+from torrentfileQt.reader import READERS, advise, resident_pages
+
+PIECE_LENGTH = 2**20
+
+
+def cached_kib() -> int:
+    """Return the size of the page cache in KiB."""
+    with open("/proc/meminfo", "rt", encoding="utf8") as meminfo:
+        for line in meminfo:
+            if line.startswith("Cached:"):
+                return int(line.split()[1])
+    return 0  # pragma: nocover
+
+
+def drop_cache(path: str):
+    """Remove the clean pages of the file from the page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        advise(fd, 0, 0, "POSIX_FADV_DONTNEED")
+    finally:
+        os.close(fd)
+
+
+def fill_cache(path: str):
+    """Read the whole file into the page cache."""
+    with open(path, "rb") as tfile:
+        while tfile.read(2**20):
+            pass
+
+
+def cached_share(path: str) -> float:
+    """Return the fraction of the file's pages in the page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        pages = resident_pages(fd, 0, os.path.getsize(path))
+    finally:
+        os.close(fd)
+    return sum(pages) / len(pages) if pages else 0.0
+
+
+def measure_cached(path: str, mode: str) -> float:
+    """Return the share of a cached file still cached after hashing it."""
+    fill_cache(path)
+    spans = [(path, 0, os.path.getsize(path))]
+    hash_v1_task((spans, PIECE_LENGTH, mode, 0))
+    return cached_share(path)
+
+
+def measure(path: str, mode: str) -> tuple:
+    """Return elapsed seconds, page cache growth and the result."""
+    drop_cache(path)
+    before = cached_kib()
+    start = time.perf_counter()
+    spans = [(path, 0, os.path.getsize(path))]
+    result = hash_v1_task((spans, PIECE_LENGTH, mode, 0))
+    elapsed = time.perf_counter() - start
+    return elapsed, cached_kib() - before, result
+
+
+def main():
+    """Run the benchmark and print a table of results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=512, help="MiB")
+    parser.add_argument("--dir", default=None, help="test file location")
+    args = parser.parse_args()
+    fd, path = tempfile.mkstemp(dir=args.dir)
+    with os.fdopen(fd, "wb") as tfile:
+        for _ in range(args.size):
+            tfile.write(os.urandom(2**20))
+        tfile.flush()
+        os.fsync(tfile.fileno())
+    print(
+        f"{'reader':<18}{'MiB/s':>10}{'cache growth MiB':>20}"
+        f"{'pre-cached kept %':>20}"
+    )
+    expected = None
+    try:
+        for mode, name in READERS.items():
+            elapsed, growth, result = measure(path, mode)
+            expected = expected or result
+            assert result == expected  # nosec
+            rate, growth = args.size / elapsed, growth / 1024
+            kept = measure_cached(path, mode) * 100
+            print(f"{name:<18}{rate:>10.1f}{growth:>20.1f}{kept:>20.1f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
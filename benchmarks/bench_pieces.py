@@ -0,0 +1,105 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Benchmark the memory used to collect the piece hashes of a torrent.
+
+Digests arrive in task sized batches, the same as from the worker
+processes of the `HashEngine`, and are collected as a list of digest
+objects joined at the end, by extending a bytearray that is copied to
+bytes at the end, and in a preallocated `PieceStore`.
+
+Usage: python benchmarks/bench_pieces.py [--pieces N] [--task-pieces N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from hashlib import sha1
+
+from torrentfileQt.hasher import SHA1_SIZE, PieceStore
+
+
+def batches(pieces: int, task_pieces: int):
+    """Yield the concatenated digests of each task."""
+    digest = sha1(b"piece").digest()  # nosec
+    for start in range(0, pieces, task_pieces):
+        yield digest * min(task_pieces, pieces - start)
+
+
+def collect_objects(pieces: int, task_pieces: int) -> bytes:
+    """Keep every digest as it's own bytes object and join them."""
+    digests = []
+    for batch in batches(pieces, task_pieces):
+        for pos in range(0, len(batch), SHA1_SIZE):
+            digests.append(batch[pos : pos + SHA1_SIZE])
+    return b"".join(digests)
+
+
+def collect_extend(pieces: int, task_pieces: int) -> bytes:
+    """Extend a growing bytearray and copy it to bytes."""
+    collected = bytearray()
+    for batch in batches(pieces, task_pieces):
+        collected.extend(batch)
+    return bytes(collected)
+
+
+def collect_store(pieces: int, task_pieces: int) -> bytearray:
+    """Write each batch in place by piece index."""
+    store = PieceStore(pieces)
+    for index, batch in enumerate(batches(pieces, task_pieces)):
+        store.put(index * task_pieces, batch)
+    return store.data
+
+
+def measure(func, pieces: int, task_pieces: int) -> tuple:
+    """Return elapsed seconds, peak traced memory and the result."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(pieces, task_pieces)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    """Run the benchmark and print a table of results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pieces", type=int, default=2**20)
+    parser.add_argument("--task-pieces", type=int, default=64)
+    args = parser.parse_args()
+    runners = [
+        ("objects", collect_objects),
+        ("extend", collect_extend),
+        ("store", collect_store),
+    ]
+    print(f"{'storage':<10}{'seconds':>10}{'peak MiB':>12}{'bytes/piece':>14}")
+    expected = None
+    for name, func in runners:
+        elapsed, peak, result = measure(func, args.pieces, args.task_pieces)
+        expected = expected or bytes(result)
+        assert result == expected  # nosec
+        mib, per_piece = peak / 2**20, peak / args.pieces
+        print(f"{name:<10}{elapsed:>10.3f}{mib:>12.1f}{per_piece:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Benchmark the file readers used for piece hashing.
+
+Compares the torrentfile `Hasher`, which allocates a new buffer for
+every piece, with the buffered reader (one preallocated buffer, one copy
+into user space) and the memory mapped reader (no user space copies).
+
+Usage: python benchmarks/bench_reader.py [--size MiB] [--piece-length KiB]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from torrentfile.hasher import Hasher
+
+from torrentfileQt.hasher import hash_v1_task
+from torrentfileQt.reader import BUFFERED, MMAP
+
+COPIES = {"torrentfile": "1 + partial pieces", BUFFERED: "1", MMAP: "0"}
+
+
+def run_torrentfile(path: str, piece_length: int) -> bytes:
+    """Hash the file with the torrentfile v1 hasher."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return b"".join(Hasher([path], piece_length, progress=1))
+
+
+def run_reader(mode: str):
+    """Return a function hashing the file with the given reader mode."""
+
+    def run(path: str, piece_length: int) -> bytes:
+        spans = [(path, 0, os.path.getsize(path))]
+        return hash_v1_task((spans, piece_length, mode, 0))
+
+    return run
+
+
+def measure(func, path: str, piece_length: int) -> tuple:
+    """Return elapsed seconds, peak traced memory and the result."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(path, piece_length)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    """Run the benchmark and print a table of results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=256, help="MiB")
+    parser.add_argument("--piece-length", type=int, default=1024, help="KiB")
+    args = parser.parse_args()
+    piece_length = args.piece_length * 1024
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as tfile:
+        for _ in range(args.size):
+            tfile.write(os.urandom(2**20))
+    runners = [
+        ("torrentfile", run_torrentfile),
+        (BUFFERED, run_reader(BUFFERED)),
+        (MMAP, run_reader(MMAP)),
+    ]
+    print(f"{'reader':<12}{'MiB/s':>10}{'peak KiB':>12}  copies/byte")
+    expected = None
+    try:
+        for name, func in runners:
+            elapsed, peak, result = measure(func, path, piece_length)
+            expected = expected or result
+            assert result == expected  # nosec
+            rate = args.size / elapsed
+            print(
+                f"{name:<12}{rate:>10.1f}{peak / 1024:>12.1f}  {COPIES[name]}"
+            )
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
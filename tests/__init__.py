@@ -27,6 +27,8 @@ import string
 import time
 from tempfile import mkdtemp, mkstemp
 
+import pyben
+import PySide6
 import pytest
 from torrentfile.torrent import TorrentFile, TorrentFileHybrid, TorrentFileV2
 
@@ -34,6 +36,14 @@ from torrentfileQt import Application
 
 APP = Application.start()
 
+# PySide6 6.12.0 loses a reference to True each time a signal is emitted
+# from Python, so tests emitting hundreds of signals abort the interpreter
+# at exit.
+signal_heavy = pytest.mark.skipif(
+    PySide6.__version__ == "6.12.0",
+    reason="PySide6 6.12.0 loses a reference to True on every emit",
+)
+
 
 class TempFileDirs:
     """Class for temporary files."""
@@ -68,12 +78,13 @@ def switchTab(stack, widget=None, index=None):
 
 
 def waitfor(timeout: int, func, *args, **kwargs):
-    """Wait for result to appear."""
+    """Wait for result to appear, processing events every 10ms."""
     then = time.time()
     while time.time() - then < timeout:
         if func(*args, **kwargs):
             return True
         APP.processEvents()  # pragma: nocover
+        time.sleep(0.01)  # pragma: nocover
     return False  # pragma: nocover
 
 
@@ -124,6 +135,36 @@ def temp_file(size, suffix=None, dir=None):
     return path
 
 
+def sparse_file(size: int, data: dict, dir=None):
+    """Create a sparse temporary file.
+
+    Parameters
+    ----------
+    size : int
+        size of the file.
+    data : dict
+        number of random bytes written at each offset, the rest of the
+        file is left as holes.
+    dir : str, optional
+        location of the temp file
+
+    Returns
+    -------
+    str
+        absolute path to file.
+    """
+    if not dir:
+        dir = TempFileDirs.tempdir
+    fd, path = mkstemp(suffix=".img", dir=dir)
+    with os.fdopen(fd, "bw") as fp:
+        fp.truncate(size)
+        for offset, length in data.items():
+            fp.seek(offset)
+            fp.write(os.urandom(length))
+    TempFileDirs.paths.add(path)
+    return path
+
+
 def tempdir(files: int, subdirs: int, size: int, suffixes=None):
     """Create temporary directory.
 
@@ -162,6 +203,13 @@ def tempdir(files: int, subdirs: int, size: int, suffixes=None):
     return parent
 
 
+def encode(creator, **kwargs):
+    """Return the encoded meta data without the creation date."""
+    meta = creator(**{"workers": 1, **kwargs}).sort_meta()
+    meta["creation date"] = 0
+    return pyben.dumps(meta)
+
+
 @atexit.register
 def teardown():  # pragma: nocover
     """Remove all temporary directories and files."""
@@ -169,20 +217,6 @@ def teardown():  # pragma: nocover
     TempFileDirs.cleanup()
 
 
-@pytest.fixture(scope="package")
-def wind():
-    """
-    Create a window and application for testing.
-
-    Returns
-    -------
-    `tuple`
-        information to pass to test function.
-    """
-    window = APP.window
-    return window
-
-
 class MockEvent:
     """Imitate functionality of a QtEvent."""
 
@@ -0,0 +1,67 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Fixtures shared by every test module."""
+
+import pytest
+
+from tests import APP
+from torrentfileQt import hasher, pipeline, reader
+
+
+@pytest.fixture(autouse=True)
+def config_home(tmp_path, monkeypatch):
+    """Keep the caches and logs written by tests out of the user's config."""
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope="package")
+def wind():
+    """
+    Create a window and application for testing.
+
+    Returns
+    -------
+    `tuple`
+        information to pass to test function.
+    """
+    window = APP.window
+    return window
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Record the number of bytes read by the hashing engine."""
+    read = []
+
+    def read_spans(spans, mode, depth, stats):
+        for chunk in pipeline.read_spans(spans, mode, depth, stats):
+            if not reader.is_zeros(chunk):
+                read.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(hasher, "read_spans", read_spans)
+    return read
+
+
+@pytest.fixture
+def small_tasks(monkeypatch):
+    """Split content into many small hashing tasks."""
+    monkeypatch.setattr(hasher, "TASK_SIZE", 2**15)
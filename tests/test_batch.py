@@ -0,0 +1,219 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing headless batch creation."""
+
+import io
+import json
+import os
+
+import pytest
+
+from tests import temp_file, tempdir
+from torrentfileQt import batch, throughput
+from torrentfileQt.torrent import TorrentFileHybrid, TorrentFileV2
+
+
+@pytest.fixture
+def tdir():
+    """Test fixture with a fresh directory of files."""
+    return tempdir(3, 1, 2**15, [".r00", ".mp3"])
+
+
+def test_batch_build_args():
+    """Test create tab options are converted to creator arguments."""
+    args, creator = batch.build_args(
+        {
+            "path": "path",
+            "version": "v2",
+            "private": True,
+            "source": "src",
+            "comment": "",
+            "announce": "url1\n url2 \n",
+            "url_list": ["url3"],
+            "piece_length": 2**16,
+            "workers": 2,
+            "cache": False,
+            "reader": "nocache",
+            "queue_depth": 2,
+        }
+    )
+    assert creator is TorrentFileV2
+    assert args == {
+        "path": "path",
+        "private": 1,
+        "source": "src",
+        "announce": ["url1", "url2"],
+        "url_list": ["url3"],
+        "piece_length": 2**16,
+        "workers": 2,
+        "cache": False,
+        "reader": "nocache",
+        "queue_depth": 2,
+    }
+
+
+def test_batch_build_args_version():
+    """Test an unknown version is rejected."""
+    with pytest.raises(ValueError):
+        batch.build_args({"version": "v3"})
+
+
+def test_batch_build_args_reader():
+    """Test the reader defaults to mmap and unknown readers are rejected."""
+    args, _ = batch.build_args({"path": "path"})
+    assert args["reader"] == "mmap"
+    with pytest.raises(ValueError):
+        batch.build_args({"reader": "raw"})
+
+
+def test_batch_run(tdir):
+    """Test each job is reported as a line of JSON."""
+    jobs = [
+        {"path": tdir, "outfile": tdir + ".v1.torrent", "cache": False},
+        {"path": tdir, "outfile": tdir + ".v2.torrent", "version": "v2"},
+        {"path": os.path.join(tdir, "missing")},
+    ]
+    out = io.StringIO()
+    summary = batch.run_batch(jobs, concurrency=2, out=out)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [i.get("status") for i in lines[:3]] == [
+        "completed",
+        "completed",
+        "failed",
+    ]
+    assert lines[-1] == {"summary": summary}
+    assert summary["jobs"] == 3 and summary["failed"] == 1
+    assert lines[0]["bytes"] == lines[1]["bytes"] == summary["bytes"] // 2
+    for line in lines[:2]:
+        assert os.path.exists(line["outfile"])
+        assert line["files"] == 3
+        assert line["seconds"] >= line["hash_seconds"]
+        assert 0 <= line["queue_occupancy"] <= 1
+
+
+def test_batch_estimate(tdir, monkeypatch):
+    """Test the duration is predicted from the recorded throughput."""
+    path = os.path.join(os.path.dirname(tdir), "throughput.json")
+    log = throughput.ThroughputLog(path)
+    monkeypatch.setattr(batch, "ThroughputLog", lambda: log)
+    monkeypatch.setattr(throughput, "MIN_BYTES", 0)
+    job = {"path": tdir, "outfile": tdir + ".torrent", "cache": False}
+    first = batch.run_job(job)
+    assert first["estimated_seconds"] is None
+    assert log.rate(tdir) == pytest.approx(first["throughput"], abs=1)
+    expected = round(log.estimate(tdir, first["bytes"]), 3)
+    assert batch.run_job(job)["estimated_seconds"] == expected
+    os.remove(path)
+
+
+def test_batch_record_read(tdir, monkeypatch):
+    """Test only the bytes read from disk are recorded as throughput."""
+    path = os.path.join(os.path.dirname(tdir), "throughput.json")
+    log = throughput.ThroughputLog(path)
+    monkeypatch.setattr(batch, "ThroughputLog", lambda: log)
+    monkeypatch.setattr(throughput, "MIN_BYTES", 1)
+    job = {"path": tdir, "outfile": tdir + ".torrent", "cache": True}
+    first = batch.run_job(job)
+    assert first["read_bytes"] == first["bytes"]
+    rate = log.rate(tdir)
+    second = batch.run_job(job)
+    assert second["read_bytes"] == second["throughput"] == 0
+    assert log.rate(tdir) == rate
+    os.remove(path)
+
+
+def test_batch_all_formats(tdir):
+    """Test the all version writes a torrent file of each format."""
+    outfile = tdir + ".torrent"
+    result = batch.run_job({"path": tdir, "outfile": outfile, "version": "all"})
+    assert result["status"] == "completed"
+    assert result["outfile"] == [
+        tdir + f".{version}.torrent" for version in ["v1", "v2", "hybrid"]
+    ]
+    for path in result["outfile"]:
+        assert os.path.exists(path)
+    assert not os.path.exists(outfile)
+
+
+def test_batch_split_jobs(tdir):
+    """Test split jobs are replaced by a job for each entry."""
+    files = sorted(temp_file(10, suffix=".txt", dir=tdir) for _ in range(2))
+    subdirs = [i.path for i in os.scandir(tdir) if i.is_dir()]
+    jobs = batch.split_jobs(
+        [
+            {"path": tdir, "split": True, "version": "v2"},
+            {"path": tdir, "split": "*.txt"},
+            {"path": tdir},
+        ]
+    )
+    assert [job["path"] for job in jobs] == subdirs + files + [tdir]
+    for job in jobs[:-1]:
+        assert "split" not in job
+        assert job["outfile"] == job["path"] + ".torrent"
+    assert jobs[0]["version"] == "v2"
+    with pytest.raises(NotADirectoryError):
+        batch.split_paths(files[0], "*.txt")
+
+
+def test_batch_share_workers():
+    """Test the worker budget is divided between concurrent jobs."""
+    assert batch.share_workers(8, 3) == 2
+    assert batch.share_workers(2, 4) == 1
+    assert batch.share_workers(4, 0) == 4
+
+
+def test_batch_main(tdir, capsys):
+    """Test the command line reads defaults and jobs from a file."""
+    path = os.path.join(tdir, "jobs.json")
+    outfile = tdir + ".hybrid.torrent"
+    with open(path, "wt", encoding="utf8") as fd:
+        json.dump(
+            {
+                "defaults": {"version": "hybrid", "workers": 1},
+                "jobs": [{"path": tdir, "outfile": outfile}],
+            },
+            fd,
+        )
+    jobs = batch.load_jobs(path)
+    assert jobs[0]["version"] == "hybrid"
+    assert batch.CREATORS[jobs[0]["version"]] is TorrentFileHybrid
+    assert batch.main(["--batch", path, "--progress"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert json.loads(lines[0])["outfile"] == outfile
+    assert os.path.exists(outfile)
+
+
+def test_batch_requested():
+    """Test batch mode is selected with or without an equals sign."""
+    assert batch.batch_requested(["--batch", "jobs.json"])
+    assert batch.batch_requested(["--batch=jobs.json", "--concurrency=2"])
+    assert not batch.batch_requested([])
+    assert not batch.batch_requested(["-style", "fusion"])
+
+
+def test_batch_progress():
+    """Test progress lines are written to the stream."""
+    stream = io.StringIO()
+    tracker = batch.BatchProgress("path", stream)
+    tracker.total = 100
+    tracker.written = 0
+    tracker.prog_start(100, "path")
+    tracker.prog_update(50)
+    tracker.prog_close()
+    assert stream.getvalue() == "path: 50%\n"
@@ -0,0 +1,91 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the streaming bencode encoder."""
+
+import os
+import tracemalloc
+
+import pyben
+import pytest
+
+from tests import TempFileDirs, tempdir
+from torrentfileQt import bencode
+from torrentfileQt.torrent import TorrentFile, TorrentFileHybrid
+
+
+def test_bencode_matches_pyben():
+    """Test encoding a sorted value matches pyben."""
+    value = {
+        "announce": "http://tracker",
+        "info": {
+            "files": [{"length": 10, "path": ["a", "b"]}],
+            "name": "name",
+            "pieces": bytes(range(40)),
+            "private": 1,
+        },
+        "negative": -5,
+        "tuple": ("x", b"y"),
+    }
+    encoded = b"".join(bencode.iterencode(value))
+    assert encoded == pyben.dumps(value)
+    assert pyben.loads(encoded) == pyben.loads(pyben.dumps(value))
+
+
+def test_bencode_sorted_keys():
+    """Test keys are written in raw byte order."""
+    value = {"b": 1, b"a": 2, "B": 3, "é": 4, "ab": 5}
+    encoded = b"".join(bencode.iterencode(value))
+    assert encoded == b"d1:Bi3e1:ai2e2:abi5e1:bi1e2:\xc3\xa9i4ee"
+
+
+def test_bencode_error_keeps_file():
+    """Test a value that can't be encoded leaves the file unchanged."""
+    path = os.path.join(TempFileDirs.tempdir, "unchanged.torrent")
+    bencode.dump({"a": 1}, path)
+    with pytest.raises(pyben.EncodeError):
+        bencode.dump({"a": [1.5]}, path)
+    assert pyben.load(path) == {"a": 1}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_bencode_peak_memory():
+    """Test large values are written without copying them."""
+    size = 2**23
+    value = {"info": {"pieces": os.urandom(size), "name": "x"}}
+    path = os.path.join(TempFileDirs.tempdir, "large.torrent")
+    tracemalloc.start()
+    try:
+        bencode.dump(value, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < size // 8
+    assert os.path.getsize(path) > size
+
+
+@pytest.mark.parametrize("creator", [TorrentFile, TorrentFileHybrid])
+def test_bencode_creator_write(creator):
+    """Test the creators write the same meta data they assembled."""
+    path = tempdir(4, 2, 30000, [".r00", ".mp3"])
+    outfile = path + ".torrent"
+    torrent = creator(path=path, outfile=outfile, workers=1)
+    _, meta = torrent.write()
+    assert pyben.load(outfile) == meta
+    with open(outfile, "rb") as fd:
+        assert fd.read() == b"".join(bencode.iterencode(meta))
@@ -23,12 +23,12 @@ import os
 import pytest
 
 from tests import (
+    APP,
     MockEvent,
     switchTab,
     temp_file,
     torrent_versions,
     waitfor,
-    wind,
 )
 from torrentfileQt import bencodeTab
 
@@ -50,7 +50,7 @@ bencodeTab.browse_torrent = mock_func
 
 def test_fix():
     """Fix pytest warnings."""
-    assert wind
+    assert APP.window
 
 
 @pytest.fixture(params=torrent_versions())
@@ -0,0 +1,169 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the persistent piece hash and recheck caches."""
+
+import os
+from tempfile import mkdtemp
+
+import pytest
+
+from tests import TempFileDirs, encode, tempdir
+from torrentfileQt import cache
+from torrentfileQt.torrent import TorrentFile, TorrentFileHybrid, TorrentFileV2
+
+
+@pytest.fixture
+def tdir():
+    """Test fixture with a fresh directory of files."""
+    return tempdir(4, 2, 50000, [".r00", ".mp3", ".mkv"])
+
+
+@pytest.fixture
+def hcache():
+    """Test fixture for an empty hash cache."""
+    path = os.path.join(mkdtemp(dir=TempFileDirs.tempdir), "hashes.db")
+    hash_cache = cache.HashCache(path)
+    yield hash_cache
+    hash_cache.close()
+
+
+def last_file(path):
+    """Return the last file in the torrent."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(path)
+        for name in files
+    )[-1]
+
+
+@pytest.mark.parametrize(
+    "creator", [TorrentFile, TorrentFileV2, TorrentFileHybrid]
+)
+def test_cache_unchanged(tdir, hcache, reads, creator):
+    """Test unchanged content isn't read a second time."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    expected = encode(creator, cache=hcache, **kwargs)
+    assert sum(reads) > 0
+    reads.clear()
+    assert encode(creator, cache=hcache, **kwargs) == expected
+    assert sum(reads) == 0
+
+
+@pytest.mark.parametrize(
+    "creator", [TorrentFile, TorrentFileV2, TorrentFileHybrid]
+)
+def test_cache_changed_file(tdir, hcache, reads, creator):
+    """Test only the pieces of a changed file are hashed again."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    encode(creator, cache=hcache, **kwargs)
+    total = sum(reads)
+    path = last_file(tdir)
+    with open(path, "ab") as fd:
+        fd.write(b"changed")
+    hcache.stamps.clear()
+    reads.clear()
+    expected = encode(creator, **kwargs)
+    reads.clear()
+    assert encode(creator, cache=hcache, **kwargs) == expected
+    assert 0 < sum(reads) < total
+    assert sum(reads) <= os.path.getsize(path) + 2**14
+
+
+def test_cache_hybrid_after_v2(tdir, hcache, reads):
+    """Test v2 entries without sha1 pieces aren't used for hybrid."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    encode(TorrentFileV2, cache=hcache, **kwargs)
+    total = sum(reads)
+    reads.clear()
+    encode(TorrentFileHybrid, cache=hcache, **kwargs)
+    assert sum(reads) == total
+
+
+def test_cache_evict(tdir, hcache):
+    """Test the least recently used entries are evicted."""
+    TorrentFile(path=tdir, piece_length=2**14, workers=1, cache=hcache)
+    total = hcache.total_size()
+    hcache.max_size = total // 2
+    hcache.evict()
+    assert 0 < hcache.total_size() <= total // 2
+
+
+def test_cache_path(monkeypatch):
+    """Test the default database is stored in the config directory."""
+    monkeypatch.setenv("XDG_CONFIG_HOME", TempFileDirs.tempdir)
+    assert cache.cache_path().startswith(TempFileDirs.tempdir)
+    assert cache.results_path().startswith(TempFileDirs.tempdir)
+
+
+@pytest.fixture
+def rcache():
+    """Test fixture for an empty recheck result cache."""
+    path = os.path.join(mkdtemp(dir=TempFileDirs.tempdir), "rechecks.db")
+    result_cache = cache.ResultCache(path)
+    yield result_cache
+    result_cache.close()
+
+
+def walk_files(dirname: str) -> list:
+    """Return the paths of every file in a directory tree."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(dirname)
+        for name in names
+    )
+
+
+def test_cache_bits():
+    """Test piece flags survive packing into a bitmap."""
+    flags = bytearray([1, 0, 1, 1, 0, 0, 0, 1, 1, 0, 1])
+    bitmap = cache.pack_bits(flags)
+    assert len(bitmap) == 2
+    assert cache.unpack_bits(bitmap, len(flags)) == flags
+    assert cache.unpack_bits(b"", 3) == bytearray(3)
+
+
+def test_cache_results(tdir, rcache):
+    """Test only pieces of files unchanged since they were recorded."""
+    paths = walk_files(tdir)
+    files = {os.path.relpath(path, tdir): path for path in paths}
+    assert rcache.pieces("info", files) == {}
+    rcache.put("info", {key: (path, b"\xf0") for key, path in files.items()})
+    assert rcache.pieces("info", files) == dict.fromkeys(files, b"\xf0")
+    assert rcache.pieces("other", files) == {}
+    with open(paths[0], "ab") as fd:
+        fd.write(b"changed")
+    os.remove(paths[1])
+    expected = set(files) - {os.path.relpath(i, tdir) for i in paths[:2]}
+    assert set(rcache.pieces("info", files)) == expected
+    rcache.put("info", {"missing": (paths[1], b"\xff")})
+    assert rcache.pieces("info", {"missing": paths[1]}) == {}
+
+
+def test_cache_results_evict(tdir, rcache):
+    """Test the least recently used results are evicted."""
+    paths = walk_files(tdir)
+    for number, path in enumerate(paths):
+        rcache.put(str(number), {"file": (path, b"\x80")})
+    rcache.pieces("0", {"file": paths[0]})
+    rcache.max_entries = 2
+    rcache.evict()
+    assert rcache.pieces("0", {"file": paths[0]}) == {"file": b"\x80"}
+    assert rcache.pieces("1", {"file": paths[1]}) == {}
+    rows = rcache.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+    assert rows[0] == 2
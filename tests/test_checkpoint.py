@@ -0,0 +1,172 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing resumable torrent creation."""
+
+import os
+
+import pytest
+from PySide6.QtWidgets import QMessageBox
+
+from tests import encode, switchTab, tempdir
+from torrentfileQt import createTab
+from torrentfileQt.checkpoint import Checkpoint, checkpoint_path
+from torrentfileQt.torrent import TorrentFile, TorrentFileHybrid, TorrentFileV2
+
+
+class Interrupt(Exception):
+    """Raised to simulate a crash during hashing."""
+
+
+class InterruptTracker:
+    """Progress tracker that fails after a number of updates."""
+
+    def __init__(self, limit):
+        """Construct the tracker."""
+        self.limit = limit
+
+    def prog_start(self, total, path):
+        """Ignore progress start."""
+
+    def prog_update(self, _):
+        """Count progress updates."""
+        self.limit -= 1
+        if self.limit < 0:
+            raise Interrupt
+
+    def prog_close(self):
+        """Ignore progress close."""
+
+
+@pytest.fixture
+def tdir():
+    """Test fixture with a fresh directory of files."""
+    return tempdir(4, 2, 50000, [".r00", ".mp3", ".mkv"])
+
+
+def interrupt(creator, tdir):
+    """Run the creator until it fails and return the saved checkpoint."""
+    path = checkpoint_path({"path": tdir})
+    checkpoint = Checkpoint(path, interval=0)
+    with pytest.raises(Interrupt):
+        creator(
+            path=tdir,
+            piece_length=2**14,
+            workers=1,
+            tracker=InterruptTracker(4),
+            checkpoint=checkpoint,
+        )
+    return path
+
+
+@pytest.mark.parametrize(
+    "creator", [TorrentFile, TorrentFileV2, TorrentFileHybrid]
+)
+def test_checkpoint_resume(tdir, reads, small_tasks, creator):
+    """Test resuming only hashes the content that wasn't completed."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    expected = encode(creator, **kwargs)
+    total = sum(reads)
+    path = interrupt(creator, tdir)
+    checkpoint = Checkpoint(path)
+    assert checkpoint.load() and checkpoint.is_current()
+    reads.clear()
+    assert encode(creator, checkpoint=checkpoint, **kwargs) == expected
+    assert 0 < sum(reads) < total
+
+
+def test_checkpoint_changed(tdir, reads, small_tasks):
+    """Test saved hashes are discarded when the content has changed."""
+    path = interrupt(TorrentFile, tdir)
+    first = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(tdir)
+        for name in files
+    )[0]
+    with open(first, "ab") as fd:
+        fd.write(b"changed")
+    checkpoint = Checkpoint(path)
+    assert checkpoint.load() and not checkpoint.is_current()
+    reads.clear()
+    expected = encode(TorrentFile, path=tdir, piece_length=2**14)
+    total = sum(reads)
+    reads.clear()
+    kwargs = {"path": tdir, "piece_length": 2**14, "checkpoint": checkpoint}
+    assert encode(TorrentFile, **kwargs) == expected
+    assert sum(reads) == total
+
+
+def test_checkpoint_load_invalid(tdir):
+    """Test loading a missing or corrupt checkpoint."""
+    path = checkpoint_path({"path": tdir})
+    assert not Checkpoint(path).load()
+    with open(path, "wt", encoding="utf8") as fd:
+        fd.write("{corrupt")
+    assert not Checkpoint(path).load()
+
+
+def test_checkpoint_incremental(tdir):
+    """Test each save only appends the hashes completed since the last."""
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(tdir)
+        for name in files
+    )
+    path = checkpoint_path({"path": tdir})
+    checkpoint = Checkpoint(path, interval=3600)
+    checkpoint.begin("hybrid", 2**14, paths)
+    checkpoint.pieces = bytearray(b"a" * 40)
+    checkpoint.save()
+    checkpoint.pieces += b"b" * 20
+    checkpoint.add_file(paths[0], b"l" * 32, b"p" * 20)
+    checkpoint.save()
+    checkpoint.save()
+    with open(checkpoint.data_path, "rb") as fd:
+        assert fd.read() == b"a" * 40 + b"b" * 20 + b"l" * 32 + b"p" * 20
+    loaded = Checkpoint(path)
+    assert loaded.load() and loaded.is_current()
+    assert loaded.pieces == b"a" * 40 + b"b" * 20
+    assert loaded.get_file(paths[0]) == (b"l" * 32, b"p" * 20)
+    assert loaded.get_file(paths[1]) is None
+    loaded.remove()
+    assert not os.path.exists(path)
+    assert not os.path.exists(checkpoint.data_path)
+
+
+def test_checkpoint_create_tab(wind, tdir, reads, small_tasks, monkeypatch):
+    """Test the create tab resumes from a checkpoint."""
+    asked = []
+
+    def question(*args):
+        asked.append(args)
+        return QMessageBox.StandardButton.Yes
+
+    monkeypatch.setattr(QMessageBox, "question", question)
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    tab.setPath(tdir)
+    tab.v1button.setChecked(True)
+    tab.piece_length_combo.setValue("16 KiB")
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    outval = tab.output_path_edit.text()
+    path = interrupt(TorrentFile, tdir)
+    assert path == outval + ".resume"
+    tab.submit_button.click()
+    assert asked
+    assert os.path.exists(outval)
+    assert not os.path.exists(path)
@@ -18,10 +18,23 @@
 ##############################################################################
 """Module for testing procedures on Check Tab."""
 
+import os
+import shutil
+from tempfile import mkdtemp
+
+import pyben
 import pytest
 
-from tests import switchTab, tempdir, torrent_versions, wind
-from torrentfileQt import checkTab
+from tests import (
+    APP,
+    TempFileDirs,
+    signal_heavy,
+    switchTab,
+    tempdir,
+    torrent_versions,
+)
+from torrentfileQt import checkTab, reader, recheck
+from torrentfileQt.cache import ResultCache
 
 
 class MockReturn:
@@ -32,7 +45,7 @@ class MockReturn:
 
 def mock_func(_):
     """Mock function for testing."""
-    assert wind
+    assert APP.window
     return MockReturn.value
 
 
@@ -115,7 +128,7 @@ def test_checktab_thread(ttorrent, wind):
     checkTab.RecheckThread.start = checkTab.RecheckThread.run
     tab.content_group.setPath(tdir)
     tab.populate_tree(torrent, tdir)
-    assert tab.treeWidget.rootitem.childCount() > 0
+    assert tab.treeWidget.model().rowCount() > 0
     tab.treeWidget.clear()
 
 
@@ -128,6 +141,196 @@ def test_checktab_submit(ttorrent, wind):
     tab.setPath(tdir)
     tab.setTorrent(torrent)
     tab.checkButton.click()
-    assert tab.treeWidget.rootitem.childCount() > 0
+    assert tab.treeWidget.model().rowCount() > 0
     tab.treeWidget.clear()
     tab.textEdit.clear_data()
+
+
+@signal_heavy
+def test_checktab_progress(ttorrent, wind):
+    """Test every file is complete after checking unchanged content."""
+    tdir, torrent = ttorrent
+    tab = wind.tabs.checkWidget
+    switchTab(wind.stack, tab)
+    checkTab.RecheckThread.start = checkTab.RecheckThread.run
+    tab.setPath(tdir)
+    tab.setTorrent(torrent)
+    tab.checkButton.click()
+    model = tab.treeWidget.progress_model
+    files = [
+        node
+        for node in range(len(model.names))
+        if model.progress(node) is not None
+    ]
+    assert len(files) == 6
+    assert all(model.progress(node) == 1 for node in files)
+    tab.treeWidget.clear()
+    assert model.rowCount() == 0
+
+
+@signal_heavy
+@pytest.mark.parametrize("mode", [reader.NOCACHE, reader.DIRECT])
+def test_checktab_reader(ttorrent, wind, mode):
+    """Test checking with the reader selected in the combo box."""
+    tdir, torrent = ttorrent
+    tab = wind.tabs.checkWidget
+    switchTab(wind.stack, tab)
+    checkTab.RecheckThread.start = checkTab.RecheckThread.run
+    tab.readerCombo.setCurrentIndex(tab.readerCombo.findData(mode))
+    tab.setPath(tdir)
+    tab.setTorrent(torrent)
+    tab.checkButton.click()
+    assert tab.treeWidget.thread.reader == mode
+    assert tab.treeWidget.thread.workers == tab.workersSpin.value()
+    model = tab.treeWidget.progress_model
+    assert all(
+        model.progress(node) == 1
+        for node in range(len(model.names))
+        if model.progress(node) is not None
+    )
+    tab.readerCombo.setCurrentIndex(0)
+    tab.treeWidget.clear()
+
+
+@signal_heavy
+def test_checktab_thread_completion(ttorrent):
+    """Test the matched v1 pieces cover every file of unchanged content."""
+    tdir, torrent = ttorrent
+    thread = checkTab.RecheckThread(torrent, tdir, force=True)
+    thread.run()
+    if "meta version" not in pyben.load(torrent)["info"]:
+        assert thread.index.completion(thread.matched) == thread.index.lengths
+
+
+@signal_heavy
+@pytest.mark.parametrize("mode", [recheck.SIZES, recheck.SAMPLED])
+def test_checktab_quick_modes(ttorrent, wind, mode):
+    """Test quick checks label every file with it's confidence."""
+    tdir, torrent = ttorrent
+    tab = wind.tabs.checkWidget
+    switchTab(wind.stack, tab)
+    checkTab.RecheckThread.start = checkTab.RecheckThread.run
+    tab.modeCombo.setCurrentIndex(tab.modeCombo.findData(mode))
+    tab.forceCheck.setChecked(True)
+    tab.setPath(tdir)
+    tab.setTorrent(torrent)
+    tab.checkButton.click()
+    assert tab.treeWidget.thread.force
+    model = tab.treeWidget.progress_model
+    assert len(model.labels) == 6
+    assert set(model.labels.values()) == {recheck.result_label(True, mode)}
+    assert model.data(model.node_index(next(iter(model.labels)), 2))
+    tab.modeCombo.setCurrentIndex(0)
+    tab.forceCheck.setChecked(False)
+    tab.treeWidget.clear()
+
+
+@signal_heavy
+def test_checktab_targeted(ttorrent):
+    """Test files failing the quick checks are then fully checked."""
+    tdir, torrent = ttorrent
+    content = mkdtemp(dir=TempFileDirs.tempdir)
+    shutil.copytree(tdir, os.path.join(content, os.path.basename(tdir)))
+    TempFileDirs.paths.add(content)
+    thread = checkTab.RecheckThread(torrent, content, mode=recheck.TARGETED)
+    results = []
+    thread.file_checked.connect(lambda *args: results.append(args))
+    thread.run()
+    assert len(results) == 6
+    os.remove(thread.pathlist[2])
+    results.clear()
+    progress = []
+    thread.progress_update.connect(lambda *args: progress.append(args))
+    thread.run()
+    missing = (thread.pathlist[2], False, recheck.SIZES)
+    assert results.count(missing) == 2
+    failed = {path for path, ok, tier in results if tier != recheck.FULL}
+    failed -= {path for path, ok, tier in results if ok}
+    full = {path for path, _, tier in results if tier == recheck.FULL}
+    assert full == failed - {thread.pathlist[2]}
+    assert {path for path, _ in progress} <= full
+
+
+@signal_heavy
+def test_checktab_result_cache(ttorrent, monkeypatch):
+    """Test unchanged files are reported from the cache unless forced."""
+    tdir, torrent = ttorrent
+    path = os.path.join(mkdtemp(dir=TempFileDirs.tempdir), "rechecks.db")
+    monkeypatch.setattr(checkTab, "ResultCache", lambda: ResultCache(path))
+    content = mkdtemp(dir=TempFileDirs.tempdir)
+    shutil.copytree(tdir, os.path.join(content, os.path.basename(tdir)))
+    TempFileDirs.paths.add(content)
+
+    def check(force=False):
+        thread = checkTab.RecheckThread(torrent, content, force=force)
+        results, progress = {}, {}
+        thread.file_checked.connect(
+            lambda path, ok, tier: results.update({path: (ok, tier)})
+        )
+        thread.progress_update.connect(
+            lambda path, size: progress.update(
+                {path: progress.get(path, 0) + size}
+            )
+        )
+        thread.run()
+        return thread, results, progress
+
+    thread, results, _ = check()
+    assert set(results.values()) == {(True, recheck.FULL)}
+    thread, results, progress = check()
+    assert set(results.values()) == {(True, recheck.CACHED)}
+    assert sum(progress.values()) == sum(thread.index.lengths)
+    assert not any(thread.matched)
+    changed = thread.pathlist[1]
+    os.utime(changed, ns=(0, 0))
+    _, results, _ = check()
+    assert results.pop(changed) == (True, recheck.FULL)
+    assert set(results.values()) == {(True, recheck.CACHED)}
+    _, results, _ = check(force=True)
+    assert set(results.values()) == {(True, recheck.FULL)}
+
+
+@signal_heavy
+@pytest.mark.parametrize("creator", torrent_versions())
+def test_checktab_result_pieces(creator, monkeypatch):
+    """Test the matched pieces of a failed file aren't hashed again."""
+    content = tempdir(2, 1, 2**16, [".dat"])
+    metafile = content + creator.__name__ + ".torrent"
+    creator(path=content, piece_length=2**14, outfile=metafile).write()
+    TempFileDirs.paths.add(metafile)
+    path = os.path.join(mkdtemp(dir=TempFileDirs.tempdir), "rechecks.db")
+    monkeypatch.setattr(checkTab, "ResultCache", lambda: ResultCache(path))
+    thread = checkTab.RecheckThread(metafile, content)
+    thread.run()
+    broken = thread.pathlist[-1]
+    with open(broken, "r+b") as fd:
+        fd.seek(-16, os.SEEK_END)
+        fd.write(bytes(16))
+    results = {}
+    for _ in range(2):
+        thread = checkTab.RecheckThread(metafile, content)
+        thread.file_checked.connect(
+            lambda path, ok, tier: results.update({path: (ok, tier)})
+        )
+        thread.run()
+        assert results[broken] == (False, recheck.FULL)
+    flags = thread.known[len(thread.pathlist) - 1]
+    assert flags[0] and not flags[-1]
+
+
+def test_checktab_cancelled(ttorrent, wind):
+    """Test a cancelled check stops and reports it in the log."""
+    tdir, torrent = ttorrent
+    tab = wind.tabs.checkWidget
+    switchTab(wind.stack, tab)
+    thread = checkTab.RecheckThread(torrent, tdir)
+    messages = []
+    thread.logMsg.connect(messages.append)
+    thread.pause()
+    thread.resume()
+    thread.cancel()
+    thread.run()
+    assert messages[-1] == "Recheck cancelled"
+    tab.pauseButton.setChecked(True)
+    tab.pauseButton.setChecked(False)
+    tab.cancelButton.click()
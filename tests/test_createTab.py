@@ -19,11 +19,17 @@
 """Module for testing procedures on Check Tab."""
 
 import os
+import threading
+import time
+from types import SimpleNamespace
 
 import pytest
 
-from tests import MockEvent, switchTab, tempdir, wind
-from torrentfileQt import createTab
+from PySide6.QtWidgets import QMessageBox
+
+from tests import APP, MockEvent, switchTab, temp_file, tempdir, waitfor
+from torrentfileQt import createTab, hasher, reader
+from torrentfileQt.torrent import TorrentFile
 
 
 class MockReturn:
@@ -34,7 +40,7 @@ class MockReturn:
 
 def mock_func(_):
     """Mock function for testing."""
-    assert wind
+    assert APP.window
     return MockReturn.value
 
 
@@ -92,6 +98,33 @@ def test_create_write_param_thread(wind, tdir, version):
     assert os.path.exists(outval)
 
 
+def test_create_all_formats(wind, tdir):
+    """Test the all versions option writes a torrent file of each."""
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    tab.setPath(tdir)
+    tab.allbutton.setChecked(True)
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    base = tab.output_path_edit.text()[: -len(".torrent")]
+    tab.submit_button.click()
+    tab.v1button.setChecked(True)
+    for version in ["v1", "v2", "hybrid"]:
+        assert os.path.exists(f"{base}.{version}.torrent")
+
+
+def test_create_reader_option(wind, tdir):
+    """Test the selected reader is passed to the torrent creator."""
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    tab.setPath(tdir)
+    combo = tab.reader_combo
+    combo.setCurrentIndex(combo.findData(reader.DIRECT))
+    args, _ = tab.submit_button.collect()
+    combo.setCurrentIndex(0)
+    assert args["reader"] == reader.DIRECT
+    assert tab.submit_button.collect()[0]["reader"] == reader.MMAP
+
+
 def test_create_browse_dir(wind, tdir):
     """Test functions for the create widget."""
     tab = wind.tabs.createWidget
@@ -156,3 +189,195 @@ def test_create_drop_no_event(wind):
     switchTab(wind.stack, widget=widget)
     event = MockEvent(None)
     assert not widget.path_group.dropEvent(event)
+
+
+def test_create_progress_batches(wind, tdir, tmp_path, monkeypatch):
+    """Test progress is sent to the table in batches."""
+    monkeypatch.setattr(createTab, "PROGRESS_INTERVAL", float("inf"))
+    batches = []
+    args = {
+        "path": tdir,
+        "outfile": str(tmp_path / "batches.torrent"),
+        "piece_length": 2**14,
+        "workers": 1,
+    }
+    thread = createTab.TorrentFileCreator(args, TorrentFile)
+    thread.progress_signal.connect(lambda *batch: batches.append(batch))
+    thread.run()
+    assert len(batches) == 1
+    started, deltas = batches[0]
+    assert len(started) == len(deltas) > 1
+    assert sum(deltas.values()) == sum(size for size, _ in started)
+    assert os.path.exists(args["outfile"])
+
+
+def test_create_progress_table_batch(wind):
+    """Test the progress table finds rows by path."""
+    table = wind.tabs.createWidget.progress_tree
+    model = table.progress_model
+    paths = [f"/path/to/file{i}" for i in range(200)]
+    table.prog_batch([[100, path] for path in paths], {paths[3]: 50})
+    table.prog_batch([], {paths[3]: 25, paths[-1]: 100})
+    assert model.progress(table.rows[paths[3]]) == 0.75
+    assert model.progress(table.rows[paths[-1]]) == 1
+    index = model.node_index(table.rows[paths[-1]])
+    assert index.data() == paths[-1]
+    assert index.siblingAtColumn(1).data() == "100%"
+
+
+def queue_args(path):
+    """Return creator arguments for a queued job."""
+    outfile = path + ".queued.torrent"
+    return {"path": path, "outfile": outfile, "piece_length": 2**14}
+
+
+def test_create_queue_order(wind):
+    """Test held, cancelled and reordered jobs in the queue."""
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    queue = createTab.JobQueue(limit=0)
+    table = createTab.JobTable(queue)
+    dirs = [tempdir(2, 1, 27) for _ in range(3)]
+    jobs = [queue.add(queue_args(path), TorrentFile) for path in dirs]
+    assert [job.status for job in jobs] == [createTab.QUEUED] * 3
+    queue.move(jobs[2], -2)
+    assert queue.jobs == [jobs[2], jobs[0], jobs[1]]
+    queue.pause(jobs[0])
+    queue.cancel(jobs[1])
+    table.refresh()
+    assert table.topLevelItem(0).text(0) == dirs[2]
+    assert table.topLevelItem(1).text(1) == createTab.PAUSED
+    queue.set_limit(1)
+    assert jobs[2].status == createTab.COMPLETED
+    assert jobs[0].status == createTab.PAUSED
+    queue.resume(jobs[0])
+    table.refresh()
+    assert jobs[0].status == createTab.COMPLETED
+    assert table.topLevelItem(1).text(2) == "100%"
+    assert jobs[1].status == createTab.CANCELLED
+    assert not os.path.exists(jobs[1].args["outfile"])
+    assert os.path.exists(jobs[0].args["outfile"])
+
+
+def test_create_job_cancelled(wind, monkeypatch):
+    """Test a cancelled job stops between tasks and saves it's checkpoint."""
+    monkeypatch.setattr(hasher, "TASK_SIZE", 2**15)
+    args = dict(queue_args(tempdir(4, 2, 2**16)), workers=1)
+    thread = createTab.TorrentFileCreator(args, TorrentFile)
+    monkeypatch.setattr(thread, "prog_update", lambda _: thread.cancel())
+    thread.run()
+    assert thread.cancelled and not thread.completed
+    assert os.path.exists(args["outfile"] + ".resume")
+    assert not os.path.exists(args["outfile"])
+    os.remove(args["outfile"] + ".resume")
+
+
+def test_create_job_paused(wind, tdir):
+    """Test a paused job continues once it is resumed."""
+    args = queue_args(tdir)
+    thread = createTab.TorrentFileCreator(args, TorrentFile)
+    thread.pause()
+    timer = threading.Timer(0.2, thread.resume)
+    timer.start()
+    start = time.monotonic()
+    thread.run()
+    assert time.monotonic() - start >= 0.2
+    assert thread.completed and thread.done == thread.total
+
+
+def test_create_job_eta():
+    """Test throughput and ETA are measured from progress samples."""
+    job = createTab.CreationJob({"path": "path"}, TorrentFile)
+    job.thread = SimpleNamespace(done=100, total=300)
+    job.status = createTab.RUNNING
+    job.samples.extend([(0, 0), (2, 100)])
+    assert job.rate() == 50
+    assert job.eta() == 4
+    assert createTab.format_eta(3725) == "1:02:05"
+
+
+def test_create_job_predicted_eta():
+    """Test the ETA is predicted until throughput has been measured."""
+    job = createTab.CreationJob({"path": "path"}, TorrentFile)
+    job.thread = SimpleNamespace(done=0, total=2**20 * 8)
+    job.expected = 2**20
+    assert job.eta() == 8 and job.piece_rate() == 0
+    job.status = createTab.RUNNING
+    job.samples.extend([(0, 0), (2, 2**20 * 4)])
+    assert job.eta() == 4
+    assert job.piece_rate() == 2**21 / job.piece_length
+    job.status = createTab.COMPLETED
+    assert job.eta() is None
+
+
+def test_create_queue_shares_workers(wind):
+    """Test jobs running at the same time share the worker budget."""
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    queue = createTab.JobQueue(limit=0)
+    dirs = [tempdir(2, 1, 27) for _ in range(2)]
+    jobs = [
+        queue.add(dict(queue_args(path), workers=4), TorrentFile)
+        for path in dirs
+    ]
+    queue.set_limit(2)
+    assert [job.status for job in jobs] == [createTab.COMPLETED] * 2
+    assert jobs[0].thread.args["workers"] == 2
+    assert jobs[1].thread.args["workers"] == 4
+
+
+def test_create_split_mode(wind):
+    """Test split mode queues a job for each subfolder."""
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    root = tempdir(2, 1, 27)
+    parts = [os.path.join(root, name) for name in ["part1", "part2"]]
+    for path in parts:
+        os.mkdir(path)
+        with open(os.path.join(path, "data.bin"), "wb") as fd:
+            fd.write(os.urandom(100))
+    tab.setPath(root)
+    tab.split_check.setChecked(True)
+    tab.split_pattern.setText("part*")
+    tab.submit_button.click()
+    assert waitfor(10, tab.split_thread.isFinished)
+    assert waitfor(10, lambda: tab.queue.jobs[-1].path == parts[-1])
+    tab.split_check.setChecked(False)
+    tab.split_pattern.clear()
+    assert [job.path for job in tab.queue.jobs[-2:]] == parts
+    for path in parts:
+        assert os.path.exists(path + ".torrent")
+
+
+def test_create_split_mode_invalid(wind, monkeypatch):
+    """Test split mode warns about paths that aren't directories."""
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    warnings = []
+    monkeypatch.setattr(
+        QMessageBox, "warning", lambda *args: warnings.append(args[2])
+    )
+    jobs = len(tab.queue.jobs)
+    tab.split_check.setChecked(True)
+    tab.path_group.setPath("")
+    tab.submit_button.click()
+    assert len(warnings) == 1
+    path = temp_file(27)
+    tab.path_group.setPath(path)
+    tab.submit_button.click()
+    assert waitfor(10, lambda: len(warnings) == 2)
+    assert path in warnings[-1]
+    tab.split_check.setChecked(False)
+    assert len(tab.queue.jobs) == jobs
+
+
+def test_create_queue_paths(wind):
+    """Test queueing several paths with the current options."""
+    createTab.TorrentFileCreator.start = createTab.TorrentFileCreator.run
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    dirs = [tempdir(2, 1, 27) for _ in range(2)]
+    tab.queue_paths(dirs)
+    for path in dirs:
+        assert os.path.exists(path + ".torrent")
+    statuses = [job.status for job in tab.queue.jobs[-2:]]
+    assert statuses == [createTab.COMPLETED] * 2
@@ -0,0 +1,127 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing duplicate file detection."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+
+import pyben
+import pytest
+
+from tests import TempFileDirs, temp_file
+from torrentfileQt import batch, dedupe
+from torrentfileQt.pipeline import Occupancy
+from torrentfileQt.torrent import TorrentFileHybrid, TorrentFileV2
+
+
+@pytest.fixture(scope="module")
+def tdir():
+    """Test fixture with copies, a hard link and same sized files."""
+    dirname = mkdtemp(dir=TempFileDirs.tempdir)
+    TempFileDirs.paths.add(dirname)
+    large = temp_file(dedupe.SAMPLE_SIZE * 6 + 5, dir=dirname)
+    small = temp_file(3000, dir=dirname)
+    shutil.copy(large, os.path.join(dirname, "large.copy"))
+    shutil.copy(small, os.path.join(dirname, "small.copy"))
+    os.link(small, os.path.join(dirname, "small.link"))
+    with open(os.path.join(dirname, "small.other"), "wb") as fd:
+        fd.write(os.urandom(3000))
+    return dirname
+
+
+def files(dirname):
+    """Return the path and size of each file in the directory."""
+    return [
+        (path, os.path.getsize(path))
+        for path in sorted(
+            os.path.join(dirname, name) for name in os.listdir(dirname)
+        )
+    ]
+
+
+def test_dedupe_sample_offsets():
+    """Test small files are sampled in full and large files at both ends."""
+    assert dedupe.sample_offsets(100) == [0]
+    size = dedupe.SAMPLE_SIZE * dedupe.SAMPLES * 10
+    offsets = dedupe.sample_offsets(size)
+    assert len(offsets) == dedupe.SAMPLES
+    assert offsets[0] == 0 and offsets[-1] == size - dedupe.SAMPLE_SIZE
+
+
+def test_dedupe_find_duplicates(tdir):
+    """Test copies and links are matched to the first file."""
+    duplicates = dedupe.find_duplicates(files(tdir))
+    assert len(duplicates) == 3
+    roots = {duplicates.get(i, i) for i in duplicates.values()}
+    assert len(roots) == 2 and not roots & set(duplicates)
+    for path, original in duplicates.items():
+        with open(path, "rb") as fd1, open(original, "rb") as fd2:
+            assert fd1.read() == fd2.read()
+    other = os.path.join(tdir, "small.other")
+    assert other not in duplicates and other not in duplicates.values()
+
+
+def test_dedupe_same_samples():
+    """Test large files matching every sample are compared in full."""
+    dirname = mkdtemp(dir=TempFileDirs.tempdir)
+    TempFileDirs.paths.add(dirname)
+    size = dedupe.SAMPLE_SIZE * dedupe.SAMPLES * 4
+    contents = bytearray(os.urandom(size))
+    pair = []
+    for name in ("first", "second"):
+        pair.append((os.path.join(dirname, name), size))
+        with open(pair[-1][0], "wb") as fd:
+            fd.write(contents)
+        contents[dedupe.sample_offsets(size)[1] - 1] ^= 0xFF
+    (first, _), (second, _) = pair
+    assert dedupe.sample_digest(first, size) == dedupe.sample_digest(
+        second, size
+    )
+    stats = Occupancy()
+    assert dedupe.find_duplicates(pair, stats) == {}
+    samples = dedupe.SAMPLE_SIZE * dedupe.SAMPLES
+    assert stats.read == 2 * (samples + size)
+
+
+@pytest.mark.parametrize("creator", [TorrentFileV2, TorrentFileHybrid])
+def test_dedupe_identical(tdir, creator):
+    """Test skipping duplicates doesn't change the torrent."""
+    results = []
+    for skip in [False, True]:
+        torrent = creator(path=tdir, piece_length=2**14, workers=1, dedupe=skip)
+        meta = torrent.sort_meta()
+        meta["creation date"] = 0
+        results.append(pyben.dumps(meta))
+    assert results[0] == results[1]
+    duplicates = dedupe.find_duplicates(files(tdir))
+    skipped = sum(
+        os.path.getsize(path)
+        for path, original in duplicates.items()
+        if os.path.samefile(path, original)
+    )
+    assert torrent.engine.skipped == skipped > 0
+
+
+def test_dedupe_build_args():
+    """Test the option is only passed to v2 and hybrid creators."""
+    args, _ = batch.build_args({"version": "v1", "dedupe": True})
+    assert "dedupe" not in args
+    args, _ = batch.build_args({"version": "hybrid", "dedupe": True})
+    assert args["dedupe"] is True
@@ -21,7 +21,7 @@
 import os
 import pytest
 
-from tests import switchTab, temp_file, torrent_versions, wind
+from tests import APP, switchTab, temp_file, torrent_versions
 from torrentfileQt import editorTab
 
 
@@ -33,7 +33,7 @@ class MockReturn:
 
 def mock_func(_):
     """Mock function for testing."""
-    assert wind
+    assert APP.window
     return MockReturn.value
 
 
@@ -0,0 +1,316 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the multi-process hashing engine."""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+
+import pyben
+import pytest
+from torrentfile import torrent
+from torrentfile.hasher import merkle_root
+
+from tests import encode, sparse_file, temp_file, tempdir
+from torrentfileQt import hasher, pipeline, reader
+from torrentfileQt.checkpoint import Checkpoint
+from torrentfileQt.control import Cancelled, ControlToken
+from torrentfileQt.torrent import (
+    TorrentFile,
+    TorrentFileHybrid,
+    TorrentFileV2,
+    TorrentFormats,
+)
+
+CREATORS = [
+    (torrent.TorrentFile, TorrentFile),
+    (torrent.TorrentFileV2, TorrentFileV2),
+    (torrent.TorrentFileHybrid, TorrentFileHybrid),
+]
+
+
+class MockTracker:
+    """Mock progress tracker for testing."""
+
+    def __init__(self):
+        """Construct the mock tracker."""
+        self.events = []
+
+    def prog_start(self, total, path):
+        """Record progress start."""
+        self.events.append(("start", path, total))
+
+    def prog_update(self, value):
+        """Record progress update."""
+        self.events.append(("update", value))
+
+    def prog_close(self):
+        """Record progress close."""
+        self.events.append(("close",))
+
+
+@pytest.fixture(scope="module")
+def tdir():
+    """Test fixture for hashing engine."""
+    dirname = tempdir(6, 2, 70000, [".r00", ".mp3", ".mkv", ".dat", ".zip"])
+    temp_file(0, suffix=".nfo", dir=dirname)
+    temp_file(16385, suffix=".txt", dir=dirname)
+    return dirname
+
+
+@pytest.mark.parametrize("creators", CREATORS)
+@pytest.mark.parametrize("piece_length", [2**14, 2**16])
+def test_hasher_identical(tdir, small_tasks, creators, piece_length):
+    """Test engine output is identical to the torrentfile creators."""
+    original, engine = creators
+    kwargs = {"path": tdir, "piece_length": piece_length}
+    expected = encode(original, progress=0, **kwargs)
+    assert encode(engine, workers=1, **kwargs) == expected
+
+
+def test_hasher_identical_align(tdir, small_tasks):
+    """Test engine output is identical for piece aligned torrents."""
+    kwargs = {"path": tdir, "piece_length": 2**15, "align": True}
+    expected = encode(torrent.TorrentFile, progress=0, **kwargs)
+    assert encode(TorrentFile, workers=1, **kwargs) == expected
+
+
+@pytest.mark.parametrize("creators", CREATORS)
+def test_hasher_process_pool(tdir, small_tasks, creators):
+    """Test results from worker processes are collected in order."""
+    original, engine = creators
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    expected = encode(original, progress=0, **kwargs)
+    assert encode(engine, workers=2, **kwargs) == expected
+
+
+@pytest.mark.parametrize("creator", [TorrentFile, TorrentFileV2])
+def test_hasher_progress(tdir, small_tasks, creator):
+    """Test the tracker receives progress for every file in order."""
+    tracker = MockTracker()
+    creator(path=tdir, piece_length=2**14, workers=1, tracker=tracker)
+    starts = [event for event in tracker.events if event[0] == "start"]
+    closes = [event for event in tracker.events if event[0] == "close"]
+    total = sum(event[1] for event in tracker.events if event[0] == "update")
+    assert len(starts) == len(closes)
+    assert total == sum(size for _, _, size in starts)
+    assert [os.path.getsize(path) for _, path, _ in starts] == [
+        size for _, _, size in starts
+    ]
+
+
+def test_hasher_v1_tasks(tdir):
+    """Test v1 tasks contain whole pieces except for the last one."""
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(tdir)
+        for name in files
+    )
+    tasks = hasher.v1_tasks(paths, 2**14)
+    sizes = [sum(span[2] for span in spans) for spans in tasks]
+    assert all(size % 2**14 == 0 for size in sizes[:-1])
+    assert sum(sizes) == sum(os.path.getsize(path) for path in paths)
+
+
+def test_hasher_piece_store():
+    """Test digests stored out of order and the completed prefix."""
+    digests = [bytes([i]) * hasher.SHA1_SIZE for i in range(5)]
+    store = hasher.PieceStore(5)
+    store.put(2, b"".join(digests[2:4]))
+    assert store.completed == 0 and not store.prefix()
+    store.put(0, digests[0])
+    assert store.prefix() == digests[0]
+    store.put(1, digests[1])
+    store.put(4, digests[4])
+    assert store.completed == 5
+    assert store.data == b"".join(digests)
+    with pytest.raises(ValueError):
+        store.put(4, b"".join(digests[:2]))
+    assert len(store.data) == 5 * hasher.SHA1_SIZE
+
+
+def test_hasher_hybrid_single_read(tdir, reads):
+    """Test hybrid creation reads the content exactly once."""
+    TorrentFileHybrid(path=tdir, piece_length=2**14, workers=1)
+    assert sum(reads) == sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(tdir)
+        for name in files
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("piece_length", [2**14, 2**16])
+def test_hasher_formats_identical(tdir, small_tasks, workers, piece_length):
+    """Test every format created from one read matches torrentfile."""
+    kwargs = {"path": tdir, "piece_length": piece_length}
+    formats = TorrentFormats(workers=workers, **kwargs)
+    for original, version in zip(CREATORS, ["v1", "v2", "hybrid"]):
+        meta = formats.torrents[version].sort_meta()
+        meta["creation date"] = 0
+        expected = encode(original[0], progress=0, **kwargs)
+        assert pyben.dumps(meta) == expected
+
+
+def test_hasher_formats_single_read(tdir, small_tasks, reads):
+    """Test creating every format reads the content exactly once."""
+    TorrentFormats(path=tdir, piece_length=2**14, workers=1)
+    assert sum(reads) == sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(tdir)
+        for name in files
+    )
+
+
+@pytest.fixture(scope="module")
+def sparse_dir():
+    """Test fixture with sparse files and files made only of holes."""
+    dirname = tempdir(2, 1, 40000, [".r00", ".mp3"])
+    size = 2**20
+    sparse_file(size * 3 + 100, {size + 7: 70000}, dir=dirname)
+    sparse_file(size * 2, {}, dir=dirname)
+    sparse_file(size + 5000, {size: 5000}, dir=dirname)
+    return dirname
+
+
+@pytest.mark.parametrize("creators", CREATORS)
+@pytest.mark.parametrize("piece_length", [2**14, 2**18])
+def test_hasher_sparse_identical(
+    sparse_dir, small_tasks, creators, piece_length
+):
+    """Test hashing sparse files matches the torrentfile creators."""
+    original, engine = creators
+    kwargs = {"path": sparse_dir, "piece_length": piece_length}
+    expected = encode(original, progress=0, **kwargs)
+    assert encode(engine, workers=1, **kwargs) == expected
+
+
+def test_hasher_zero_hash():
+    """Test cached zero digests match hashing the zeros."""
+    piece_length = 2**16
+    blocks = [hashlib.sha256(bytes(hasher.BLOCK_SIZE)).digest()] * 4
+    assert hasher.zero_hash("sha1", 5) == hashlib.sha1(bytes(5)).digest()
+    assert hasher.zero_hash("layer", piece_length) == merkle_root(blocks)
+    task = ([(None, 0, piece_length * 2 + 3)], piece_length, reader.MMAP, 0)
+    assert hasher.hash_v1_task(task) == b"".join(
+        hashlib.sha1(bytes(size)).digest()
+        for size in [piece_length, piece_length, 3]
+    )
+
+
+class PauseTracker(MockTracker):
+    """Progress tracker that pauses the job after the first update."""
+
+    def __init__(self, token, delay):
+        """Construct the tracker."""
+        super().__init__()
+        self.token = token
+        self.delay = delay
+        self.paused = False
+        self.held = None
+
+    def prog_update(self, value):
+        """Pause the job and resume it after a delay."""
+        if not self.paused:
+            self.paused = True
+            self.token.pause()
+            threading.Timer(self.delay, self.resume).start()
+        super().prog_update(value)
+
+    def resume(self):
+        """Record the buffers and processes kept while paused and resume."""
+        self.held = (
+            len(pipeline.BUFFERS.buffers),
+            len(multiprocessing.active_children()),
+        )
+        self.token.resume()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_hasher_paused(tdir, small_tasks, workers):
+    """Test a paused job saves it's checkpoint and resumes unchanged."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    expected = encode(TorrentFileV2, workers=1, **kwargs)
+    token = ControlToken()
+    tracker = PauseTracker(token, 0.2)
+    path = tdir + f".{workers}.resume"
+    pipeline.BUFFERS.give([pipeline.BUFFERS.take()])
+    start = time.monotonic()
+    result = encode(
+        TorrentFileV2,
+        workers=workers,
+        tracker=tracker,
+        checkpoint=Checkpoint(path, interval=3600),
+        token=token,
+        **kwargs,
+    )
+    assert result == expected
+    assert time.monotonic() - start >= 0.2
+    assert os.path.exists(path)
+    assert tracker.held == (0, 0)
+
+
+class CancelTracker(MockTracker):
+    """Mock tracker cancelling the job at it's first progress update."""
+
+    def __init__(self, token):
+        """Construct the mock tracker."""
+        super().__init__()
+        self.token = token
+
+    def prog_update(self, value):
+        """Cancel the job."""
+        self.token.cancel()
+
+
+def test_hasher_task_size():
+    """Test tasks are cut to a few pieces when the job can be paused."""
+    engine = hasher.HashEngine(workers=1)
+    assert engine.task_size(2**14) == hasher.TASK_SIZE
+    engine = hasher.HashEngine(workers=1, token=ControlToken())
+    assert engine.task_size(2**14) == hasher.CONTROL_TASK_SIZE
+    assert engine.task_size(2**21) == 2 * 2**21
+    assert engine.task_size(2**24) == 2**24
+
+
+@pytest.mark.parametrize("creator", [TorrentFile, TorrentFileV2])
+def test_hasher_cancel_latency(reads, creator):
+    """Test a cancel request stops hashing within a few pieces."""
+    path = temp_file(hasher.TASK_SIZE // 2)
+    token = ControlToken()
+    with pytest.raises(Cancelled):
+        creator(
+            path=path,
+            piece_length=2**16,
+            workers=1,
+            tracker=CancelTracker(token),
+            token=token,
+        )
+    assert sum(reads) == hasher.CONTROL_TASK_SIZE
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_hasher_cancelled(tdir, small_tasks, workers):
+    """Test a cancelled job stops before the next task."""
+    token = ControlToken()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        TorrentFile(path=tdir, piece_length=2**14, workers=workers, token=token)
@@ -22,12 +22,12 @@ import pyben
 import pytest
 
 from tests import (
+    APP,
     MockEvent,
     switchTab,
     temp_file,
     tempdir,
     torrent_versions,
-    wind,
 )
 from torrentfileQt import infoTab
 
@@ -40,7 +40,7 @@ class MockReturn:
 
 def mock_func(_):
     """Mock function for tests."""
-    assert wind
+    assert APP.window
     return MockReturn.value
 
 
@@ -0,0 +1,138 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the overlapped read and hash pipeline."""
+
+import os
+import threading
+
+import pyben
+import pytest
+
+from tests import sparse_file, temp_file
+from torrentfileQt import hasher, pipeline, reader
+from torrentfileQt.torrent import TorrentFile, TorrentFileHybrid, TorrentFileV2
+
+SIZE = 3 * reader.CHUNK_SIZE + 4321
+
+
+@pytest.fixture(scope="module")
+def spans():
+    """Test fixture with file, padding and sparse file spans."""
+    first = temp_file(SIZE)
+    second = sparse_file(SIZE, {reader.CHUNK_SIZE * 2: 1000})
+    return [(first, 17, SIZE - 17), (None, 0, 999), (second, 0, SIZE)]
+
+
+def read_all(spans, mode, depth, stats=None):
+    """Join the chunks yielded by the pipeline."""
+    return b"".join(
+        bytes(chunk) for chunk in pipeline.read_spans(spans, mode, depth, stats)
+    )
+
+
+@pytest.mark.parametrize("mode", list(reader.READERS))
+@pytest.mark.parametrize("depth", [1, 4])
+def test_pipeline_contents(spans, mode, depth):
+    """Test the pipeline yields the same contents as reading in turn."""
+    expected = read_all(spans, mode, 0)
+    stats = pipeline.Occupancy()
+    assert read_all(spans, mode, depth, stats) == expected
+    assert stats.capacity > 0
+    assert 0 <= stats.ratio <= 1
+
+
+def test_pipeline_stopped_early(spans):
+    """Test the reader thread exits when the hasher stops early."""
+    threads = threading.active_count()
+    chunks = pipeline.read_spans(spans, reader.MMAP, 2)
+    next(chunks)
+    chunks.close()
+    assert threading.active_count() == threads
+
+
+def test_pipeline_mmap_views(spans, monkeypatch):
+    """Test mapped files are passed through without ring buffers."""
+    closed = []
+    close = reader.MmapReader.close
+
+    def mock_close(file_reader):
+        closed.append(file_reader.path)
+        close(file_reader)
+
+    def take():
+        raise AssertionError("buffer taken")
+
+    monkeypatch.setattr(reader.MmapReader, "close", mock_close)
+    monkeypatch.setattr(pipeline.BUFFERS, "take", take)
+    for chunk in pipeline.read_spans(spans[:1], reader.MMAP, 2):
+        assert isinstance(chunk.obj, reader.mmap.mmap)
+        assert len(chunk.obj) == os.path.getsize(spans[0][0])
+    assert closed == [spans[0][0]]
+    chunks = pipeline.read_spans(spans[:1], reader.MMAP, 2)
+    next(chunks)
+    chunks.close()
+    assert closed == [spans[0][0]] * 2
+
+
+def test_pipeline_buffers_reused(spans, monkeypatch):
+    """Test the ring buffers are reused by the next task."""
+    allocated = []
+    new_buffer = pipeline._new_buffer
+
+    def mock_new_buffer():
+        allocated.append(1)
+        return new_buffer()
+
+    monkeypatch.setattr(pipeline, "_new_buffer", mock_new_buffer)
+    monkeypatch.setattr(pipeline, "BUFFERS", pipeline.BufferPool(8))
+    read_all(spans, reader.BUFFERED, 4)
+    assert 0 < len(allocated) <= 6
+    count = len(allocated)
+    read_all(spans, reader.BUFFERED, 4)
+    assert len(allocated) == count
+    assert len(pipeline.BUFFERS.buffers) == count
+
+
+def test_pipeline_error(spans):
+    """Test errors in the reader thread are raised in the hasher."""
+    missing = [(spans[0][0] + ".missing", 0, SIZE)]
+    with pytest.raises(FileNotFoundError):
+        read_all(missing, reader.MMAP, 2)
+
+
+@pytest.mark.parametrize(
+    "creator", [TorrentFile, TorrentFileV2, TorrentFileHybrid]
+)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipeline_identical(spans, creator, workers, monkeypatch):
+    """Test torrents are identical with and without reading ahead."""
+    monkeypatch.setattr(hasher, "TASK_SIZE", pipeline.MIN_LENGTH)
+    results = []
+    for depth in [0, 3]:
+        torrent = creator(
+            path=spans[0][0],
+            piece_length=2**18,
+            workers=workers,
+            queue_depth=depth,
+        )
+        meta = torrent.sort_meta()
+        meta["creation date"] = 0
+        results.append(pyben.dumps(meta))
+    assert results[0] == results[1]
+    assert torrent.engine.occupancy.capacity > 0
@@ -0,0 +1,97 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the progress model and view."""
+
+from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+from tests import APP
+from torrentfileQt.progress import PROGRESS_ROLE, ROOT, ProgressView
+
+
+def test_progress_model_tree():
+    """Test rows are added under their parents."""
+    view = ProgressView()
+    model = view.progress_model
+    folder = model.add_node("folder", None)
+    files = model.add_nodes(
+        [(f"file{i}", 1000, None) for i in range(1000)], folder
+    )
+    assert model.rowCount() == 1
+    assert model.rowCount(model.node_index(folder)) == 1000
+    index = model.index(10, 0, model.node_index(folder))
+    assert index.internalId() == files[10]
+    assert model.parent(index) == model.node_index(folder)
+    assert model.parent(model.node_index(folder)) == QModelIndex()
+    assert model.node_index(ROOT) == QModelIndex()
+    assert model.data(model.node_index(folder, 1), PROGRESS_ROLE) is None
+
+
+def test_progress_model_advance():
+    """Test progress is capped at the size of the file."""
+    view = ProgressView()
+    model = view.progress_model
+    node = model.add_node("file", 1000)
+    empty = model.add_node("empty", 0)
+    model.advance(node, 400)
+    assert model.data(model.node_index(node, 1), PROGRESS_ROLE) == 0.4
+    model.advance(node, 4000)
+    assert model.data(model.node_index(node, 1)) == "100%"
+    assert model.progress(empty) == 1
+    assert model.headerData(1, Qt.Orientation.Horizontal) == "Progress"
+
+
+def test_progress_model_labels():
+    """Test labels are shown in a third column."""
+    view = ProgressView()
+    model = view.progress_model
+    node = model.add_node("file", 1000)
+    model.set_columns(["Path", "Progress", "Result"])
+    assert view.header().count() == 3
+    assert model.data(model.node_index(node, 2)) is None
+    model.set_label(node, "Passed")
+    assert model.data(model.node_index(node, 2)) == "Passed"
+    assert model.data(model.node_index(node, 2), PROGRESS_ROLE) is None
+    model.clear()
+    assert model.labels == {}
+
+
+def test_progress_view_paint(wind):
+    """Test the delegate paints the progress bars."""
+    view = ProgressView()
+    view.barColor = QColor("#ff0000")
+    view.barBorderColor = QColor("#00ff00")
+    assert view.barColor == QColor("#ff0000")
+    assert view.barBorderColor == QColor("#00ff00")
+    model = view.progress_model
+    folder = model.add_node("folder", None)
+    node = model.add_node("file", 100, parent=folder)
+    model.advance(node, 50)
+    view.expandAll()
+    view.resize(400, 200)
+    view.show()
+    APP.processEvents()
+    image = view.viewport().grab().toImage()
+    view.hide()
+    colors = {
+        image.pixelColor(x, y).name()
+        for x in range(0, image.width(), 2)
+        for y in range(0, image.height(), 2)
+    }
+    assert "#ff0000" in colors
@@ -0,0 +1,143 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the zero copy file readers."""
+
+import os
+
+import pytest
+
+from tests import sparse_file, temp_file
+from torrentfileQt import reader
+
+
+@pytest.fixture(scope="module")
+def tfile():
+    """Test fixture for file readers."""
+    return temp_file(3 * reader.CHUNK_SIZE + 1234)
+
+
+def read_all(path, mode, offset, length):
+    """Join the chunks yielded by the reader."""
+    return b"".join(
+        bytes(chunk) for chunk in reader.read_chunks(path, offset, length, mode)
+    )
+
+
+@pytest.mark.parametrize("mode", list(reader.READERS))
+@pytest.mark.parametrize("offset", [0, 17, reader.CHUNK_SIZE])
+def test_reader_chunks(tfile, mode, offset):
+    """Test readers return the same contents as a plain read."""
+    with open(tfile, "rb") as fd:
+        fd.seek(offset)
+        expected = fd.read(reader.CHUNK_SIZE * 2)
+    assert read_all(tfile, mode, offset, reader.CHUNK_SIZE * 2) == expected
+
+
+@pytest.mark.parametrize("mode", list(reader.READERS))
+def test_reader_past_end(tfile, mode):
+    """Test readers stop at the end of the file."""
+    with open(tfile, "rb") as fd:
+        expected = fd.read()
+    assert read_all(tfile, mode, 0, len(expected) * 2) == expected
+
+
+def test_reader_open_mode(tfile):
+    """Test the reader type matches the requested mode."""
+    for mode, cls in [
+        (reader.MMAP, reader.MmapReader),
+        (reader.BUFFERED, reader.BufferedReader),
+        (reader.NOCACHE, reader.NoCacheReader),
+        (reader.DIRECT, (reader.DirectReader, reader.NoCacheReader)),
+    ]:
+        file_reader = reader.open_reader(tfile, mode)
+        assert isinstance(file_reader, cls)
+        file_reader.close()
+
+
+def test_reader_empty_file_fallback():
+    """Test empty files fall back to the buffered reader."""
+    path = temp_file(0)
+    file_reader = reader.open_reader(path, reader.MMAP)
+    assert isinstance(file_reader, reader.BufferedReader)
+    file_reader.close()
+
+
+def test_reader_zero_chunks():
+    """Test padding chunks are all zeros."""
+    length = reader.CHUNK_SIZE + 5
+    assert read_all(None, reader.MMAP, 0, length) == bytes(length)
+
+
+@pytest.mark.parametrize("mode", list(reader.READERS))
+def test_reader_sparse_holes(mode):
+    """Test holes in sparse files are yielded as zeros without reading."""
+    size = 8 * reader.CHUNK_SIZE
+    path = sparse_file(size, {3 * reader.CHUNK_SIZE + 5: 1000})
+    with open(path, "rb") as fd:
+        expected = fd.read()
+        regions = reader.data_ranges(fd.fileno(), 0, size)
+    assert read_all(path, mode, 0, size) == expected
+    assert regions[0][0] == 0 and regions[-1][1] == size
+    if len(regions) == 1:
+        pytest.skip("file system doesn't support holes")  # pragma: nocover
+    read = sum(
+        len(chunk)
+        for chunk in reader.read_chunks(path, 0, size, mode)
+        if not reader.is_zeros(chunk)
+    )
+    assert read == sum(end - start for start, end, data in regions if data)
+    assert read < reader.CHUNK_SIZE
+
+
+def test_reader_data_ranges_past_end():
+    """Test data ranges stop at the end of the file."""
+    path = sparse_file(reader.CHUNK_SIZE * 4, {0: 10})
+    with open(path, "rb") as fd:
+        regions = reader.data_ranges(fd.fileno(), 0, reader.CHUNK_SIZE * 8)
+    assert regions[-1][1] == reader.CHUNK_SIZE * 4
+
+
+def test_reader_direct_unaligned(tfile):
+    """Test direct reads starting and ending between aligned blocks."""
+    offset = reader.DIRECT_ALIGN * 3 + 5
+    with open(tfile, "rb") as fd:
+        fd.seek(offset)
+        expected = fd.read(reader.CHUNK_SIZE + 10)
+    result = read_all(tfile, reader.DIRECT, offset, reader.CHUNK_SIZE + 10)
+    assert result == expected
+
+
+def test_reader_nocache_keeps_cached():
+    """Test the nocache reader only drops the pages it brought in."""
+    size = 4 * reader.CHUNK_SIZE
+    path = temp_file(size)
+    with open(path, "rb+") as fd:
+        os.fsync(fd.fileno())
+        reader.advise(fd.fileno(), 0, 0, "POSIX_FADV_DONTNEED")
+        reader.advise(fd.fileno(), 0, 0, "POSIX_FADV_RANDOM")
+        fd.read(reader.CHUNK_SIZE)
+        before = reader.resident_pages(fd.fileno(), 0, size)
+    if before is None or all(before):
+        pytest.skip("page cache residency isn't available")  # pragma: nocover
+    cached = before.count(1)
+    assert read_all(path, reader.NOCACHE, 0, size)
+    with open(path, "rb") as fd:
+        after = reader.resident_pages(fd.fileno(), 0, size)
+    assert after[:cached] == before[:cached]
+    assert not any(after[cached:])
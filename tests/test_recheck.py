@@ -0,0 +1,272 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the recheck piece checker."""
+
+import os
+import shutil
+
+import pytest
+from torrentfile.recheck import Checker
+
+from tests import TempFileDirs, tempdir, torrent_versions
+from torrentfileQt import hasher, recheck
+from torrentfileQt.control import Cancelled, ControlToken
+from torrentfileQt.reader import BUFFERED, MMAP
+from torrentfileQt.recheck import (
+    SAMPLED,
+    SIZES,
+    PieceChecker,
+    PieceIndex,
+    plan_runs,
+    result_label,
+    sample_pieces,
+)
+
+
+@pytest.fixture(scope="module", params=torrent_versions())
+def ttorrent(request):
+    """Test fixture for the piece checker."""
+    dirname = tempdir(6, 2, 40000, [".r00", ".mp3", ".mkv", ".dat", ".zip"])
+    maker = request.param
+    torrent = maker(path=dirname, piece_length=2**14, progress=0)
+    outfile, _ = torrent.write(dirname + ".torrent")
+    TempFileDirs.paths.add(outfile)
+    return dirname, outfile
+
+
+def content_copy(dirname: str, suffix: str) -> str:
+    """Copy the content of a torrent, returning the search folder."""
+    copy = os.path.join(dirname + suffix, os.path.basename(dirname))
+    shutil.copytree(dirname, copy)
+    TempFileDirs.paths.add(os.path.dirname(copy))
+    return os.path.dirname(copy)
+
+
+@pytest.mark.parametrize("mode", [MMAP, BUFFERED])
+def test_recheck_complete(ttorrent, mode):
+    """Test every piece matches for complete content."""
+    dirname, metafile = ttorrent
+    checker = PieceChecker(Checker(metafile, dirname), reader=mode)
+    results = list(checker)
+    assert all(actual == expected for actual, expected, _, _ in results)
+    assert sum(size for _, _, _, size in results) == sum(checker.lengths)
+    assert checker.result == 100
+
+
+def test_recheck_missing_file(ttorrent):
+    """Test pieces of a missing file do not match."""
+    dirname, metafile = ttorrent
+    copy = os.path.join(dirname + "_copy", os.path.basename(dirname))
+    shutil.copytree(dirname, copy)
+    TempFileDirs.paths.add(os.path.dirname(copy))
+    checker = PieceChecker(Checker(metafile, os.path.dirname(copy)))
+    os.remove(checker.paths[1])
+    results = list(checker)
+    assert sum(size for _, _, _, size in results) == sum(checker.lengths)
+    assert 0 < checker.result < 100
+
+
+def test_recheck_workers(ttorrent, monkeypatch):
+    """Test a process pool produces the same results in the same order."""
+    dirname, metafile = ttorrent
+    monkeypatch.setattr(hasher, "TASK_SIZE", 2**15)
+    content = content_copy(dirname, "_workers")
+    os.remove(PieceChecker(Checker(metafile, content)).paths[2])
+    single = list(PieceChecker(Checker(metafile, content)))
+    checker = PieceChecker(Checker(metafile, content), workers=2)
+    assert list(checker) == single
+    assert 0 < checker.result < 100
+
+
+def test_recheck_cancelled(ttorrent):
+    """Test the checker stops between pieces once cancelled."""
+    dirname, metafile = ttorrent
+    token = ControlToken()
+    results = iter(PieceChecker(Checker(metafile, dirname), token=token))
+    next(results)
+    token.cancel()
+    with pytest.raises(Cancelled):
+        next(results)
+
+
+def test_recheck_piece_index():
+    """Test pieces are mapped to the files they cover."""
+    index = PieceIndex([5, 0, 3, 0, 0, 9], 4)
+    assert index.pieces == 5
+    assert index.spans(0) == [(0, 0, 4)]
+    assert index.spans(1) == [(0, 4, 1), (2, 0, 3)]
+    assert index.spans(2) == [(5, 0, 4)]
+    assert index.spans(4) == [(5, 8, 1)]
+    assert index.file_pieces(0) == range(0, 2)
+    assert index.file_pieces(1) == range(0)
+    assert index.file_pieces(5) == range(2, 5)
+    with pytest.raises(IndexError):
+        index.spans(5)
+
+
+def test_recheck_piece_index_completion():
+    """Test per file completion matches adding each piece's spans."""
+    lengths = [5, 0, 3, 40, 1, 0, 9]
+    index = PieceIndex(lengths, 4)
+    assert index.completion(bytearray([1] * index.pieces)) == lengths
+    matched = bytearray(index.pieces)
+    expected = [0] * len(lengths)
+    for number in reversed(range(0, index.pieces, 3)):
+        matched[number] = 1
+        for file, _, size in index.spans(number):
+            expected[file] += size
+    assert index.completion(matched) == expected
+
+
+def test_recheck_sample_pieces():
+    """Test samples are spread from the first to the last piece."""
+    assert sample_pieces(range(3, 13)) == [3, 6, 9, 12]
+    assert sample_pieces(range(2)) == [0, 1]
+    assert sample_pieces(range(0)) == []
+    assert result_label(True, SAMPLED) == "Passed (medium confidence)"
+    assert result_label(False, SIZES) == "Failed (sizes check)"
+
+
+def test_recheck_quick_check(ttorrent):
+    """Test size and sampled piece checks find missing and changed files."""
+    dirname, metafile = ttorrent
+    checker = PieceChecker(Checker(metafile, dirname))
+    assert checker.quick_check(sample=False) == {
+        i: (True, SIZES) for i in range(6)
+    }
+    assert checker.quick_check() == {i: (True, SAMPLED) for i in range(6)}
+    content = content_copy(dirname, "_quick")
+    checker = PieceChecker(Checker(metafile, content))
+    os.remove(checker.paths[0])
+    with open(checker.paths[5], "r+b") as fd:
+        first = fd.read(1)
+        fd.seek(0)
+        fd.write(bytes([first[0] ^ 1]))
+    results = checker.quick_check(sample=False)
+    assert results[0] == (False, SIZES)
+    assert all(results[i] == (True, SIZES) for i in range(1, 6))
+    results = checker.quick_check()
+    assert results[0] == (False, SIZES)
+    assert results[5] == (False, SAMPLED)
+    assert results[2] == results[3] == (True, SAMPLED)
+
+
+def test_recheck_selected_files(ttorrent):
+    """Test checking some files yields the same results for their pieces."""
+    dirname, metafile = ttorrent
+    content = content_copy(dirname, "_selected")
+    os.remove(PieceChecker(Checker(metafile, content)).paths[3])
+    full = list(PieceChecker(Checker(metafile, content)).iter_pieces())
+    checker = PieceChecker(Checker(metafile, content), files=[3, 1])
+    results = list(checker.iter_pieces())
+    if checker.checker.meta_version == 1:
+        pieces = set(checker.index.file_pieces(1))
+        pieces.update(checker.index.file_pieces(3))
+        expected = [item for item in full if item[0] in pieces]
+    else:
+        paths = {checker.paths[1], checker.paths[3]}
+        expected = [item for item in full if item[3] in paths]
+    assert results == expected
+    assert 0 < checker.result < 100
+
+
+def test_recheck_plan_runs():
+    """Test skipped pieces are cut out of the checked ranges."""
+    runs = [range(0, 10), range(12, 20)]
+    skipped = [range(2, 4), range(8, 14), range(19, 30)]
+    assert plan_runs(runs, skipped) == [
+        (range(0, 2), True),
+        (range(2, 4), False),
+        (range(4, 8), True),
+        (range(8, 10), False),
+        (range(12, 14), False),
+        (range(14, 19), True),
+        (range(19, 20), False),
+    ]
+    assert plan_runs(runs, []) == [(run, True) for run in runs]
+
+
+def test_recheck_skip_invalid(ttorrent, monkeypatch):
+    """Test missing and wrong sized files are only read in shared pieces."""
+    dirname, metafile = ttorrent
+    content = content_copy(dirname, "_invalid")
+    checker = PieceChecker(Checker(metafile, content))
+    os.remove(checker.paths[2])
+    with open(checker.paths[4], "r+b") as fd:
+        fd.truncate(checker.lengths[4] // 2)
+    read = []
+
+    def hash_v1_task(task, stats=None):
+        read.extend((span[0], span[2]) for span in task[0] if span[0])
+        return hasher.hash_v1_task(task, stats)
+
+    def hash_v2_task(task, stats=None):
+        read.append((task[0], task[2]))
+        return hasher.hash_v2_task(task, stats)
+
+    monkeypatch.setattr(recheck, "hash_v1_task", hash_v1_task)
+    monkeypatch.setattr(recheck, "hash_v2_task", hash_v2_task)
+    assert checker.wrong_sizes() == {2, 4}
+    results = list(checker.iter_pieces())
+    assert sum(item[4] for item in results) == sum(checker.lengths)
+    assert 0 < checker.result < 100
+    skipped = read[:]
+    read.clear()
+    unskipped = list(checker.iter_pieces(invalid=set()))
+    for result, full in zip(results, unskipped):
+        assert result == full or not result[1]
+    assert sum(size for _, size in skipped) < sum(size for _, size in read)
+    if checker.checker.meta_version == 1:
+        for index, actual, _, _, _ in results:
+            spans = checker.index.spans(index)
+            assert bool(actual) == any(i not in (2, 4) for i, _, _ in spans)
+    else:
+        assert checker.paths[4] not in {path for path, _ in skipped}
+        for _, actual, _, path, _ in results:
+            assert bool(actual) != (path in checker.paths[2:5:2])
+
+
+def test_recheck_known_pieces(ttorrent, monkeypatch):
+    """Test pieces known to match from an earlier check aren't read."""
+    dirname, metafile = ttorrent
+    read = []
+
+    def hash_v1_task(task, stats=None):
+        read.extend(span[2] for span in task[0] if span[0])
+        return hasher.hash_v1_task(task, stats)
+
+    def hash_v2_task(task, stats=None):
+        read.append(task[2])
+        return hasher.hash_v2_task(task, stats)
+
+    monkeypatch.setattr(recheck, "hash_v1_task", hash_v1_task)
+    monkeypatch.setattr(recheck, "hash_v2_task", hash_v2_task)
+    checker = PieceChecker(Checker(metafile, dirname))
+    full = list(checker.iter_pieces())
+    assert sum(read) == sum(checker.lengths)
+    known = {
+        number: bytearray(b"\x01") * len(checker.file_pieces(number))
+        for number in checker.files
+    }
+    known[0][0] = 0
+    read.clear()
+    checker = PieceChecker(Checker(metafile, dirname), known=known)
+    assert list(checker.iter_pieces()) == full
+    assert 0 < sum(read) <= checker.piece_length
+    assert checker.result == 100
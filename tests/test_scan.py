@@ -0,0 +1,124 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the background directory scan."""
+
+import os
+import threading
+
+import pytest
+from PySide6.QtCore import QThread
+from torrentfile import utils
+
+from tests import encode, switchTab, temp_file, tempdir, waitfor
+from torrentfileQt import createTab
+from torrentfileQt.scan import ScanCancelled, scan_tree
+from torrentfileQt.torrent import (
+    TorrentFile,
+    TorrentFileHybrid,
+    TorrentFileV2,
+    walk_tree,
+)
+
+
+@pytest.fixture
+def tdir():
+    """Test fixture with a fresh directory of files."""
+    return tempdir(4, 2, 50000, [".r00", ".mp3", ".mkv"])
+
+
+def test_scan_tree(tdir):
+    """Test the scan matches the file lists used by the creators."""
+    counts = []
+    result = scan_tree(tdir, lambda count, size: counts.append(count))
+    utils.filelist_total.cache.clear()
+    total, filelist = utils.filelist_total(tdir)
+    assert result.total == total
+    assert result.file_list() == filelist
+    assert result.tree_order() == walk_tree(tdir)
+    assert counts == list(range(1, len(filelist) + 1))
+
+
+def test_scan_file():
+    """Test scanning a single file."""
+    path = temp_file(2**15)
+    result = scan_tree(path)
+    assert result.total == os.path.getsize(path)
+    assert result.tree_order() == result.file_list() == [path]
+
+
+def test_scan_cancelled(tdir):
+    """Test a scan stops when it is cancelled."""
+    with pytest.raises(ScanCancelled):
+        scan_tree(tdir, cancelled=lambda: True)
+
+
+@pytest.mark.parametrize(
+    "creator", [TorrentFile, TorrentFileV2, TorrentFileHybrid]
+)
+def test_scan_reused(tdir, creator, monkeypatch):
+    """Test creating a torrent from a scan doesn't walk the tree again."""
+    kwargs = {"path": tdir, "piece_length": 2**14}
+    utils.filelist_total.cache.clear()
+    expected = encode(creator, **kwargs)
+    result = scan_tree(tdir)
+    utils.filelist_total.cache.clear()
+
+    def listdir(path):
+        raise AssertionError(path)
+
+    monkeypatch.setattr(os, "listdir", listdir)
+    assert encode(creator, scan=result, **kwargs) == expected
+
+
+def test_scan_create_tab(wind, tdir):
+    """Test the create tab scans the path and passes the result on."""
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    tab.setPath(tdir)
+    assert waitfor(10, tab.scan_thread.isFinished)
+    assert waitfor(10, tab.piece_length_combo.currentIndex)
+    scan = tab.path_scan(tdir).result
+    assert scan.path == tdir
+    assert scan.total == utils.path_size(tdir)
+    assert tab.path_scan(tdir + "x") is None
+
+
+def test_scan_submit_while_scanning(wind, tdir, monkeypatch):
+    """Test submitting during a scan leaves the wait to the job thread."""
+    release = threading.Event()
+    run = createTab.ScanThread.run
+
+    def blocked_run(thread):
+        release.wait(10)
+        run(thread)
+
+    monkeypatch.setattr(createTab.ScanThread, "run", blocked_run)
+    monkeypatch.setattr(createTab.TorrentFileCreator, "start", QThread.start)
+    tab = wind.tabs.createWidget
+    switchTab(wind.stack, tab)
+    tab.split_check.setChecked(False)
+    tab.setPath(tdir)
+    tab.submit_button.click()
+    job = tab.queue.jobs[-1]
+    assert tab.scan_thread.isRunning()
+    assert job.path == tdir and job.total == 0
+    release.set()
+    assert waitfor(10, lambda: job.status == createTab.COMPLETED)
+    assert job.total == utils.path_size(tdir)
+    assert os.path.exists(job.args["outfile"])
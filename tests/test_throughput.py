@@ -0,0 +1,89 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""Module for testing the recorded hashing throughput."""
+
+import json
+import os
+
+import pytest
+
+from tests import TempFileDirs, temp_file
+from torrentfileQt import throughput
+from torrentfileQt.throughput import ThroughputLog, mount_point
+
+
+@pytest.fixture
+def log_path():
+    """Test fixture with the path to a missing throughput record."""
+    path = os.path.join(TempFileDirs.tempdir, "throughput.json")
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def test_throughput_mount_point():
+    """Test the mount point is a parent of the path."""
+    path = temp_file(10)
+    mount = mount_point(path)
+    assert os.path.ismount(mount)
+    assert os.path.realpath(path).startswith(mount)
+
+
+def test_throughput_record(log_path):
+    """Test measurements are averaged and predict durations."""
+    path = temp_file(10)
+    log = ThroughputLog(log_path)
+    assert log.rate(path) is None
+    assert log.estimate(path, 2**30) is None
+    log.record(path, 2**28, 1)
+    assert ThroughputLog(log_path).rate(path) == 2**28
+    log.record(path, 2**28, 0.5)
+    expected = 2**28 + throughput.SMOOTHING * 2**28
+    assert ThroughputLog(log_path).rate(path) == expected
+    assert log.estimate(path, expected * 3) == 3
+    assert log.estimate(path, 0) is None
+
+
+def test_throughput_record_ignored(log_path):
+    """Test small or instant jobs aren't recorded."""
+    path = temp_file(10)
+    log = ThroughputLog(log_path)
+    log.record(path, throughput.MIN_BYTES - 1, 1)
+    log.record(path, throughput.MIN_BYTES, 0)
+    assert not os.path.exists(log_path)
+
+
+def test_throughput_record_merges(log_path):
+    """Test saving keeps measurements recorded by other instances."""
+    first, second = ThroughputLog(log_path), ThroughputLog(log_path)
+    with open(log_path, "wt", encoding="utf8") as fd:
+        json.dump({"/other": 5.0}, fd)
+    first.record(temp_file(10), 2**28, 1)
+    assert second.load()["/other"] == 5.0
+    assert len(second.load()) == 2
+
+
+def test_throughput_invalid(log_path):
+    """Test an unreadable record is treated as empty."""
+    with open(log_path, "wt", encoding="utf8") as fd:
+        fd.write("[1, 2")
+    assert ThroughputLog(log_path).rates == {}
+    with open(log_path, "wt", encoding="utf8") as fd:
+        fd.write("[1, 2]")
+    assert ThroughputLog(log_path).rates == {}
@@ -20,7 +20,7 @@
 
 from PySide6.QtCore import QPoint
 
-from tests import wind
+from tests import APP
 
 
 class MockMouseEvent:
@@ -28,7 +28,7 @@ class MockMouseEvent:
 
     def position(self):
         """Mock method for testing event."""
-        assert wind
+        assert APP.window
         return self
 
     @staticmethod
@@ -20,7 +20,7 @@
 
 import pytest
 
-from tests import switchTab, temp_file, tempdir, torrent_versions, wind
+from tests import APP, switchTab, temp_file, tempdir, torrent_versions
 from torrentfileQt import toolTab
 
 
@@ -32,7 +32,7 @@ class MockReturn:
 
 def mock_func(_):
     """Mock function for tests."""
-    assert wind
+    assert APP.window
     return MockReturn.value
 
 
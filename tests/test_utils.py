@@ -20,13 +20,13 @@
 
 import pytest
 
-from tests import wind
+from tests import APP
 from torrentfileQt import __main__, utils
 
 
 def test_fix():
     """Fix pytest warnings."""
-    assert wind
+    assert APP.window
 
 
 class MockPoint:
@@ -141,8 +141,7 @@ def test_utils_browse_no_torrent():
 
 def test_qss_parser():
     """Test style manager from utils module."""
-    themes = {
-        "test": """
+    themes = {"test": """
 QWidget {
     background-color: #000;
     color: #0AF;
@@ -182,8 +181,7 @@ QPushButton:hover {color: #080;}
 */
 QComboBox {
     border: 12px solid pink;
-}"""
-    }
+}"""}
     parser = utils.QssParser()
     collection = parser.parse(themes["test"])
     parser._compile()
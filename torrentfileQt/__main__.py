@@ -18,11 +18,22 @@
 ##############################################################################
 """Entry point for torrentfileQt."""
 
-from torrentfileQt import execute
+import multiprocessing
+import sys
+
+from torrentfileQt import batch, execute
 
 
 def main():
-    """Execute main program."""
+    """
+    Execute main program.
+
+    With `--batch jobs.json` torrents are created without starting the
+    GUI, see `torrentfileQt.batch`.
+    """
+    multiprocessing.freeze_support()  # pragma: nocover
+    if batch.batch_requested(sys.argv[1:]):  # pragma: nocover
+        sys.exit(batch.main(sys.argv[1:]))
     execute()  # pragma: nocover
 
 
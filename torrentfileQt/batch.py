@@ -0,0 +1,492 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Torrent creation without the GUI.
+
+The option handling and creation steps used by the create tab live
+here so they can also be run headless with `torrentfileqt --batch
+jobs.json`.  The jobs file holds a list of job objects, or an object with
+a `"jobs"` list and `"defaults"` applied to every job, using the same
+options as the create tab::
+
+    {
+        "defaults": {"version": "v2", "announce": ["http://tracker"]},
+        "jobs": [{"path": "/data/one"}, {"path": "/data/two"}]
+    }
+
+A job with a `"split"` option is replaced by one job for each immediate
+subdirectory of it's path, or for each entry matching the glob pattern
+given as the option's value, with each torrent saved next to it's entry.
+
+A JSON object with the timings and throughput of each job is written to
+stdout on it's own line as the job completes, followed by a summary.
+"""
+
+import argparse
+import errno
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+from torrentfileQt.cache import HashCache
+from torrentfileQt.checkpoint import Checkpoint, checkpoint_path
+from torrentfileQt.hasher import default_workers
+from torrentfileQt.pipeline import QUEUE_DEPTH
+from torrentfileQt.reader import MMAP, READERS
+from torrentfileQt.scan import scan_tree
+from torrentfileQt.throughput import ThroughputLog
+from torrentfileQt.torrent import (
+    TorrentFile,
+    TorrentFileHybrid,
+    TorrentFileV2,
+    TorrentFormats,
+)
+
+CREATORS = {
+    "v1": TorrentFile,
+    "v2": TorrentFileV2,
+    "hybrid": TorrentFileHybrid,
+    "all": TorrentFormats,
+}
+PROGRESS_INTERVAL = 5  # seconds between progress lines
+
+
+def build_args(options: dict) -> tuple:
+    """
+    Convert create tab options to torrent creator arguments.
+
+    Parameters
+    ----------
+    options : dict
+        `path`, `outfile`, `version`, `piece_length`, `private`,
+        `source`, `comment`, `announce`, `url_list`, `workers`, `cache`,
+        `reader`, `queue_depth` and `dedupe` options, tracker and web
+        seed lists can also be given as newline separated text.
+
+    Returns
+    -------
+    tuple
+        keyword arguments and the torrent creator class.
+
+    Raises
+    ------
+    ValueError
+        the version isn't one of `CREATORS` or the reader isn't one of
+        the `READERS`.
+    """
+    args = {}
+    if options.get("private"):
+        args["private"] = 1
+    for key in ["source", "comment"]:
+        if options.get(key):
+            args[key] = options[key]
+    for key in ["announce", "url_list"]:
+        urls = options.get(key) or []
+        if isinstance(urls, str):
+            urls = urls.split("\n")
+        urls = [i.strip() for i in urls if i]
+        if urls:
+            args[key] = urls
+    if options.get("outfile"):
+        args["outfile"] = os.path.realpath(options["outfile"])
+    if options.get("piece_length"):
+        args["piece_length"] = int(options["piece_length"])
+    args["workers"] = options.get("workers") or default_workers()
+    args["cache"] = bool(options.get("cache", True))
+    args["reader"] = options.get("reader") or MMAP
+    if args["reader"] not in READERS:
+        raise ValueError(f"unknown reader {args['reader']}")
+    args["queue_depth"] = int(options.get("queue_depth", QUEUE_DEPTH))
+    if options.get("path"):
+        args["path"] = options["path"]
+    version = options.get("version") or "v1"
+    if version not in CREATORS:
+        raise ValueError(f"unknown torrent version {version}")
+    if options.get("dedupe") and version in ("v2", "hybrid"):
+        args["dedupe"] = True
+    return args, CREATORS[version]
+
+
+def create_torrent(args: dict, creator, tracker=None, token=None) -> dict:
+    """
+    Scan, hash and write a torrent file.
+
+    Hashes are saved to the checkpoint if creation fails or is
+    interrupted, and reused when `args` contains `"resume": True`.  The
+    hashing duration is predicted from the throughput recorded for the
+    content's file system, which is updated once the torrent is written
+    with the bytes that were read from disk, leaving out the pieces found
+    in the cache or checkpoint, duplicate files and holes.
+
+    Parameters
+    ----------
+    args : dict
+        keyword arguments for the torrent creator, plus the `scan`,
+        `cache` and `resume` options.
+    creator : type
+        torrent creator class.
+    tracker : object
+        receives the progress of the `HashEngine`, it's `total` is set
+        to the size of the content once it has been scanned.
+    token : ControlToken
+        pause and cancel requests checked while scanning and hashing.
+
+    Returns
+    -------
+    dict
+        file count, size, bytes read, timings, predicted and measured
+        throughput, read ahead queue occupancy and bytes of duplicate
+        files that weren't read.
+    """
+    start = time.monotonic()
+    args = dict(args)
+    scan = args.pop("scan", None)
+    args = deepcopy(args)
+    log = ThroughputLog()
+    cache = HashCache() if args.pop("cache", False) else None
+    checkpoint = Checkpoint(checkpoint_path(args))
+    if args.pop("resume", False):
+        checkpoint.load()
+    try:
+        if scan is None:
+            cancelled = (lambda: token.cancelled) if token else None
+            scan = scan_tree(args["path"], cancelled=cancelled)
+        scanned = time.monotonic()
+        estimate = log.estimate(args["path"], scan.total)
+        if tracker is not None:
+            tracker.total = scan.total
+        torrent = creator(
+            tracker=tracker,
+            cache=cache,
+            checkpoint=checkpoint,
+            scan=scan,
+            token=token,
+            **args,
+        )
+        outfile, _ = torrent.write()
+    except BaseException:
+        checkpoint.save()
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+    checkpoint.remove()
+    end = time.monotonic()
+    hash_seconds = end - scanned
+    read = torrent.engine.occupancy.read
+    log.record(args["path"], read, hash_seconds)
+    return {
+        "path": args["path"],
+        "outfile": (
+            [str(i) for i in outfile]
+            if isinstance(outfile, list)
+            else str(outfile)
+        ),
+        "files": len(scan.sizes),
+        "bytes": scan.total,
+        "piece_length": torrent.piece_length,
+        "scan_seconds": round(scanned - start, 6),
+        "hash_seconds": round(hash_seconds, 6),
+        "seconds": round(end - start, 6),
+        "estimated_seconds": None if estimate is None else round(estimate, 3),
+        "read_bytes": read,
+        "throughput": int(read / hash_seconds) if hash_seconds else 0,
+        "queue_occupancy": round(torrent.engine.occupancy.ratio, 3),
+        "skipped_bytes": torrent.engine.skipped,
+    }
+
+
+def split_paths(path: str, pattern: str = None) -> list:
+    """
+    Return the entries of a directory that each get their own torrent.
+
+    Parameters
+    ----------
+    path : str
+        path to the parent directory.
+    pattern : str
+        glob pattern matched against the entries, defaults to every
+        immediate subdirectory.
+
+    Returns
+    -------
+    list
+        sorted paths of the entries.
+
+    Raises
+    ------
+    NotADirectoryError
+        path isn't a directory.
+    """
+    if not os.path.isdir(path):
+        raise NotADirectoryError(
+            errno.ENOTDIR, os.strerror(errno.ENOTDIR), path
+        )
+    if pattern:
+        return sorted(glob.glob(os.path.join(glob.escape(path), pattern)))
+    with os.scandir(path) as entries:
+        return sorted(entry.path for entry in entries if entry.is_dir())
+
+
+def split_jobs(jobs: list) -> list:
+    """
+    Replace each job with a `"split"` option by a job for every entry.
+
+    Parameters
+    ----------
+    jobs : list
+        option dictionaries for each job.
+
+    Returns
+    -------
+    list
+        option dictionaries without the `"split"` option.
+    """
+    expanded = []
+    for job in jobs:
+        split = job.get("split")
+        if not split:
+            expanded.append(job)
+            continue
+        pattern = split if isinstance(split, str) else None
+        options = {k: v for k, v in job.items() if k != "split"}
+        for path in split_paths(job["path"], pattern):
+            outfile = path.rstrip("\\/") + ".torrent"
+            expanded.append(dict(options, path=path, outfile=outfile))
+    return expanded
+
+
+def share_workers(budget: int, jobs: int) -> int:
+    """
+    Return the hashing processes of each job running at the same time.
+
+    Parameters
+    ----------
+    budget : int
+        hashing processes shared by the jobs.
+    jobs : int
+        number of jobs running at the same time.
+
+    Returns
+    -------
+    int
+        the share of each job, at least 1.
+    """
+    return max(1, budget // max(1, jobs))
+
+
+def load_jobs(path: str) -> list:
+    """
+    Read the options of each job from a jobs file.
+
+    Parameters
+    ----------
+    path : str
+        path to JSON jobs file.
+
+    Returns
+    -------
+    list
+        option dictionaries with the defaults applied and split jobs
+        expanded.
+    """
+    with open(path, "rt", encoding="utf8") as fd:
+        data = json.load(fd)
+    if isinstance(data, list):
+        data = {"jobs": data}
+    defaults = data.get("defaults", {})
+    return split_jobs([dict(defaults, **job) for job in data["jobs"]])
+
+
+class BatchProgress:
+    """
+    Progress tracker writing the percentage of a job to stderr.
+
+    Parameters
+    ----------
+    path : str
+        path to the job's content.
+    stream : TextIO
+        where progress lines are written.
+    """
+
+    def __init__(self, path: str, stream=sys.stderr):
+        """Construct the tracker."""
+        self.path = path
+        self.stream = stream
+        self.total = 0
+        self.done = 0
+        self.written = time.monotonic()
+
+    def prog_start(self, total: int, path: str):
+        """Progress started for a new file."""
+
+    def prog_update(self, amount: int):
+        """Add to the completed bytes and write the progress."""
+        self.done += amount
+        if time.monotonic() - self.written >= PROGRESS_INTERVAL:
+            percent = self.done * 100 // max(1, self.total)
+            self.stream.write(f"{self.path}: {percent}%\n")
+            self.stream.flush()
+            self.written = time.monotonic()
+
+    def prog_close(self):
+        """Progress stopped for the current file."""
+
+
+def run_job(options: dict, progress: bool = False) -> dict:
+    """
+    Create the torrent for a single job.
+
+    Parameters
+    ----------
+    options : dict
+        create tab options of the job.
+    progress : bool
+        write progress lines to stderr.
+
+    Returns
+    -------
+    dict
+        the job statistics, or the error if it failed.
+    """
+    path = options.get("path")
+    try:
+        args, creator = build_args(options)
+        args["resume"] = options.get("resume", True)
+        tracker = BatchProgress(path) if progress else None
+        stats = create_torrent(args, creator, tracker)
+    except Exception as err:
+        error = str(err) or type(err).__name__
+        return {"path": path, "status": "failed", "error": error}
+    return dict(stats, status="completed")
+
+
+def run_batch(jobs: list, concurrency: int = 1, progress=False, out=None):
+    """
+    Run every job, writing each result as a line of JSON.
+
+    Jobs without a `workers` option share the default number of hashing
+    processes between the jobs running at the same time.
+
+    Parameters
+    ----------
+    jobs : list
+        option dictionaries for each job.
+    concurrency : int
+        number of jobs run at the same time.
+    progress : bool
+        write progress lines to stderr.
+    out : TextIO
+        where results are written, defaults to stdout.
+
+    Returns
+    -------
+    dict
+        summary of the batch.
+    """
+    out = sys.stdout if out is None else out
+    start = time.monotonic()
+    workers = share_workers(default_workers(), min(concurrency, len(jobs)))
+    jobs = [dict(job, workers=job.get("workers") or workers) for job in jobs]
+    results = []
+    with ThreadPoolExecutor(max(1, concurrency)) as pool:
+        futures = [pool.submit(run_job, job, progress) for job in jobs]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    seconds = time.monotonic() - start
+    total = sum(i.get("bytes", 0) for i in results)
+    summary = {
+        "jobs": len(results),
+        "failed": sum(1 for i in results if i["status"] != "completed"),
+        "bytes": total,
+        "seconds": round(seconds, 6),
+        "throughput": int(total / seconds) if seconds else 0,
+    }
+    out.write(json.dumps({"summary": summary}) + "\n")
+    out.flush()
+    return summary
+
+
+def batch_requested(args: list) -> bool:
+    """
+    Return True if the command line asks for batch mode.
+
+    The option is parsed the same way as by `main`, so `--batch=JOBS` and
+    abbreviations of `--batch` select batch mode too.
+
+    Parameters
+    ----------
+    args : list
+        command line arguments.
+
+    Returns
+    -------
+    bool
+        a jobs file was given.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--batch")
+    options, _ = parser.parse_known_args(args)
+    return options.batch is not None
+
+
+def main(args: list = None) -> int:
+    """
+    Run a batch of jobs from the command line.
+
+    Parameters
+    ----------
+    args : list
+        command line arguments.
+
+    Returns
+    -------
+    int
+        exit status, 1 if any job failed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="torrentfileqt",
+        description="Create torrent files without starting the GUI.",
+    )
+    parser.add_argument(
+        "--batch", required=True, metavar="JOBS", help="JSON jobs file"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="number of jobs run at the same time",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="write job progress to stderr",
+    )
+    options = parser.parse_args(args)
+    jobs = load_jobs(options.batch)
+    summary = run_batch(jobs, options.concurrency, options.progress)
+    return 1 if summary["failed"] else 0
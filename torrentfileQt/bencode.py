@@ -0,0 +1,121 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Streaming bencode encoder for writing large meta files.
+
+`pyben.dump` encodes the whole meta dictionary into a single bytes object
+before writing it, so saving a torrent with a large `pieces` value or
+hundreds of thousands of files needs several times the memory of the
+meta data.  The encoder here yields the encoded data in small tokens and
+writes byte strings from their own buffers, so the only extra memory is
+the file's write buffer.  Dictionary keys are written in sorted order,
+comparing them as raw byte strings.
+"""
+
+import os
+
+from pyben import EncodeError
+
+
+def _key(key) -> bytes:
+    """Return a dictionary key as the bytes written to the file."""
+    if isinstance(key, str):
+        return key.encode("utf-8")
+    if isinstance(key, (bytes, bytearray, memoryview)):
+        return bytes(key)
+    raise EncodeError(key)
+
+
+def iterencode(value):
+    """
+    Yield the bencoded representation of a value in pieces.
+
+    Parameters
+    ----------
+    value : Any
+        str, int, bytes-like, list, tuple or dict with str or bytes keys.
+
+    Yields
+    ------
+    bytes
+        encoded tokens, byte string values are yielded unchanged.
+
+    Raises
+    ------
+    EncodeError
+        the value contains a type that can't be bencoded.
+    """
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        size = value.nbytes if isinstance(value, memoryview) else len(value)
+        yield b"%d:" % size
+        yield value
+    elif isinstance(value, int):
+        yield b"i%de" % value
+    elif isinstance(value, (list, tuple)):
+        yield b"l"
+        for item in value:
+            yield from iterencode(item)
+        yield b"e"
+    elif isinstance(value, dict):
+        yield b"d"
+        items = sorted(
+            ((_key(k), v) for k, v in value.items()), key=lambda i: i[0]
+        )
+        for key, item in items:
+            yield b"%d:" % len(key)
+            yield key
+            yield from iterencode(item)
+        yield b"e"
+    else:
+        raise EncodeError(value)
+
+
+def dump(value, path: str):
+    """
+    Bencode a value and write it to a file.
+
+    The data is written to a temporary file next to `path` which replaces
+    it once the value has been encoded, so a value that can't be encoded
+    leaves an existing file unchanged.
+
+    Parameters
+    ----------
+    value : Any
+        the value to encode.
+    path : str
+        path to the output file.
+
+    Raises
+    ------
+    EncodeError
+        the value contains a type that can't be bencoded.
+    """
+    path = os.fspath(path)
+    temp = path + ".tmp"
+    try:
+        with open(temp, "wb") as fd:
+            for token in iterencode(value):
+                fd.write(token)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
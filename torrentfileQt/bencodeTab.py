@@ -33,6 +33,7 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from torrentfileQt import bencode
 from torrentfileQt.utils import (
     browse_folder,
     browse_torrent,
@@ -124,11 +125,11 @@ class BencodeEditWidget(QWidget):
             path = torrent.data(0)
             meta = self.get_children(torrent)
             try:
-                pyben.dump(meta, path)
+                bencode.dump(meta, path)
                 self.window().statusBar().showMessage(
                     "Success: changes have been saved."
                 )
-            except [pyben.EncodeError, TypeError]:  # pragma: nocover
+            except (pyben.EncodeError, TypeError):  # pragma: nocover
                 self.window().statusBar().showMessage(
                     "Failed: Improper bencode formatting", 8000
                 )
@@ -0,0 +1,530 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Persistent caches of piece hashes and recheck results.
+
+Hashes used when creating torrent files are stored in a SQLite database
+in the user's config directory.  Every entry is stamped with the size,
+modification time and inode of the files it was calculated from, so
+entries for files that have changed are never used.  v2 entries hold the
+piece layer of an entire file, v1 entries hold a single piece keyed by
+the file and offset it starts at.
+
+The pieces that matched in a full recheck are recorded in a second
+database as a bitmap for each file, keyed by the torrent's info hash and
+the file's path in the torrent and stamped the same way, so pieces of
+unchanged files aren't hashed again.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from hashlib import sha1  # nosec
+
+MAX_SIZE = 2**28  # 256MiB
+ROW_SIZE = 64  # approximate storage overhead for each entry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    piece_length INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    stamp TEXT NOT NULL,
+    value BLOB NOT NULL,
+    extra BLOB,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (kind, path, piece_length, offset)
+);
+CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used);
+"""
+
+MAX_RESULTS = 2**20  # files kept in the recheck cache
+
+RESULTS_SCHEMA = """
+DROP TABLE IF EXISTS verified;
+CREATE TABLE IF NOT EXISTS results (
+    infohash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    stamp TEXT NOT NULL,
+    pieces BLOB NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (infohash, path)
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+
+def row_size(row: tuple) -> int:
+    """Return the approximate storage size of a cache entry."""
+    return len(row[1]) + len(row[5]) + len(row[6] or b"") + ROW_SIZE
+
+
+def pack_bits(flags) -> bytes:
+    """
+    Pack a flag for each piece into a bitmap.
+
+    Parameters
+    ----------
+    flags : Sequence
+        truthy for each piece that matched, in order.
+
+    Returns
+    -------
+    bytes
+        one bit for each piece, most significant bit first.
+    """
+    bitmap = bytearray(-(-len(flags) // 8))
+    for index, flag in enumerate(flags):
+        if flag:
+            bitmap[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bitmap)
+
+
+def unpack_bits(bitmap: bytes, count: int) -> bytearray:
+    """
+    Unpack a bitmap made by `pack_bits`.
+
+    Parameters
+    ----------
+    bitmap : bytes
+        packed flags.
+    count : int
+        number of pieces, missing bits are unset.
+
+    Returns
+    -------
+    bytearray
+        1 for each piece that matched, 0 otherwise.
+    """
+    flags = bytearray(count)
+    for index in range(min(count, len(bitmap) * 8)):
+        flags[index] = (bitmap[index >> 3] >> (7 - (index & 7))) & 1
+    return flags
+
+
+def config_dir() -> str:
+    """
+    Return the directory used for storing application data.
+
+    Returns
+    -------
+    str
+        path to the torrentfileQt config directory.
+    """
+    if sys.platform == "win32":  # pragma: nocover
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get(
+            "XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config")
+        )
+    return os.path.join(base, "torrentfileQt")
+
+
+def cache_path() -> str:
+    """
+    Return the default location of the hash cache database.
+
+    Returns
+    -------
+    str
+        path to the database file.
+    """
+    return os.path.join(config_dir(), "hashes.db")
+
+
+def results_path() -> str:
+    """
+    Return the default location of the recheck result database.
+
+    Returns
+    -------
+    str
+        path to the database file.
+    """
+    return os.path.join(config_dir(), "rechecks.db")
+
+
+def file_stamp(path: str) -> str:
+    """
+    Return the size, modification time and inode of a file.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+
+    Returns
+    -------
+    str
+        the stamp stored with each entry.
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
+
+
+class HashCache:
+    """
+    SQLite backed cache of piece hashes with least recently used eviction.
+
+    Parameters
+    ----------
+    path : str
+        path to the database file, defaults to `cache_path()`.
+    max_size : int
+        approximate maximum number of bytes stored in the cache.
+    """
+
+    def __init__(self, path: str = None, max_size: int = MAX_SIZE):
+        """Open the cache database."""
+        self.path = path if path else cache_path()
+        self.max_size = max_size
+        self.stamps = {}
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Evict old entries and close the database."""
+        self.evict()
+        self.conn.close()
+
+    def stamp(self, path: str) -> str:
+        """
+        Return the size, modification time and inode of a file.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+
+        Returns
+        -------
+        str
+            the stamp stored with each entry.
+        """
+        if path not in self.stamps:
+            self.stamps[path] = file_stamp(path)
+        return self.stamps[path]
+
+    def key(self, path: str) -> str:
+        """Return the normalized path used as the cache key."""
+        return os.path.realpath(path)
+
+    def get_file(self, path: str, piece_length: int, hybrid: bool):
+        """
+        Return the cached piece layer hashes for an unchanged file.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        piece_length : int
+            size of torrent pieces.
+        hybrid : bool
+            the sha1 piece hashes are also required.
+
+        Returns
+        -------
+        tuple
+            `(layer_hashes, pieces)` or None if the file isn't cached.
+        """
+        row = self.conn.execute(
+            "SELECT stamp, value, extra FROM hashes WHERE kind = 'v2' "
+            "AND path = ? AND piece_length = ? AND offset = 0",
+            (self.key(path), piece_length),
+        ).fetchone()
+        if not row or row[0] != self.stamp(path):
+            return None
+        if hybrid and row[2] is None:
+            return None
+        self.touch([("v2", self.key(path), piece_length, 0)])
+        return row[1], row[2]
+
+    def put_file(self, path: str, piece_length: int, layers, pieces):
+        """
+        Store the piece layer hashes for a file.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        piece_length : int
+            size of torrent pieces.
+        layers : bytes
+            concatenated piece layer hashes.
+        pieces : bytes
+            concatenated sha1 piece hashes or None.
+        """
+        self.put_rows(
+            [
+                (
+                    "v2",
+                    self.key(path),
+                    piece_length,
+                    0,
+                    self.stamp(path),
+                    layers,
+                    pieces,
+                )
+            ]
+        )
+
+    def piece_stamp(self, spans: list) -> tuple:
+        """
+        Return the key and stamp for a v1 piece.
+
+        Parameters
+        ----------
+        spans : list
+            `(path, offset, length)` spans making up the piece.
+
+        Returns
+        -------
+        tuple
+            path and offset the piece starts at and the stamp of every
+            file the piece contains.
+        """
+        digest = sha1()  # nosec
+        start = None
+        for path, offset, length in spans:
+            if path is None:
+                digest.update(f"|{length}".encode("utf8"))
+                continue
+            if start is None:
+                start = (self.key(path), offset)
+            stamp = f"|{path}:{offset}:{length}:{self.stamp(path)}"
+            digest.update(stamp.encode("utf8", "surrogateescape"))
+        return start, digest.hexdigest()
+
+    def get_pieces(self, pieces: list, piece_length: int) -> list:
+        """
+        Return the cached sha1 hash for each v1 piece.
+
+        Parameters
+        ----------
+        pieces : list
+            span lists for each piece.
+        piece_length : int
+            size of torrent pieces.
+
+        Returns
+        -------
+        list
+            the cached digest or None for each piece.
+        """
+        rows = {}
+        found, used = [], []
+        for spans in pieces:
+            (path, offset), stamp = self.piece_stamp(spans)
+            if path not in rows:
+                rows[path] = {
+                    row[0]: row[1:]
+                    for row in self.conn.execute(
+                        "SELECT offset, stamp, value FROM hashes WHERE "
+                        "kind = 'v1' AND path = ? AND piece_length = ?",
+                        (path, piece_length),
+                    )
+                }
+            row = rows[path].get(offset)
+            if row and row[0] == stamp:
+                found.append(row[1])
+                used.append(("v1", path, piece_length, offset))
+            else:
+                found.append(None)
+        self.touch(used)
+        return found
+
+    def put_pieces(self, pieces: list, digests: list, piece_length: int):
+        """
+        Store the sha1 hashes for v1 pieces.
+
+        Parameters
+        ----------
+        pieces : list
+            span lists for each piece.
+        digests : list
+            sha1 digest of each piece.
+        piece_length : int
+            size of torrent pieces.
+        """
+        rows = []
+        for spans, digest in zip(pieces, digests):
+            (path, offset), stamp = self.piece_stamp(spans)
+            rows.append(("v1", path, piece_length, offset, stamp, digest, None))
+        self.put_rows(rows)
+
+    def put_rows(self, rows: list):
+        """Insert or replace entries in the cache."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?,?,?,?,?,?,?,?,?)",
+                [row + (row_size(row), now) for row in rows],
+            )
+
+    def touch(self, keys: list):
+        """Mark entries as recently used."""
+        if not keys:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE hashes SET used = ? WHERE kind = ? AND path = ? "
+                "AND piece_length = ? AND offset = ?",
+                [(now,) + key for key in keys],
+            )
+
+    def total_size(self) -> int:
+        """Return the approximate number of bytes stored in the cache."""
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM hashes"
+        ).fetchone()[0]
+
+    def evict(self):
+        """Remove the least recently used entries exceeding `max_size`."""
+        excess = self.total_size() - self.max_size
+        if excess <= 0:
+            return
+        rowids = []
+        cursor = self.conn.execute(
+            "SELECT rowid, size FROM hashes ORDER BY used, rowid"
+        )
+        for rowid, size in cursor:
+            rowids.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        cursor.close()
+        with self.conn:
+            self.conn.executemany("DELETE FROM hashes WHERE rowid = ?", rowids)
+
+
+class ResultCache:
+    """
+    SQLite backed record of the pieces that matched in a full recheck.
+
+    Parameters
+    ----------
+    path : str
+        path to the database file, defaults to `results_path()`.
+    max_entries : int
+        maximum number of files recorded, the least recently used are
+        evicted first.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = MAX_RESULTS):
+        """Open the result database."""
+        self.path = path if path else results_path()
+        self.max_entries = max_entries
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        with self.conn:
+            self.conn.executescript(RESULTS_SCHEMA)
+
+    def close(self):
+        """Evict old entries and close the database."""
+        self.evict()
+        self.conn.close()
+
+    def pieces(self, infohash: str, files: dict) -> dict:
+        """
+        Return the matched pieces of files that haven't changed since.
+
+        Parameters
+        ----------
+        infohash : str
+            info hash of the torrent.
+        files : dict
+            path in the torrent to the path on disk of each file.
+
+        Returns
+        -------
+        dict
+            path in the torrent of each unchanged file to the bitmap of
+            it's pieces, see `unpack_bits`.
+        """
+        rows = self.conn.execute(
+            "SELECT path, stamp, pieces FROM results WHERE infohash = ?",
+            (infohash,),
+        ).fetchall()
+        found = {}
+        for relpath, stamp, bitmap in rows:
+            path = files.get(relpath)
+            if path is None:
+                continue
+            try:
+                if file_stamp(path) == stamp:
+                    found[relpath] = bitmap
+            except OSError:
+                continue
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE results SET used = ? WHERE infohash = ? "
+                    "AND path = ?",
+                    [(now, infohash, relpath) for relpath in found],
+                )
+        return found
+
+    def put(self, infohash: str, files: dict):
+        """
+        Record the pieces of each file that matched in a full recheck.
+
+        Parameters
+        ----------
+        infohash : str
+            info hash of the torrent.
+        files : dict
+            path in the torrent to the path on disk and piece bitmap of
+            each file.
+        """
+        now = time.time()
+        rows = []
+        for relpath, (path, bitmap) in files.items():
+            try:
+                stamp = file_stamp(path)
+            except OSError:
+                continue
+            rows.append((infohash, relpath, stamp, bitmap, now))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?,?,?,?,?)", rows
+            )
+
+    def evict(self):
+        """Remove the least recently used entries over `max_entries`."""
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count[0] - self.max_entries
+        if excess <= 0:
+            return
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM "
+                "results ORDER BY used, rowid LIMIT ?)",
+                (excess,),
+            )
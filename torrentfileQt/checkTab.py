@@ -18,7 +18,6 @@
 ##############################################################################
 """Module for the Check Tab Widget."""
 
-import math
 import os
 import re
 from pathlib import Path
@@ -26,19 +25,35 @@ from pathlib import Path
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QTextOption
 from PySide6.QtWidgets import (
+    QCheckBox,
+    QComboBox,
     QHBoxLayout,
     QLabel,
     QPlainTextEdit,
-    QProgressBar,
     QPushButton,
+    QSpinBox,
     QSplitter,
-    QTreeWidget,
-    QTreeWidgetItem,
     QVBoxLayout,
     QWidget,
 )
 from torrentfile.recheck import Checker
 
+from torrentfileQt.cache import ResultCache, pack_bits, unpack_bits
+from torrentfileQt.control import Cancelled, ControlToken
+from torrentfileQt.hasher import default_workers
+from torrentfileQt.progress import ROOT, ProgressView
+from torrentfileQt.reader import MMAP, READERS
+from torrentfileQt.recheck import (
+    CACHED,
+    CHECK_MODES,
+    FULL,
+    SIZES,
+    TARGETED,
+    PieceChecker,
+    PieceIndex,
+    info_hash,
+    result_label,
+)
 from torrentfileQt.utils import (
     DropGroupBox,
     browse_files,
@@ -103,7 +118,47 @@ class CheckWidget(QWidget):
 
         self.checkButton = ReCheckButton("Check", parent=self)
         self.checkButton.ready.connect(self.populate_tree)
-        self.layout.addWidget(self.checkButton)
+        self.pauseButton = QPushButton("Pause", parent=self)
+        self.pauseButton.setObjectName("RecheckPauseButton")
+        self.pauseButton.setCheckable(True)
+        self.pauseButton.toggled.connect(self.treeWidget.pause)
+        self.cancelButton = QPushButton("Cancel", parent=self)
+        self.cancelButton.setObjectName("RecheckCancelButton")
+        self.cancelButton.clicked.connect(self.treeWidget.stop)
+        self.readerCombo = QComboBox(parent=self)
+        self.readerCombo.setObjectName("RecheckReaderCombo")
+        self.readerCombo.setToolTip("How the content is read from disk.")
+        for mode, text in READERS.items():
+            self.readerCombo.addItem(text, mode)
+        self.modeCombo = QComboBox(parent=self)
+        self.modeCombo.setObjectName("RecheckModeCombo")
+        self.modeCombo.setToolTip(
+            "Quick checks compare file sizes and a sample of pieces before "
+            "or instead of hashing every piece."
+        )
+        for mode, text in CHECK_MODES.items():
+            self.modeCombo.addItem(text, mode)
+        self.forceCheck = QCheckBox("Force Full", parent=self)
+        self.forceCheck.setObjectName("RecheckForceCheck")
+        self.forceCheck.setToolTip(
+            "Hash files that passed an earlier check and haven't changed."
+        )
+        self.workersSpin = QSpinBox(parent=self)
+        self.workersSpin.setObjectName("RecheckWorkersSpin")
+        self.workersSpin.setRange(1, max(64, default_workers()))
+        self.workersSpin.setValue(default_workers())
+        self.workersSpin.setToolTip(
+            "Number of processes used to hash the torrent contents."
+        )
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.checkButton)
+        buttons.addWidget(self.pauseButton)
+        buttons.addWidget(self.cancelButton)
+        buttons.addWidget(self.modeCombo)
+        buttons.addWidget(self.forceCheck)
+        buttons.addWidget(self.readerCombo)
+        buttons.addWidget(self.workersSpin)
+        self.layout.addLayout(buttons)
 
     def setPath(self, path: str):
         """
@@ -139,22 +194,79 @@ class CheckWidget(QWidget):
             path to the content
         """
         base = self.content_group.getPath()
-        self.treeWidget.recheck_torrent(metafile, content, base)
+        self.pauseButton.setChecked(False)
+        reader = self.readerCombo.currentData()
+        workers = self.workersSpin.value()
+        mode = self.modeCombo.currentData()
+        force = self.forceCheck.isChecked()
+        self.treeWidget.recheck_torrent(
+            metafile, content, base, reader, workers, mode, force
+        )
 
 
 class RecheckThread(QThread):
-    """Piece Hasher class for iterating through captured torrent pieces."""
+    """
+    Piece Hasher class for iterating through captured torrent pieces.
+
+    The check can be paused, resumed and cancelled from the GUI thread,
+    requests are applied between pieces while no files are open.  Pieces
+    are hashed by a pool of `workers` processes and each result is sent
+    to the tree as it arrives.
+
+    The `mode` is one of the `CHECK_MODES`.  Quick modes compare file
+    sizes and optionally a sample of pieces, the targeted mode follows
+    them with a full check of the files that failed.  The result of each
+    file is sent with the tier of the last check it went through.
+
+    Missing and wrong sized files fail before any piece is hashed and
+    are only read where they share a v1 piece with another file.
+
+    The pieces of each file that matched in a full check are recorded in
+    the `ResultCache`.  While a file is unchanged those pieces aren't
+    hashed again and a file whose pieces all matched is reported as
+    verified, unless `force` is set.
+    """
 
     path_ready = Signal(str, int)
     progress_update = Signal(str, int)
+    file_checked = Signal(str, bool, str)
     logMsg = Signal(str)
 
-    def __init__(self, metafile, content):
+    def __init__(
+        self,
+        metafile,
+        content,
+        reader=MMAP,
+        workers=1,
+        mode=FULL,
+        force=False,
+    ):
         """Construct for PieceHasher class."""
         super().__init__()
         self.metafile = metafile
         self.content = content
-        self.current = 0
+        self.reader = reader
+        self.workers = workers
+        self.mode = mode
+        self.force = force
+        self.selected = set()
+        self.index = None
+        self.matched = bytearray()
+        self.known = {}
+        self.checked = {}
+        self.token = ControlToken()
+
+    def pause(self):
+        """Stop checking before the next piece."""
+        self.token.pause()
+
+    def resume(self):
+        """Continue a paused check."""
+        self.token.resume()
+
+    def cancel(self):
+        """Stop checking before the next piece."""
+        self.token.cancel()
 
     def get_path_information(self, fileinfo):
         """Add tree widgets items to tree widget."""
@@ -166,50 +278,177 @@ class RecheckThread(QThread):
             length = val["length"]
             self.path_ready.emit(relpath, length)
 
-    def iter_hashes(self, checker):
-        """Iterate through hashes and compare to torrentfile hashes."""
-        for actual, expected, path, size in checker.iter_hashes():
+    def iter_hashes(self, checker, files=None) -> list:
+        """
+        Iterate through hashes and compare to torrentfile hashes.
+
+        The pieces of each file that matched are kept in `checked`.
+        Returns the indexes of the files that passed.
+        """
+        pieces = PieceChecker(
+            checker,
+            self.reader,
+            self.token,
+            workers=self.workers,
+            files=files,
+            known=self.known,
+        )
+        self.index = pieces.index
+        self.matched = bytearray(self.index.pieces)
+        self.selected = set(pieces.files)
+        numbers = {self.pathlist[number]: number for number in pieces.files}
+        self.checked = {
+            number: bytearray(len(pieces.file_pieces(number)))
+            for number in pieces.files
+        }
+        invalid = pieces.wrong_sizes()
+        failed = invalid & self.selected
+        for number in sorted(failed):
+            self.file_checked.emit(self.pathlist[number], False, SIZES)
+        if failed:
+            self.logMsg.emit(
+                f"{len(failed)} missing or wrong sized files won't be hashed"
+            )
+        verified = {}
+        for index, actual, expected, path, size in pieces.iter_pieces(invalid):
             if checker.meta_version == 1:
-                self.process_v1_hash(actual, expected, size)
+                self.process_v1_hash(index, actual, expected)
+            elif actual == expected:
+                self.progress_update.emit(path, size)
+                verified[path] = verified.get(path, 0) + size
+                self.checked[numbers[path]][index] = 1
+        if checker.meta_version == 1:
+            completion = self.index.completion(self.matched)
+            verified = {self.pathlist[i]: completion[i] for i in pieces.files}
+            for number in pieces.files:
+                run = self.index.file_pieces(number)
+                self.checked[number] = self.matched[run.start : run.stop]
+        passed = []
+        for number in pieces.files:
+            if number in failed:
+                continue
+            path = self.pathlist[number]
+            ok = verified.get(path, 0) == pieces.lengths[number]
+            self.file_checked.emit(path, ok, FULL)
+            if ok:
+                passed.append(number)
+        return passed
+
+    def quick_check(self, checker, files=None) -> list:
+        """
+        Check file sizes and sampled pieces, then the failed files.
+
+        Returns the indexes of the files that passed a full check.
+        """
+        pieces = PieceChecker(
+            checker,
+            self.reader,
+            self.token,
+            workers=self.workers,
+            files=files,
+            known=self.known,
+        )
+        results = pieces.quick_check(sample=self.mode != SIZES)
+        for number, (passed, tier) in results.items():
+            self.file_checked.emit(self.pathlist[number], passed, tier)
+        failed = [number for number, (ok, _) in results.items() if not ok]
+        self.logMsg.emit(
+            f"Quick check: {len(results) - len(failed)} of {len(results)} "
+            "files passed"
+        )
+        if self.mode == TARGETED and failed:
+            return self.iter_hashes(checker, failed)
+        return []
+
+    def check_files(self, checker):
+        """Check the files and record their matching pieces in the cache."""
+        self.token.check()
+        files = {
+            os.path.relpath(path, self.root): path for path in self.pathlist
+        }
+        infohash = info_hash(checker.info)
+        cache = ResultCache()
+        try:
+            cached = {}
+            if not self.force:
+                cached = cache.pieces(infohash, files)
+            remaining = self.check_cached(checker, files, cached)
+            if self.mode == FULL:
+                self.iter_hashes(checker, remaining)
             else:
-                if actual == expected:
-                    self.progress_update.emit(path, size)
-                else:
-                    self.progress_update.emit(path, size)  # pragma: nocover
+                self.quick_check(checker, remaining)
+            relpaths = list(files)
+            cache.put(
+                infohash,
+                {
+                    relpaths[number]: (self.pathlist[number], pack_bits(flags))
+                    for number, flags in self.checked.items()
+                },
+            )
+        finally:
+            cache.close()
 
-    def process_v1_hash(self, actual, expected, size):
+    def check_cached(self, checker, files: dict, cached: dict) -> list:
         """
-        Process the hashes provided by the checker.
+        Report the files verified by an earlier check.
+
+        The matched pieces of the other unchanged files are kept in
+        `known`.  Returns the indexes of the files that still need
+        checking.
         """
-        while size > 0:
-            if self.current >= len(self.pathlist):
-                return  # pragma: nocover
-            current = self.pathlist[self.current]
-            current_length = self.fileinfo.get(current)["length"]
-            if current_length == 0:
-                self.current += 1
-                continue
-            if size > current_length:
-                size -= current_length
-                self.fileinfo[current]["length"] = 0
-                if actual == expected:
-                    self.progress_update.emit(current, current_length)
+        lengths = [checker.fileinfo[i]["length"] for i in range(len(files))]
+        index = PieceIndex(lengths, checker.piece_length)
+        remaining, verified = [], 0
+        for number, relpath in enumerate(files):
+            length = lengths[number]
+            if checker.meta_version == 1:
+                count = len(index.file_pieces(number))
             else:
-                if actual == expected:
-                    self.progress_update.emit(current, size)
-                self.fileinfo[current]["length"] -= size
-                size = 0
+                count = -(-length // checker.piece_length)
+            flags = unpack_bits(cached.get(relpath, b""), count)
+            if relpath in cached and all(flags):
+                path = files[relpath]
+                self.progress_update.emit(path, length)
+                self.file_checked.emit(path, True, CACHED)
+                verified += 1
+                continue
+            if any(flags):
+                self.known[number] = flags
+            remaining.append(number)
+        if verified:
+            self.logMsg.emit(
+                f"{verified} unchanged files verified by an earlier check"
+            )
+        return remaining
+
+    def process_v1_hash(self, index, actual, expected):
+        """
+        Report the parts of each file covered by a matching piece.
+
+        Pieces are located with the `PieceIndex`, so results can be
+        processed in any order.
+        """
+        if actual != expected:
+            return
+        self.matched[index] = 1
+        for number, _, size in self.index.spans(index):
+            if number in self.selected:
+                self.progress_update.emit(self.pathlist[number], size)
 
     def run(self):
         """Start thread process of checking torrent file."""
         Checker.register_callback(self.logMsg.emit)
-        checker = Checker(self.metafile, self.content)
-        self.root = os.path.dirname(checker.root)
-        fileinfo = checker.fileinfo
-        self.pathlist = checker.paths
-        self.fileinfo = {v["path"]: v for v in fileinfo.values()}
-        self.get_path_information(fileinfo)
-        self.iter_hashes(checker)
+        try:
+            checker = Checker(self.metafile, self.content)
+            self.root = os.path.dirname(checker.root)
+            fileinfo = checker.fileinfo
+            self.pathlist = checker.paths
+            self.get_path_information(fileinfo)
+            self.check_files(checker)
+        except Cancelled:
+            self.logMsg.emit("Recheck cancelled")
+        finally:
+            Checker.register_callback(None)
 
 
 class ReCheckButton(QPushButton):
@@ -245,6 +484,7 @@ class ReCheckButton(QPushButton):
                     "Error: Torrent File cannot be a directory.", 8000
                 )
             else:
+                parent.treeWidget.stop()
                 parent.treeWidget.clear()
                 parent.textEdit.clear()
                 self.ready.emit(metafile, content)
@@ -369,7 +609,7 @@ class LogTextEdit(QPlainTextEdit):
         return hint
 
 
-class TreeWidget(QTreeWidget):
+class TreeWidget(ProgressView):
     """
     Tree Widget for the `Check` tab.
 
@@ -387,17 +627,9 @@ class TreeWidget(QTreeWidget):
         """Construct for Tree Widget."""
         super().__init__(parent=parent)
         self.setObjectName("checkTree")
-        self.setColumnCount(2)
         self.setIndentation(12)
-        header = self.header()
-        header.setSizeAdjustPolicy(header.SizeAdjustPolicy.AdjustToContents)
-        header.setSectionResizeMode(0, header.ResizeMode.ResizeToContents)
-        header.setStretchLastSection(True)
-        self.setHeaderLabels(["Path", "Progress"])
         self.setHeaderHidden(False)
-        self.rootitem = self.invisibleRootItem()
-        self.rootitem.setExpanded(True)
-        self.progbars = []
+        self.progress_model.set_columns(["Path", "Progress", "Result"])
         self.thread = None
         self.icons = {
             "video": get_icon("video"),
@@ -408,70 +640,76 @@ class TreeWidget(QTreeWidget):
         }
         self.registry = {}
 
-    def recheck_torrent(self, metafile: str, content: str, base: str):
+    def recheck_torrent(
+        self,
+        metafile: str,
+        content: str,
+        base: str,
+        reader: str = MMAP,
+        workers: int = 1,
+        mode: str = FULL,
+        force: bool = False,
+    ):
         """
         Set information needed during compare process.
         """
         self.base = os.path.dirname(base)
-        self.thread = RecheckThread(metafile, content)
+        self.stop()
+        self.thread = RecheckThread(
+            metafile, content, reader, workers, mode, force
+        )
         self.thread.logMsg.connect(self.logMsg.emit)
         self.thread.path_ready.connect(self.setup_path_item)
         self.thread.progress_update.connect(self.update_progress)
-        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.file_checked.connect(self.set_result)
         self.thread.start()
 
+    def stop(self):
+        """Cancel a running check and wait for it's thread to exit."""
+        if self.thread is not None and self.thread.isRunning():
+            self.thread.cancel()
+            self.thread.wait()
+
+    def pause(self, paused: bool):
+        """Pause or resume the running check."""
+        if self.thread is not None and self.thread.isRunning():
+            if paused:
+                self.thread.pause()
+            else:
+                self.thread.resume()
+
     def clear(self):
         """Remove any objects from Tree Widget."""
-        super().clear()
+        self.progress_model.clear()
         self.registry = {}
         self.root = None
 
-    def new_item(self, text, icon, parent):
+    def new_item(self, text, icon, parent, size=None):
         """
         Add information on file.
         """
-        item = QTreeWidgetItem()
-        item.setText(0, text)
-        item.setIcon(0, icon)
-        parent.addChild(item)
-        parent.setExpanded(True)
-        return item
+        node = self.progress_model.add_node(text, size, icon, parent)
+        self.expand(self.progress_model.node_index(parent))
+        return node
 
     def setup_path_item(self, path, size):
         """Add branch to tree."""
         parts = list(Path(path).parts)
-        root = self.rootitem
         if not parts:
             return  # pragma: nocover
-        part = parts.pop(0)
-        subpath = part
-        while subpath in self.registry:
-            part = parts.pop(0)
-            root = subpath
-            subpath = os.path.join(subpath, part)
-        root = root if root == self.rootitem else self.registry[root]
-        while parts:
-            item = self.new_item(part, self.icons["folder"], root)
-            self.registry[subpath] = item
-            root = item
-            part = parts.pop(0)
-            subpath = os.path.join(subpath, part)
+        root = ROOT
+        subpath = None
+        for part in parts[:-1]:
+            subpath = os.path.join(subpath, part) if subpath else part
+            if subpath not in self.registry:
+                self.registry[subpath] = self.new_item(
+                    part, self.icons["folder"], root
+                )
+            root = self.registry[subpath]
         fileicon = self.match_suffix_to_icon(Path(path))
-        item = self.new_item(part, fileicon, root)
-        self.registry[subpath] = item
-        progressBar = QProgressBar(self)
-        if size < 1 << 30:
-            progressBar._total = size
-            progressBar._divisor = 1
-            progressBar._max = size
-        else:  # pragma: nocover
-            progressBar._total = size
-            progressBar._divisor = 1 << 10
-            progressBar._max = progressBar._total // progressBar._divisor
-        progressBar.setRange(0, progressBar._max - 1)
-        item.progbar = progressBar
-        self.progbars.append(progressBar)
-        self.setItemWidget(item, 1, progressBar)
+        self.registry[os.path.join(*parts)] = self.new_item(
+            parts[-1], fileicon, root, size
+        )
 
     def match_suffix_to_icon(self, path):
         """Match the file suffix extension to icon."""
@@ -492,11 +730,15 @@ class TreeWidget(QTreeWidget):
         Update the progress bar.
         """
         relpath = os.path.relpath(path, self.base)
-        item = self.registry[relpath]
-        prog = self.itemWidget(item, 1)
-        value = prog.value()
-        divisor = prog._divisor
-        increment = math.ceil(amount / divisor)
-        if value + increment > prog._max:
-            increment -= prog._max - value + increment  # pragma: nocover
-        prog.setValue(value + increment)
+        node = self.registry.get(relpath)
+        if node is not None:
+            self.progress_model.advance(node, amount)
+
+    def set_result(self, path: str, passed: bool, tier: str):
+        """
+        Show the outcome of checking a file.
+        """
+        relpath = os.path.relpath(path, self.base)
+        node = self.registry.get(relpath)
+        if node is not None:
+            self.progress_model.set_label(node, result_label(passed, tier))
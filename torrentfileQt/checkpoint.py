@@ -0,0 +1,293 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Checkpoints for resuming interrupted torrent creation.
+
+While hashing, the completed piece hashes are periodically appended to
+a binary sidecar file next to the output torrent, and a small JSON
+header listing the files being hashed and where each file's hashes are
+stored is rewritten.  Each save only writes the hashes completed since
+the one before it.  A later run can continue from the saved hashes as
+long as none of the files have changed size or modification time.
+"""
+
+import json
+import os
+import time
+
+INTERVAL = 5  # seconds between saves
+SUFFIX = ".resume"
+DATA_SUFFIX = ".data"
+
+
+def checkpoint_path(args: dict) -> str:
+    """
+    Return the path of the sidecar file for a torrent creation job.
+
+    Parameters
+    ----------
+    args : dict
+        keyword arguments for the torrent creator.
+
+    Returns
+    -------
+    str
+        path to the checkpoint file.
+    """
+    outfile = args.get("outfile")
+    if not outfile:
+        outfile = str(args["path"]).rstrip("\\/") + ".torrent"
+    return outfile + SUFFIX
+
+
+def file_stats(paths: list) -> list:
+    """
+    Return the path, size and modification time of each file.
+
+    Parameters
+    ----------
+    paths : list
+        file paths.
+
+    Returns
+    -------
+    list
+        `[path, size, mtime]` lists.
+    """
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append([path, stat.st_size, stat.st_mtime_ns])
+    return stats
+
+
+def extent(data: bytes, offset: int, length: int) -> bytes:
+    """
+    Return a range of bytes from the data file.
+
+    Parameters
+    ----------
+    data : bytes
+        contents of the data file.
+    offset : int
+        start of the range.
+    length : int
+        size of the range.
+
+    Returns
+    -------
+    bytes
+        the stored hashes.
+
+    Raises
+    ------
+    ValueError
+        the data file is shorter than the header says.
+    """
+    value = data[offset : offset + length]
+    if offset < 0 or len(value) != length:
+        raise ValueError("checkpoint data is truncated")
+    return value
+
+
+class Checkpoint:
+    """
+    Hashing state saved to a sidecar file.
+
+    Parameters
+    ----------
+    path : str
+        path to the checkpoint file.
+    interval : float
+        minimum number of seconds between saves.
+    """
+
+    def __init__(self, path: str, interval: float = INTERVAL):
+        """Construct the checkpoint."""
+        self.path = path
+        self.data_path = path + DATA_SUFFIX
+        self.interval = interval
+        self.state = {}
+        self.pieces = bytearray()
+        self.saved = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        """Forget what has been written to the data file."""
+        self.size = 0
+        self.stored = 0
+        self.chunks = []
+        self.extents = {}
+        self.unsaved = []
+
+    def load(self) -> bool:
+        """
+        Read the saved state from the checkpoint file.
+
+        Returns
+        -------
+        bool
+            True if a checkpoint was found.
+        """
+        try:
+            with open(self.path, "rt", encoding="utf8") as fd:
+                state = json.load(fd)
+            with open(self.data_path, "rb") as fd:
+                data = fd.read()
+            chunks, extents = state["pieces"], state["hashes"]
+            pieces = bytearray()
+            for offset, length in chunks:
+                pieces += extent(data, offset, length)
+            state["hashes"] = {
+                path: {key: extent(data, *i) for key, i in saved.items()}
+                for path, saved in extents.items()
+            }
+            ends = [sum(i) for i in chunks]
+            ends += [sum(i) for j in extents.values() for i in j.values()]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return False
+        del state["pieces"]
+        self.state = state
+        self.pieces = pieces
+        self.reset()
+        self.size = max(ends, default=0)
+        self.stored = len(pieces)
+        self.chunks = chunks
+        self.extents = extents
+        return True
+
+    def is_current(self) -> bool:
+        """
+        Check none of the saved files have changed.
+
+        Returns
+        -------
+        bool
+            True if the saved hashes can be reused.
+        """
+        files = self.state.get("files")
+        if not files:
+            return False
+        try:
+            return file_stats([i[0] for i in files]) == files
+        except OSError:
+            return False
+
+    def begin(self, kind: str, piece_length: int, paths: list):
+        """
+        Start hashing, discarding saved state that doesn't match the job.
+
+        Parameters
+        ----------
+        kind : str
+            the kind of hashes being calculated.
+        piece_length : int
+            size of torrent pieces.
+        paths : list
+            the files being hashed.
+        """
+        job = {
+            "kind": kind,
+            "piece length": piece_length,
+            "files": file_stats(paths),
+        }
+        if any(self.state.get(key) != value for key, value in job.items()):
+            self.state = {**job, "hashes": {}}
+            self.pieces = bytearray()
+            self.reset()
+
+    def get_file(self, path: str):
+        """
+        Return the saved layer hashes and sha1 pieces of a file.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+
+        Returns
+        -------
+        tuple
+            `(layer_hashes, pieces)` or None if the file wasn't completed.
+        """
+        saved = self.state.get("hashes", {}).get(path)
+        if saved is None:
+            return None
+        return saved["layers"], saved.get("pieces")
+
+    def add_file(self, path: str, layers: bytes, pieces: bytes):
+        """
+        Record the hashes of a completed file.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        layers : bytes
+            concatenated piece layer hashes.
+        pieces : bytes
+            concatenated sha1 piece hashes or None.
+        """
+        saved = {"layers": layers}
+        if pieces is not None:
+            saved["pieces"] = pieces
+        self.state.setdefault("hashes", {})[path] = saved
+        self.unsaved.append(path)
+        self.update()
+
+    def update(self):
+        """Save the checkpoint if the interval has passed."""
+        if time.monotonic() - self.saved >= self.interval:
+            self.save()
+
+    def save(self):
+        """Append the new hashes to the data file and write the header."""
+        if not self.state:
+            return
+        mode = "r+b" if os.path.exists(self.data_path) else "wb"
+        with open(self.data_path, mode) as fd:
+            fd.seek(self.size)
+            pieces = self.pieces[self.stored :]
+            if pieces:
+                if self.chunks and sum(self.chunks[-1]) == self.size:
+                    self.chunks[-1][1] += len(pieces)
+                else:
+                    self.chunks.append([self.size, len(pieces)])
+                self.size += fd.write(pieces)
+                self.stored = len(self.pieces)
+            for path in self.unsaved:
+                extents = {}
+                for key, value in self.state["hashes"][path].items():
+                    extents[key] = [self.size, len(value)]
+                    self.size += fd.write(value)
+                self.extents[path] = extents
+            self.unsaved = []
+            fd.truncate()
+        state = dict(self.state, pieces=self.chunks, hashes=self.extents)
+        temp = self.path + ".tmp"
+        with open(temp, "wt", encoding="utf8") as fd:
+            json.dump(state, fd)
+        os.replace(temp, self.path)
+        self.saved = time.monotonic()
+
+    def remove(self):
+        """Delete the checkpoint header and data files."""
+        for path in (self.path, self.data_path):
+            if os.path.exists(path):
+                os.remove(path)
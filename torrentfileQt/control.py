@@ -0,0 +1,72 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Cooperative pause, resume and cancel requests for hashing threads.
+
+The GUI thread changes the state of a `ControlToken` and the hashing
+thread calls `check` between units of work, blocking while paused and
+raising `Cancelled` once cancelled.
+"""
+
+import threading
+
+
+class Cancelled(Exception):
+    """Raised in the hashing thread when it's work is cancelled."""
+
+
+class ControlToken:
+    """Shared pause and cancel state of a hashing job."""
+
+    def __init__(self):
+        """Construct the token in the running state."""
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.cancelled = False
+
+    @property
+    def paused(self) -> bool:
+        """Return True if the job is paused."""
+        return not self.resumed.is_set()
+
+    def pause(self):
+        """Block the hashing thread at it's next check."""
+        self.resumed.clear()
+
+    def resume(self):
+        """Continue a paused job."""
+        self.resumed.set()
+
+    def cancel(self):
+        """Stop the hashing thread at it's next check."""
+        self.cancelled = True
+        self.resumed.set()
+
+    def check(self):
+        """
+        Wait while paused and stop if cancelled.
+
+        Raises
+        ------
+        Cancelled
+            the job was cancelled.
+        """
+        self.resumed.wait()
+        if self.cancelled:
+            raise Cancelled
@@ -22,12 +22,14 @@ Tab Widget containing all controls for creating a new .torrent file.
 User must provide the path to the directory containing the what the
 .torrent file will be created from.
 """
-import os
-from copy import deepcopy
+
+import time
+from collections import deque
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import QObject, Qt, QThread, QTimer, Signal
 from PySide6.QtWidgets import (
+    QAbstractItemView,
     QCheckBox,
     QComboBox,
     QFileDialog,
@@ -36,19 +38,32 @@ from PySide6.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QMessageBox,
     QPlainTextEdit,
-    QProgressBar,
     QPushButton,
     QRadioButton,
+    QSpinBox,
     QSplitter,
-    QTableWidget,
-    QTableWidgetItem,
+    QTreeWidget,
+    QTreeWidgetItem,
     QVBoxLayout,
     QWidget,
 )
-from torrentfile.torrent import TorrentFile, TorrentFileHybrid, TorrentFileV2
-from torrentfile.utils import path_piece_length
+from torrentfile.utils import get_piece_length, humanize_bytes
 
+from torrentfileQt.batch import (
+    build_args,
+    create_torrent,
+    share_workers,
+    split_paths,
+)
+from torrentfileQt.checkpoint import Checkpoint, checkpoint_path
+from torrentfileQt.control import Cancelled, ControlToken
+from torrentfileQt.hasher import default_workers
+from torrentfileQt.progress import ProgressView
+from torrentfileQt.reader import READERS
+from torrentfileQt.scan import ScanCancelled, scan_tree
+from torrentfileQt.throughput import ThroughputLog
 from torrentfileQt.utils import (
     DropGroupBox,
     browse_files,
@@ -56,6 +71,15 @@ from torrentfileQt.utils import (
     get_icon,
 )
 
+PROGRESS_INTERVAL = 0.05  # seconds between progress batches
+RATE_SAMPLES = 10  # job table refreshes used to measure throughput
+QUEUED = "Queued"
+RUNNING = "Running"
+PAUSED = "Paused"
+COMPLETED = "Completed"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
 
 class CreateWidget(QWidget):
     """
@@ -78,6 +102,8 @@ class CreateWidget(QWidget):
         """
         super().__init__(parent=parent)
         self.setObjectName("createTab")
+        self.scan_thread = None
+        self.split_thread = None
         self.setAcceptDrops(True)
         self.setAttribute(Qt.WA_StyledBackground, True)
         self.centralLayout = QVBoxLayout(self)
@@ -92,17 +118,7 @@ class CreateWidget(QWidget):
         self.centralLayout.addWidget(mainLabel)
         self.layout = QVBoxLayout(self.centralWidget)
 
-        self.path_group = DropGroupBox(parent=self)
-        self.path_group.setObjectName("CreatePathGroup")
-        self.path_group.setTitle("Content")
-        self.path_group.setLabelText("drag & drop file/folder here or ...")
-        self.path_dir_button = BrowseDirButton(parent=self)
-        self.path_dir_button.folderSelected.connect(self.setPath)
-        self.path_file_button = BrowseFileButton(parent=self)
-        self.path_file_button.fileSelected.connect(self.setPath)
-        self.path_group.addButton(self.path_dir_button)
-        self.path_group.addButton(self.path_file_button)
-        self.path_group.pathSelected.connect(self.setPath)
+        self._build_path_controls()
 
         versionBox = QGroupBox(self)
         versionBox.setObjectName("CreateVersionBox")
@@ -114,8 +130,25 @@ class CreateWidget(QWidget):
         self.v1button.setChecked(True)
         self.v2button = QRadioButton("v2", parent=self)
         self.hybridbutton = QRadioButton("v1+2 (hybrid)", parent=self)
+        self.allbutton = QRadioButton("v1, v2 and hybrid", parent=self)
+        self.allbutton.setToolTip(
+            "Create a torrent file of each version from a single read of "
+            "the contents."
+        )
         self.piece_length_combo = ComboBox.piece_length(parent=self)
         self.private = QCheckBox("Private", parent=self)
+        self.cache_check = QCheckBox("Cache Hashes", parent=self)
+        self.cache_check.setChecked(True)
+        self.cache_check.setToolTip(
+            "Reuse piece hashes of files that haven't changed since the "
+            "last time they were hashed."
+        )
+        self.dedupe_check = QCheckBox("Skip Duplicates", parent=self)
+        self.dedupe_check.setToolTip(
+            "Hash files with identical contents once, for v2 and hybrid "
+            "torrents.  Files with matching samples are compared in "
+            "full."
+        )
 
         versionBox.setToolTip(
             "These controls may be ignored if you do not"
@@ -126,8 +159,13 @@ class CreateWidget(QWidget):
         layout0.addWidget(self.v1button, 0, 0)
         layout0.addWidget(self.v2button, 1, 0)
         layout0.addWidget(self.hybridbutton, 2, 0)
+        layout0.addWidget(self.allbutton, 3, 0)
         layout0.addWidget(self.private, 0, 1)
+        layout0.addWidget(self.cache_check, 0, 2)
+        layout0.addWidget(self.dedupe_check, 0, 3)
         layout0.addWidget(piece_length_box, 1, 1, 2, 1)
+        self._build_split_controls(layout0)
+        self._build_worker_controls(layout0)
 
         vlayout4 = QVBoxLayout(piece_length_box)
         vlayout4.addWidget(self.piece_length_combo)
@@ -195,10 +233,7 @@ class CreateWidget(QWidget):
         self.submit_button.dataCollected.connect(self.write_torrent)
         self.submit_button.setObjectName("CreateSubmitButton")
 
-        self.bottomCentral = QWidget()
-        self.bottomLayout = QVBoxLayout(self.bottomCentral)
-        self.progress_tree = ProgressTable(self)
-        self.bottomLayout.addWidget(self.progress_tree)
+        self._build_queue_controls()
         self.layout.addLayout(hlayout0)
         self.layout.addWidget(output_label)
         self.layout.addLayout(hlayout3)
@@ -211,39 +246,347 @@ class CreateWidget(QWidget):
         self.splitter.addWidget(self.bottomCentral)
         self.centralLayout.addWidget(self.splitter)
 
+    def _build_path_controls(self):
+        """Build the content selection group."""
+        self.path_group = DropGroupBox(parent=self)
+        self.path_group.setObjectName("CreatePathGroup")
+        self.path_group.setTitle("Content")
+        self.path_group.setLabelText("drag & drop file/folder here or ...")
+        self.path_dir_button = BrowseDirButton(parent=self)
+        self.path_dir_button.folderSelected.connect(self.setPath)
+        self.path_file_button = BrowseFileButton(parent=self)
+        self.path_file_button.fileSelected.connect(self.setPath)
+        self.path_group.addButton(self.path_dir_button)
+        self.path_group.addButton(self.path_file_button)
+        self.path_group.pathSelected.connect(self.setPath)
+        self.path_group.accept_many = True
+        self.path_group.pathsSelected.connect(self.queue_paths)
+
+    def _build_split_controls(self, layout: QGridLayout):
+        """Add the controls creating a torrent for each subfolder."""
+        self.split_check = QCheckBox("Split Subfolders", parent=self)
+        self.split_check.setToolTip(
+            "Create a torrent for each subfolder of the selected folder, "
+            "saved next to it."
+        )
+        self.split_pattern = QLineEdit(parent=self)
+        self.split_pattern.setPlaceholderText("Glob pattern (optional)")
+        self.split_pattern.setToolTip(
+            "Create a torrent for each entry matching the pattern instead "
+            "of each subfolder."
+        )
+        layout.addWidget(self.split_check, 3, 1)
+        layout.addWidget(self.split_pattern, 3, 2, 1, 2)
+
+    def _build_worker_controls(self, layout: QGridLayout):
+        """Add the hashing process, concurrent job and reader controls."""
+        workers_box = QGroupBox(self)
+        workers_box.setObjectName("CreateWorkers")
+        workers_box.setTitle("Hashing Processes")
+        self.workers_spin = QSpinBox(parent=self)
+        self.workers_spin.setRange(1, max(64, default_workers()))
+        self.workers_spin.setValue(default_workers())
+        self.workers_spin.setToolTip(
+            "Number of processes used to hash the torrent contents, shared "
+            "by the jobs running at the same time."
+        )
+        layout.addWidget(workers_box, 1, 2, 2, 1)
+
+        jobs_box = QGroupBox(self)
+        jobs_box.setObjectName("CreateJobs")
+        jobs_box.setTitle("Concurrent Jobs")
+        self.jobs_spin = QSpinBox(parent=self)
+        self.jobs_spin.setRange(1, 16)
+        self.jobs_spin.setToolTip(
+            "Number of torrents created at the same time."
+        )
+        layout.addWidget(jobs_box, 1, 3, 2, 1)
+
+        reader_box = QGroupBox(self)
+        reader_box.setObjectName("CreateReader")
+        reader_box.setTitle("Disk Reads")
+        self.reader_combo = ComboBox.reader_mode(parent=self)
+        self.reader_combo.setToolTip(
+            "Drop From Cache and Direct I/O keep hashing large content from "
+            "evicting the data cached for other programs."
+        )
+        layout.addWidget(reader_box, 1, 4, 2, 1)
+
+        for box, widget in [
+            (workers_box, self.workers_spin),
+            (jobs_box, self.jobs_spin),
+            (reader_box, self.reader_combo),
+        ]:
+            QVBoxLayout(box).addWidget(widget)
+
+    def _build_queue_controls(self):
+        """Build the job queue, it's table and buttons and the progress."""
+        self.queue = JobQueue(self)
+        self.queue.jobStarted.connect(self.job_started)
+        self.jobs_spin.valueChanged.connect(self.queue.set_limit)
+        self.job_table = JobTable(self.queue, self)
+        jobs_layout = QHBoxLayout()
+        for text, action in [
+            ("Move Up", lambda job: self.queue.move(job, -1)),
+            ("Move Down", lambda job: self.queue.move(job, 1)),
+            ("Pause", self.queue.pause),
+            ("Resume", self.queue.resume),
+            ("Cancel", self.queue.cancel),
+        ]:
+            button = QPushButton(text, parent=self)
+            button.setObjectName("CreateJobButton")
+            button.clicked.connect(
+                lambda _=None, action=action: self.job_action(action)
+            )
+            jobs_layout.addWidget(button)
+
+        self.bottomCentral = QWidget()
+        self.bottomLayout = QVBoxLayout(self.bottomCentral)
+        self.progress_tree = ProgressTable(self)
+        self.bottomLayout.addWidget(self.job_table)
+        self.bottomLayout.addLayout(jobs_layout)
+        self.bottomLayout.addWidget(self.progress_tree)
+
     def setPath(self, path: str):
-        """Set the path of the torrent content."""
-        piece_length = path_piece_length(path)
+        """
+        Set the path of the torrent content.
+
+        The content is scanned in the background and the piece length is
+        chosen once the total size is known.
+        """
+        self.path_group.setPath(path)
+        self.piece_length_combo.setCurrentIndex(0)
+        self.output_path_edit.setText(path + ".torrent")
+        self.stop_scan()
+        self.scan_thread = ScanThread(path)
+        self.scan_thread.scanned.connect(self.updateScanStatus)
+        self.scan_thread.finished.connect(self.scan_finished)
+        self.scan_thread.start()
+
+    def stop_scan(self):
+        """Cancel a running scan and wait for it's thread to exit."""
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.requestInterruption()
+            self.scan_thread.wait()
+
+    def split_path(self, path: str, pattern: str):
+        """
+        List the entries of path in the background and queue their jobs.
+
+        Parameters
+        ----------
+        path : str
+            path to the parent directory.
+        pattern : str
+            glob pattern matched against the entries, or an empty string
+            for every immediate subdirectory.
+        """
+        if not path:
+            QMessageBox.warning(
+                self, "Split Mode", "Select a directory to split first."
+            )
+            return
+        if self.split_thread is not None and self.split_thread.isRunning():
+            return
+        self.split_thread = ScanThread(path, split=pattern)
+        self.split_thread.finished.connect(self.split_finished)
+        self.split_thread.start()
+
+    def split_finished(self):
+        """Queue a job for each entry, or show why there are none."""
+        thread = self.split_thread
+        if thread.error is not None:
+            QMessageBox.warning(
+                self,
+                "Split Mode",
+                f"{thread.path} can't be split: {thread.error.strerror}",
+            )
+        elif not thread.entries:
+            QMessageBox.warning(
+                self, "Split Mode", f"No entries were found in {thread.path}"
+            )
+        else:
+            self.queue_paths(thread.entries)
+
+    def path_scan(self, path: str):
+        """
+        Return the background scan of path, which may still be running.
+
+        Parameters
+        ----------
+        path : str
+            path to the torrent content.
+
+        Returns
+        -------
+        ScanThread
+            the scan thread or None if path wasn't scanned.
+        """
+        thread = self.scan_thread
+        if thread is None or thread.path != path:
+            return None
+        return thread
+
+    def updateScanStatus(self, count: int, size: int):
+        """Show the running totals of the content scan."""
+        self.window().statusBar().showMessage(
+            f"Scanning: {count} files, {humanize_bytes(size)}"
+        )
+
+    def scan_finished(self):
+        """Select the piece length once the content scan is complete."""
+        result = self.scan_thread.result
+        if result is None:
+            return
+        count = len(result.sizes)
+        message = f"Scanned: {count} files, {humanize_bytes(result.total)}"
+        estimate = ThroughputLog().estimate(result.path, result.total)
+        if estimate is not None:
+            message += f", estimated time {format_eta(estimate)}"
+        self.window().statusBar().showMessage(message, 3000)
+        if self.piece_length_combo.currentIndex():
+            return
+        piece_length = get_piece_length(result.total)
         if piece_length < (2**20):
             val = f"{piece_length//(2**10)} KiB"
         else:
             val = f"{piece_length//(2**20)} MiB"  # pragma: nocover
-        self.path_group.setPath(path)
         self.piece_length_combo.setValue(val)
-        self.output_path_edit.setText(path + ".torrent")
 
     def write_torrent(self, args, creator):
         """
         Start the torrent creator.
+
+        If an earlier attempt at creating the same torrent was interrupted
+        the user is offered to resume from it's checkpoint.
+        """
+        checkpoint = Checkpoint(checkpoint_path(args))
+        if checkpoint.load() and checkpoint.is_current():
+            answer = QMessageBox.question(
+                self,
+                "Resume",
+                "An unfinished checkpoint was found for this torrent.\n"
+                "Resume hashing from the checkpoint?",
+            )
+            args["resume"] = answer == QMessageBox.StandardButton.Yes
+        self.queue.add(args, creator)
+        self.job_table.refresh()
+
+    def queue_paths(self, paths: list):
+        """
+        Add a job for each path using the current options.
+
+        Each torrent is saved next to it's content and unfinished
+        checkpoints are resumed without asking.
+
+        Parameters
+        ----------
+        paths : list
+            paths to torrent contents.
         """
-        self._thread = TorrentFileCreator(args, creator)
-        self._thread.created.connect(self.updateStatusBarEnd)
-        self._thread.prog_start_signal.connect(self.progress_tree.prog_start)
-        self._thread.prog_update_signal.connect(self.progress_tree.prog_update)
-        self._thread.start()
+        for path in paths:
+            args, creator = self.submit_button.collect()
+            args["path"] = path
+            args["outfile"] = path.rstrip("\\/") + ".torrent"
+            args["resume"] = True
+            self.queue.add(args, creator)
+        self.job_table.refresh()
+
+    def job_started(self, job):
+        """Connect the progress signals of a job that has started."""
+        job.thread.created.connect(self.updateStatusBarEnd)
+        job.thread.progress_signal.connect(self.progress_tree.prog_batch)
+
+    def shutdown(self):
+        """Cancel the content scan and every job, waiting for them to exit."""
+        self.stop_scan()
+        if self.split_thread is not None:
+            self.split_thread.wait()
+        self.queue.shutdown()
+
+    def job_action(self, action):
+        """Apply a queue action to the selected jobs."""
+        for job in self.job_table.selected_jobs():
+            action(job)
+        self.job_table.refresh()
 
     def updateStatusBarEnd(self):
         """Update the status bar when torrent creation is complete."""
-        self.window().statusBar().showMessage("Completed", 3000)
-        self._thread.deleteLater()
+        message = "Completed"
+        stats = getattr(self.sender(), "stats", None)
+        if stats and stats.get("skipped_bytes"):
+            skipped = humanize_bytes(stats["skipped_bytes"])
+            message += f", {skipped} of duplicate files skipped"
+        self.window().statusBar().showMessage(message, 3000)
+
+
+class ScanThread(QThread):
+    """
+    Scan the torrent content in the background.
+
+    Running totals of the number of files and their size are sent at
+    most once every `PROGRESS_INTERVAL` seconds, and the completed
+    `ScanResult` is kept so the creator doesn't walk the tree again.
+    In split mode the entries of the directory are listed instead.
+
+    Parameters
+    ----------
+    path : str
+        path to file or directory.
+    split : str
+        glob pattern of the entries to list for split mode, an empty
+        string for every immediate subdirectory.  default = None
+    """
+
+    scanned = Signal(int, int)
+
+    def __init__(self, path: str, split: str = None):
+        """Construct the scan thread."""
+        super().__init__()
+        self.path = path
+        self.split = split
+        self.result = None
+        self.entries = None
+        self.error = None
+        self.emitted = time.monotonic()
+
+    def update(self, count: int, size: int):
+        """Send the running totals if the interval has passed."""
+        if time.monotonic() - self.emitted >= PROGRESS_INTERVAL:
+            self.scanned.emit(count, size)
+            self.emitted = time.monotonic()
+
+    def run(self):
+        """Walk the content tree, or list it's entries in split mode."""
+        if self.split is not None:
+            try:
+                self.entries = split_paths(self.path, self.split)
+            except OSError as err:
+                self.error = err
+            return
+        try:
+            self.result = scan_tree(
+                self.path, self.update, self.isInterruptionRequested
+            )
+        except (ScanCancelled, OSError):
+            self.result = None
 
 
 class TorrentFileCreator(QThread):
     """
     Torrentfile creation class.
 
-    Takes arguments provided by the GUI, and uses the internal
-    torrentfile cli to create the torrent.
+    Takes arguments provided by the GUI, and uses the torrent creators
+    with the multi-process `HashEngine` to create the torrent.  Progress
+    is collected in the worker thread and sent to the GUI in batches at
+    most once every `PROGRESS_INTERVAL` seconds.  If the content was
+    still being scanned when the job was submitted, the worker thread
+    waits for the `ScanThread` to finish and reuses it's result.
+
+    The job can be paused, resumed and cancelled from the GUI thread
+    with it's `ControlToken`, which the `HashEngine` checks before each
+    task.  A cancelled job saves it's checkpoint so it can be resumed
+    later.
 
     Parameters
     ----------
@@ -256,44 +599,97 @@ class TorrentFileCreator(QThread):
     """
 
     created = Signal()
-    prog_start_signal = Signal(list)
-    prog_update_signal = Signal(int, str)
-    prog_close_signal = Signal()
+    progress_signal = Signal(list, dict)
 
     def __init__(self, args, creator):
         """Construct the new thread."""
         super().__init__()
         self.args = args
         self.creator = creator
-        self.creator.hasher.prog_start = self.prog_start
-        self.creator.hasher.prog_update = self.prog_update
-        self.creator.hasher.prog_close = self.prog_close
         self.current = None
+        self.started = []
+        self.deltas = {}
+        self.emitted = time.monotonic()
+        self.total = 0
+        self.done = 0
+        self.token = ControlToken()
+        self.completed = False
+        self.error = None
+        self.stats = None
+
+    @property
+    def cancelled(self) -> bool:
+        """Return True if the job was cancelled."""
+        return self.token.cancelled
+
+    def pause(self):
+        """Stop hashing before the next task."""
+        self.token.pause()
+
+    def resume(self):
+        """Continue a paused job."""
+        self.token.resume()
+
+    def cancel(self):
+        """Stop the job before the next task."""
+        self.token.cancel()
 
     def prog_start(self, total, path, **_):
         """
-        Progress start signal.
+        Record a new file being hashed.
         """
         self.current = path
-        self.prog_start_signal.emit([total, path])
+        self.started.append([total, path])
+        self.tick()
 
     def prog_update(self, val):
         """
-        Progress update signal.
+        Add to the progress of the current file.
         """
-        self.prog_update_signal.emit(val, self.current)
+        self.deltas[self.current] = self.deltas.get(self.current, 0) + val
+        self.done += val
+        self.tick()
 
     def prog_close(self):
         """
-        Progress stopped signal.
+        Progress stopped for the current file.
+        """
+        self.tick()
+
+    def tick(self):
+        """
+        Send the collected progress if the interval has passed.
+        """
+        if time.monotonic() - self.emitted >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Send the progress collected since the last batch.
         """
-        self.prog_close_signal.emit()
+        if self.started or self.deltas:
+            self.progress_signal.emit(self.started, self.deltas)
+            self.started, self.deltas = [], {}
+        self.emitted = time.monotonic()
 
     def run(self):
         """Create a torrent file and emit it's path."""
-        args = deepcopy(self.args)
-        torrent = self.creator(**args)
-        _, _ = torrent.write()
+        scan_thread = self.args.pop("scan_thread", None)
+        if scan_thread is not None:
+            scan_thread.wait()
+            self.args["scan"] = scan_thread.result
+        try:
+            self.stats = create_torrent(
+                self.args, self.creator, self, self.token
+            )
+        except Cancelled:
+            return
+        except Exception as err:
+            self.error = err
+            raise
+        finally:
+            self.flush()
+        self.completed = True
         self.created.emit()
 
 
@@ -321,53 +717,56 @@ class SubmitButton(QPushButton):
         self._parent = parent
         self.thread = None
 
-    def submit(self):
-        """Submit Action performed when user presses Submit Button."""
-        parent = self._parent
-        # Gather Information from other Widgets.
-        args = {}
-        if parent.private.isChecked():
-            args["private"] = 1
-
-        # add source to metadata
-        sourcetext = parent.source_edit.text()
-        if sourcetext:
-            args["source"] = sourcetext
-
-        # add comments to metadata
-        commenttext = parent.comment_edit.text()
-        if commenttext:
-            args["comment"] = commenttext
-
-        # at least 1 tracker input is required
-        announce = parent.announce_input.toPlainText()
-        announce = [i.strip() for i in announce.split("\n") if i]
-        if announce:
-            args["announce"] = announce
-
-        url_list = parent.web_seed_input.toPlainText()
-        url_list = [i.strip() for i in url_list.split("\n") if i]
-        if url_list:
-            args["url_list"] = url_list
-
-        # Calculates piece length if not specified by user.
-        outtext = os.path.realpath(parent.output_path_edit.text())
-        if outtext:
-            args["outfile"] = outtext
-
-        current = parent.piece_length_combo.currentIndex()
-        if current:
-            piece_length = parent.piece_length_combo.itemData(current)
-            args["piece_length"] = piece_length
+    def collect(self) -> tuple:
+        """
+        Gather the torrent options from the other widgets.
 
-        if parent.hybridbutton.isChecked():
-            creator = TorrentFileHybrid
+        Returns
+        -------
+        tuple
+            keyword arguments and the torrent creator class.
+        """
+        parent = self._parent
+        if parent.allbutton.isChecked():
+            version = "all"
+        elif parent.hybridbutton.isChecked():
+            version = "hybrid"
         elif parent.v2button.isChecked():
-            creator = TorrentFileV2
+            version = "v2"
         else:
-            creator = TorrentFile
+            version = "v1"
+        current = parent.piece_length_combo.currentIndex()
+        return build_args(
+            {
+                "version": version,
+                "private": parent.private.isChecked(),
+                "source": parent.source_edit.text(),
+                "comment": parent.comment_edit.text(),
+                "announce": parent.announce_input.toPlainText(),
+                "url_list": parent.web_seed_input.toPlainText(),
+                "outfile": parent.output_path_edit.text(),
+                "piece_length": parent.piece_length_combo.itemData(current),
+                "workers": parent.workers_spin.value(),
+                "cache": parent.cache_check.isChecked(),
+                "reader": parent.reader_combo.currentData(),
+                "dedupe": parent.dedupe_check.isChecked(),
+            }
+        )
+
+    def submit(self):
+        """
+        Submit Action performed when user presses Submit Button.
 
+        In split mode a job is queued for each entry of the path instead.
+        """
+        parent = self._parent
+        if parent.split_check.isChecked():
+            pattern = parent.split_pattern.text().strip()
+            parent.split_path(parent.path_group.getPath(), pattern)
+            return
+        args, creator = self.collect()
         args["path"] = parent.path_group.getPath()
+        args["scan_thread"] = parent.path_scan(args["path"])
         tree = parent.progress_tree
         tree.add_args(args)
         self.dataCollected.emit(args, creator)
@@ -472,6 +871,15 @@ class ComboBox(QComboBox):
             box.addItem(item, 2**exp)
         return box
 
+    @classmethod
+    def reader_mode(cls, parent=None):
+        """Create a combobox for selecting how files are read."""
+        box = cls(parent=parent)
+        box.clear()
+        for mode, text in READERS.items():
+            box.addItem(text, mode)
+        return box
+
     def setValue(self, val):
         """Set the current value to val."""
         for i in range(self.count()):
@@ -480,7 +888,7 @@ class ComboBox(QComboBox):
                 break
 
 
-class ProgressTable(QTableWidget):
+class ProgressTable(ProgressView):
     """
     Table widget that keep track of torrent creation process.
     """
@@ -490,15 +898,12 @@ class ProgressTable(QTableWidget):
         Construc the table widget.
         """
         super().__init__(parent=parent)
-        self.setColumnCount(2)
-        self.verticalHeader().setHidden(True)
-        self.setHorizontalHeaderLabels(["Path", "Progress"])
+        self.rows = {}
+        self.setRootIsDecorated(False)
+        self.setItemsExpandable(False)
         self.setObjectName("CreateProgressTable")
         self.max_chars = 70
-        hheader = self.horizontalHeader()
-        hheader.setSectionResizeMode(0, hheader.ResizeMode.ResizeToContents)
-        hheader.setSectionResizeMode(1, hheader.ResizeMode.Stretch)
-        hheader.setSectionsClickable(False)
+        self.header().setSectionsClickable(False)
 
     def add_args(self, args):
         """
@@ -506,40 +911,367 @@ class ProgressTable(QTableWidget):
         """
         self.path = args["path"]
 
+    def prog_batch(self, started, deltas):
+        """
+        Apply a batch of progress collected by the creator thread.
+
+        Parameters
+        ----------
+        started : list
+            `[total, path]` for each file started since the last batch.
+        deltas : dict
+            number of bytes hashed for each path since the last batch.
+        """
+        self.add_rows(started)
+        amounts = {}
+        for path, value in deltas.items():
+            node = self.rows.get(path)
+            if node is not None:
+                amounts[node] = amounts.get(node, 0) + value
+        self.progress_model.advance_many(amounts)
+        if started:
+            self.scrollToBottom()
+
     def prog_start(self, values):
         """
         Create the path and progress bar.
         """
-        total, path = values
-        index = self.rowCount()
-        self.insertRow(index)
-        item = QTableWidgetItem()
-        item._path = path
-        if len(path) > self.max_chars:
-            path = "..." + path[-self.max_chars :]
-        item.setText(path)
-        progbar = QProgressBar()
-        if total < 1 << 30:
-            progbar._total = total
-            progbar._divisor = 1
-            progbar._max = total
-        else:  # pragma: nocover
-            progbar._total = total
-            progbar._divisor = 2 << 10
-            progbar._max = total // (2 << 10)
-        progbar.setRange(0, progbar._max - 1)
-        self.setItem(index, 0, item)
-        self.setCellWidget(index, 1, progbar)
+        self.add_rows([values])
         self.scrollToBottom()
 
+    def add_rows(self, started):
+        """
+        Add a row with the path and progress bar for each file.
+        """
+        entries = []
+        for total, path in started:
+            if len(path) > self.max_chars:
+                path = "..." + path[-self.max_chars :]
+            entries.append((path, total, None))
+        nodes = self.progress_model.add_nodes(entries)
+        for (_, path), node in zip(started, nodes):
+            self.rows[path] = node
+
     def prog_update(self, value, path):
         """Update the progress bar."""
-        i = self.rowCount() - 1
-        while i >= 0:
-            if self.item(i, 0)._path == path:
-                progbar = self.cellWidget(i, 1)
-                current = progbar.value()
-                increment = value // progbar._divisor
-                progbar.setValue(current + increment)
-                return
-            i -= 1  # pragma: nocover
+        node = self.rows.get(path)
+        if node is None:
+            return  # pragma: nocover
+        self.progress_model.advance(node, value)
+
+
+def format_eta(seconds: float) -> str:
+    """
+    Format a number of seconds as hours, minutes and seconds.
+
+    Parameters
+    ----------
+    seconds : float
+        remaining time.
+
+    Returns
+    -------
+    str
+        time formatted as `H:MM:SS`.
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class CreationJob:
+    """
+    Torrent creation job waiting in or run by the `JobQueue`.
+
+    Until the job's throughput has been measured it's ETA is predicted
+    from the throughput recorded for the file system holding it's path.
+
+    Parameters
+    ----------
+    args : dict
+        keyword arguments for the torrent creator.
+    creator : type
+        torrent creator class.
+    """
+
+    def __init__(self, args: dict, creator):
+        """Construct the queued job."""
+        self.args = args
+        self.creator = creator
+        self.path = args["path"]
+        self.status = QUEUED
+        self.thread = None
+        self.samples = deque(maxlen=RATE_SAMPLES)
+        self.expected = ThroughputLog().rate(self.path)
+
+    @property
+    def done(self) -> int:
+        """Return the number of bytes hashed."""
+        return self.thread.done if self.thread else 0
+
+    @property
+    def total(self) -> int:
+        """Return the size of the content, 0 until it is known."""
+        if self.thread and self.thread.total:
+            return self.thread.total
+        scan = self.args.get("scan")
+        if scan is None and self.args.get("scan_thread"):
+            scan = self.args["scan_thread"].result
+        return scan.total if scan else 0
+
+    @property
+    def piece_length(self) -> int:
+        """Return the piece length, 0 until the size is known."""
+        if self.args.get("piece_length"):
+            return self.args["piece_length"]
+        return get_piece_length(self.total) if self.total else 0
+
+    def sample(self):
+        """Record the current progress for measuring throughput."""
+        self.samples.append((time.monotonic(), self.done))
+
+    def rate(self) -> float:
+        """
+        Return the bytes hashed per second over the recent samples.
+
+        Returns
+        -------
+        float
+            throughput of the job.
+        """
+        if self.status != RUNNING or len(self.samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+    def piece_rate(self) -> float:
+        """
+        Return the pieces hashed per second over the recent samples.
+
+        Returns
+        -------
+        float
+            throughput of the job in pieces.
+        """
+        rate, piece_length = self.rate(), self.piece_length
+        return rate / piece_length if rate and piece_length else 0.0
+
+    def eta(self):
+        """
+        Return the estimated number of seconds until the job completes.
+
+        Returns
+        -------
+        float
+            remaining time or None if it can't be estimated.
+        """
+        rate = self.rate()
+        if not rate and self.status in (QUEUED, RUNNING):
+            rate = self.expected
+        if not rate or not self.total:
+            return None
+        return max(0, self.total - self.done) / rate
+
+
+class JobQueue(QObject):
+    """
+    Queue of torrent creation jobs run with a concurrency limit.
+
+    Jobs start in queue order as soon as fewer than `limit` jobs are
+    running.  Paused jobs don't count against the limit.  The hashing
+    processes requested by a job are a budget shared with the other jobs
+    that can run at the same time.
+
+    Parameters
+    ----------
+    parent : QObject
+        parent object.
+    limit : int
+        maximum number of jobs running at the same time.
+    """
+
+    jobStarted = Signal(object)
+
+    def __init__(self, parent=None, limit: int = 1):
+        """Construct the empty queue."""
+        super().__init__(parent)
+        self.jobs = []
+        self.limit = limit
+
+    def add(self, args: dict, creator) -> CreationJob:
+        """
+        Append a job to the queue.
+
+        Parameters
+        ----------
+        args : dict
+            keyword arguments for the torrent creator.
+        creator : type
+            torrent creator class.
+
+        Returns
+        -------
+        CreationJob
+            the new job.
+        """
+        job = CreationJob(args, creator)
+        self.jobs.append(job)
+        self.schedule()
+        return job
+
+    def running(self) -> int:
+        """Return the number of running jobs."""
+        return sum(1 for job in self.jobs if job.status == RUNNING)
+
+    def schedule(self):
+        """Start queued jobs until the concurrency limit is reached."""
+        for job in self.jobs:
+            if self.running() >= self.limit:
+                break
+            if job.status == QUEUED:
+                self.start(job)
+
+    def start(self, job: CreationJob):
+        """Start the creator thread of a job."""
+        args = job.args
+        if args.get("workers"):
+            waiting = sum(1 for i in self.jobs if i.status in (QUEUED, RUNNING))
+            jobs = min(self.limit, waiting)
+            args = dict(args, workers=share_workers(args["workers"], jobs))
+        job.status = RUNNING
+        job.thread = TorrentFileCreator(args, job.creator)
+        job.thread.created.connect(self.job_ended)
+        job.thread.finished.connect(self.job_ended)
+        self.jobStarted.emit(job)
+        job.thread.start()
+
+    def job_ended(self):
+        """Record the outcome of a job and start the next one."""
+        thread = self.sender()
+        for job in self.jobs:
+            if job.thread is not thread or job.status not in (
+                RUNNING,
+                PAUSED,
+            ):
+                continue
+            if thread.completed:
+                job.status = COMPLETED
+            elif thread.cancelled:
+                job.status = CANCELLED
+            else:
+                job.status = FAILED
+        self.schedule()
+
+    def set_limit(self, limit: int):
+        """Change the number of jobs that can run at the same time."""
+        self.limit = limit
+        self.schedule()
+
+    def move(self, job: CreationJob, offset: int):
+        """Move a job up or down the queue."""
+        index = self.jobs.index(job)
+        target = min(max(index + offset, 0), len(self.jobs) - 1)
+        self.jobs.insert(target, self.jobs.pop(index))
+
+    def pause(self, job: CreationJob):
+        """Pause a running job or hold a queued job."""
+        if job.status == RUNNING:
+            job.thread.pause()
+            job.status = PAUSED
+            self.schedule()
+        elif job.status == QUEUED:
+            job.status = PAUSED
+
+    def resume(self, job: CreationJob):
+        """Continue a paused job or return a held job to the queue."""
+        if job.status != PAUSED:
+            return
+        if job.thread is None:
+            job.status = QUEUED
+            self.schedule()
+        else:
+            job.status = RUNNING
+            job.thread.resume()
+
+    def cancel(self, job: CreationJob):
+        """Stop a running job or remove a waiting job from the queue."""
+        if job.thread is None and job.status in (QUEUED, PAUSED):
+            job.status = CANCELLED
+        elif job.status in (RUNNING, PAUSED):
+            job.thread.cancel()
+
+    def shutdown(self):
+        """Cancel every job and wait for the running threads to exit."""
+        for job in self.jobs:
+            self.cancel(job)
+        for job in self.jobs:
+            if job.thread is not None:
+                job.thread.wait()
+
+
+class JobTable(QTreeWidget):
+    """
+    Table showing the status, throughput and ETA of each queued job.
+
+    The header of the speed column shows the combined throughput of the
+    running jobs.
+
+    Parameters
+    ----------
+    queue : JobQueue
+        the queue being displayed.
+    parent : QWidget
+        parent widget.
+    """
+
+    def __init__(self, queue: JobQueue, parent=None):
+        """Construct the table and start it's refresh timer."""
+        super().__init__(parent=parent)
+        self.setObjectName("CreateJobTable")
+        self.queue = queue
+        self.items = {}
+        self.setRootIsDecorated(False)
+        self.setHeaderLabels(
+            ["Path", "Status", "Progress", "Speed", "Pieces/s", "ETA"]
+        )
+        self.setColumnWidth(0, 360)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def selected_jobs(self) -> list:
+        """Return the jobs of the selected rows."""
+        return [job for job, item in self.items.items() if item.isSelected()]
+
+    def refresh(self):
+        """Update the rows to match the queue order and job progress."""
+        combined = 0.0
+        for row, job in enumerate(self.queue.jobs):
+            item = self.items.get(job)
+            if item is None:
+                item = QTreeWidgetItem([job.path])
+                self.items[job] = item
+                self.insertTopLevelItem(row, item)
+            elif self.indexOfTopLevelItem(item) != row:
+                selected = item.isSelected()
+                self.takeTopLevelItem(self.indexOfTopLevelItem(item))
+                self.insertTopLevelItem(row, item)
+                item.setSelected(selected)
+            job.sample()
+            total, rate, eta = job.total, job.rate(), job.eta()
+            pieces = job.piece_rate()
+            percent = f"{job.done * 100 // total}%" if total else ""
+            if job.status == COMPLETED:
+                percent = "100%"
+            item.setText(1, job.status)
+            item.setText(2, percent)
+            item.setText(3, f"{humanize_bytes(int(rate))}/s" if rate else "")
+            item.setText(4, f"{pieces:.1f}" if pieces else "")
+            item.setText(5, format_eta(eta) if eta is not None else "")
+            combined += rate
+        header = "Speed"
+        if combined:
+            header += f" ({humanize_bytes(int(combined))}/s)"
+        self.headerItem().setText(3, header)
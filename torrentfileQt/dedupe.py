@@ -0,0 +1,170 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Find files with identical contents before v2 and hybrid hashing.
+
+Every file of a v2 torrent has it's own merkle tree, so files with the
+same contents have the same `pieces root` and piece layer and only one
+of them needs to be hashed.  Files are grouped by size, then by a digest
+of a few sampled blocks.  The digest of a file no larger than the samples
+covers all of it and links to the same inode are always identical, larger
+files that match on every sample are only duplicates once their whole
+contents compare equal.  The sample and compare reads are added to the
+`read` count of the hasher's statistics, so only links to the same inode
+are never read.
+"""
+
+import os
+from hashlib import sha256
+
+SAMPLE_SIZE = 2**16  # 64KiB
+SAMPLES = 4
+COMPARE_SIZE = 2**20  # 1MiB read from each file per comparison
+
+
+def sample_offsets(size: int) -> list:
+    """
+    Return the offsets of the blocks sampled from a file.
+
+    Parameters
+    ----------
+    size : int
+        size of the file.
+
+    Returns
+    -------
+    list
+        start of each sample, the whole file if it's no larger than the
+        samples combined.
+    """
+    if size <= SAMPLE_SIZE * SAMPLES:
+        return list(range(0, size, SAMPLE_SIZE))
+    last = size - SAMPLE_SIZE
+    return [last * i // (SAMPLES - 1) for i in range(SAMPLES)]
+
+
+def sample_digest(path: str, size: int, stats=None) -> bytes:
+    """
+    Hash the sampled blocks of a file.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        size of the file.
+    stats : Occupancy
+        measurement the bytes read are added to.
+
+    Returns
+    -------
+    bytes
+        sha256 digest of the samples.
+    """
+    digest = sha256()
+    with open(path, "rb") as fd:
+        for offset in sample_offsets(size):
+            fd.seek(offset)
+            block = fd.read(SAMPLE_SIZE)
+            digest.update(block)
+            if stats is not None:
+                stats.read += len(block)
+    return digest.digest()
+
+
+def same_contents(first: str, second: str, stats=None) -> bool:
+    """
+    Compare the full contents of two files of the same size.
+
+    Parameters
+    ----------
+    first : str
+        path to file.
+    second : str
+        path to file.
+    stats : Occupancy
+        measurement the bytes read from both files are added to.
+
+    Returns
+    -------
+    bool
+        True if every byte is equal.
+    """
+    buffers = bytearray(COMPARE_SIZE), bytearray(COMPARE_SIZE)
+    with open(first, "rb", buffering=0) as fd1:
+        with open(second, "rb", buffering=0) as fd2:
+            while True:
+                size = fd1.readinto(buffers[0])
+                other = fd2.readinto(buffers[1])
+                if stats is not None:
+                    stats.read += size + other
+                if other != size:
+                    return False
+                if size < COMPARE_SIZE:
+                    return buffers[0][:size] == buffers[1][:size]
+                if buffers[0] != buffers[1]:
+                    return False
+
+
+def find_duplicates(files: list, stats=None) -> dict:
+    """
+    Map each file that duplicates an earlier file to the earlier file.
+
+    Parameters
+    ----------
+    files : list
+        `(path, size)` of each file in hashing order.
+    stats : Occupancy
+        measurement the bytes read while sampling and comparing are
+        added to.
+
+    Returns
+    -------
+    dict
+        duplicate path to the path of an earlier file with it's contents,
+        links map to the first link to the same inode, which is the only
+        one read.
+    """
+    by_size = {}
+    for path, size in files:
+        if size:
+            by_size.setdefault(size, []).append(path)
+    duplicates = {}
+    for size, group in by_size.items():
+        if len(group) < 2:
+            continue
+        inodes, samples = {}, {}
+        for path in group:
+            stat = os.stat(path)
+            inode = (stat.st_dev, stat.st_ino)
+            if inode in inodes:
+                duplicates[path] = inodes[inode]
+                continue
+            inodes[inode] = path
+            digest = sample_digest(path, size, stats)
+            candidates = samples.setdefault(digest, [])
+            for original in candidates:
+                if size <= SAMPLE_SIZE * SAMPLES or same_contents(
+                    original, path, stats
+                ):
+                    duplicates[path] = original
+                    break
+            else:
+                candidates.append(path)
+    return duplicates
@@ -38,6 +38,7 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from torrentfileQt import bencode
 from torrentfileQt.utils import DropGroupBox, browse_torrent, get_icon
 
 
@@ -145,7 +146,7 @@ class SaveEditButton(QPushButton):
 
             else:  # pragma: nocover
                 meta[label] = value
-        pyben.dump(meta, text)
+        bencode.dump(meta, text)
 
 
 class FileButton(QPushButton):
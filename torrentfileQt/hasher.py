@@ -0,0 +1,1252 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Multi-process piece hashing engine used for creating torrent files.
+
+Content is split into tasks made of whole pieces which are hashed by a
+pool of worker processes.  Results are collected in piece order so the
+output is identical to hashing the content in a single pass.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from hashlib import sha1, sha256  # nosec
+
+from torrentfile.hasher import merkle_root
+from torrentfile.utils import next_power_2
+
+from torrentfileQt.dedupe import find_duplicates
+from torrentfileQt.pipeline import BUFFERS, QUEUE_DEPTH, Occupancy, read_spans
+from torrentfileQt.reader import MMAP, ZEROS, is_zeros
+
+BLOCK_SIZE = 2**14  # 16KiB
+HASH_SIZE = 32
+SHA1_SIZE = 20
+TASK_SIZE = 2**26  # 64MiB
+CONTROL_TASK_SIZE = 2**22  # 4MiB, used when the job can be paused
+
+_zero_hashes = {}
+
+
+def default_workers() -> int:
+    """
+    Return the default number of hashing processes.
+
+    Returns
+    -------
+    int
+        number of cpu cores available.
+    """
+    return os.cpu_count() or 1
+
+
+def task_length(piece_length: int, size: int = None) -> int:
+    """
+    Return the number of bytes assigned to each task.
+
+    Parameters
+    ----------
+    piece_length : int
+        size of torrent pieces.
+    size : int
+        target task size, defaults to `TASK_SIZE`.
+
+    Returns
+    -------
+    int
+        a multiple of the piece length.
+    """
+    size = size if size else TASK_SIZE
+    return max(piece_length, size - size % piece_length)
+
+
+def split_tasks(segments: list, piece_length: int, limit=None) -> list:
+    """
+    Split a sequence of content segments into piece aligned tasks.
+
+    Parameters
+    ----------
+    segments : list
+        `(path, length)` pairs in torrent order, a path of `None`
+        represents zero padding.
+    piece_length : int
+        size of torrent pieces.
+    limit : int
+        number of bytes in each task, defaults to `task_length`.
+
+    Returns
+    -------
+    list
+        list of task span lists.
+    """
+    limit = limit if limit else task_length(piece_length)
+    tasks, spans, filled = [], [], 0
+    for source, length in segments:
+        offset = 0
+        while length > 0:
+            amount = min(length, limit - filled)
+            spans.append((source, offset, amount))
+            offset += amount
+            length -= amount
+            filled += amount
+            if filled == limit:
+                tasks.append(spans)
+                spans, filled = [], 0
+    if spans:
+        tasks.append(spans)
+    return tasks
+
+
+def file_size(path: str, sizes: dict = None) -> int:
+    """
+    Return the size of a file, using the sizes of a scan if available.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    sizes : dict
+        known file sizes.
+
+    Returns
+    -------
+    int
+        size of the file.
+    """
+    if sizes and path in sizes:
+        return sizes[path]
+    return os.path.getsize(path)
+
+
+def v1_segments(
+    paths: list, piece_length: int, align: bool = False, sizes: dict = None
+) -> list:
+    """
+    Return the content segments of a v1 torrent.
+
+    Parameters
+    ----------
+    paths : list
+        sorted list of file paths.
+    piece_length : int
+        size of torrent pieces.
+    align : bool
+        pad each file to the end of it's last piece.
+    sizes : dict
+        known file sizes.
+
+    Returns
+    -------
+    list
+        `(path, length)` pairs, a path of `None` represents zero padding.
+    """
+    segments = []
+    for path in paths:
+        size = file_size(path, sizes)
+        segments.append((path, size))
+        if align and size % piece_length:
+            segments.append((None, piece_length - size % piece_length))
+    return segments
+
+
+def v1_tasks(paths: list, piece_length: int, align: bool = False) -> list:
+    """
+    Split the concatenated contents of `paths` into piece aligned tasks.
+
+    Each task is a list of spans `(path, offset, length)` covering a
+    contiguous range of the torrent's content.  A span with a path of
+    `None` represents zero padding used for piece aligned torrents.
+
+    Parameters
+    ----------
+    paths : list
+        sorted list of file paths.
+    piece_length : int
+        size of torrent pieces.
+    align : bool
+        pad each file to the end of it's last piece.
+
+    Returns
+    -------
+    list
+        list of task span lists.
+    """
+    segments = v1_segments(paths, piece_length, align)
+    return split_tasks(segments, piece_length)
+
+
+def merge_spans(pieces: list) -> list:
+    """
+    Join the spans of consecutive pieces into a single span list.
+
+    Parameters
+    ----------
+    pieces : list
+        span lists of consecutive pieces.
+
+    Returns
+    -------
+    list
+        spans with adjacent ranges of the same file combined.
+    """
+    spans = []
+    for piece in pieces:
+        for path, offset, length in piece:
+            if spans:
+                last, start, size = spans[-1]
+                if last == path and (path is None or start + size == offset):
+                    spans[-1] = (last, start, size + length)
+                    continue
+            spans.append((path, offset, length))
+    return spans
+
+
+def v2_tasks(
+    paths: list, piece_length: int, sizes: dict = None, limit: int = None
+) -> list:
+    """
+    Split each file into tasks containing a range of whole pieces.
+
+    Parameters
+    ----------
+    paths : list
+        file paths in the order they appear in the file tree.
+    piece_length : int
+        size of torrent pieces.
+    sizes : dict
+        known file sizes.
+    limit : int
+        number of bytes in each task, defaults to `task_length`.
+
+    Returns
+    -------
+    list
+        list of `(path, offset, length, size)` tuples.
+    """
+    limit = limit if limit else task_length(piece_length)
+    tasks = []
+    for path in paths:
+        size = file_size(path, sizes)
+        for offset in range(0, size, limit):
+            tasks.append((path, offset, min(limit, size - offset), size))
+    return tasks
+
+
+def zero_hash(name: str, length: int) -> bytes:
+    """
+    Return the digest of `length` zero bytes, computing it only once.
+
+    Parameters
+    ----------
+    name : str
+        `"sha1"`, `"sha256"` or `"layer"` for the merkle root of a full
+        piece of zeros.
+    length : int
+        number of zero bytes.
+
+    Returns
+    -------
+    bytes
+        the cached digest.
+    """
+    key = (name, length)
+    if key not in _zero_hashes:
+        if name == "layer":
+            block = zero_hash("sha256", BLOCK_SIZE)
+            digest = merkle_root([block] * (length // BLOCK_SIZE))
+        else:
+            digest = sha1() if name == "sha1" else sha256()  # nosec
+            feed_zeros(digest, length)
+            digest = digest.digest()
+        _zero_hashes[key] = digest
+    return _zero_hashes[key]
+
+
+def feed_zeros(digest, length: int):
+    """
+    Update a hash object with zero bytes without allocating them.
+
+    Parameters
+    ----------
+    digest : hashlib._Hash
+        the hash object.
+    length : int
+        number of zero bytes.
+    """
+    view = memoryview(ZEROS)
+    while length > 0:
+        amount = min(length, len(view))
+        digest.update(view[:amount])
+        length -= amount
+
+
+class PieceStore:
+    """
+    Preallocated storage for the sha1 piece hashes of a v1 torrent.
+
+    Digests are written in place at the position of their piece, so
+    results can arrive in any order and each piece costs 20 bytes plus a
+    byte recording it's completion, with no object per piece.
+
+    Parameters
+    ----------
+    count : int
+        number of pieces.
+    """
+
+    def __init__(self, count: int):
+        """Construct the empty store."""
+        self.data = bytearray(count * SHA1_SIZE)
+        self.done = bytearray(count)
+        self.completed = 0
+
+    def put(self, index: int, digests):
+        """
+        Store the concatenated digests of consecutive pieces.
+
+        Parameters
+        ----------
+        index : int
+            index of the first piece.
+        digests : bytes
+            sha1 digests of the pieces starting at `index`.
+
+        Raises
+        ------
+        ValueError
+            the digests don't fit in the store.
+        """
+        count = len(digests) // SHA1_SIZE
+        if index < 0 or index + count > len(self.done):
+            raise ValueError(f"pieces {index} to {index + count} out of range")
+        start = index * SHA1_SIZE
+        self.data[start : start + count * SHA1_SIZE] = digests
+        self.done[index : index + count] = b"\x01" * count
+        end = self.done.find(0, self.completed)
+        self.completed = len(self.done) if end < 0 else end
+
+    def prefix(self) -> memoryview:
+        """Return the digests of the pieces completed without a gap."""
+        return memoryview(self.data)[: self.completed * SHA1_SIZE]
+
+
+def measured(func, task: tuple) -> tuple:
+    """
+    Run a hashing task, also returning it's read ahead queue occupancy.
+
+    Parameters
+    ----------
+    func : Callable
+        `hash_v1_task` or `hash_v2_task`.
+    task : tuple
+        arguments of the task.
+
+    Returns
+    -------
+    tuple
+        the result of the task and it's `Occupancy`.
+    """
+    stats = Occupancy()
+    return func(task, stats), stats
+
+
+def hash_v1_task(task: tuple, stats=None) -> bytes:
+    """
+    Calculate the sha1 piece hashes for a single v1 task.
+
+    Pieces spanning more than one file are fed to the same hash object
+    one view at a time, so the data is never concatenated.  Zeros at the
+    start of a piece aren't hashed until data follows them, so a piece
+    that lies entirely in holes or padding uses the cached `zero_hash`.
+
+    Parameters
+    ----------
+    task : tuple
+        the list of spans, the piece length, the reader mode and the
+        read ahead queue depth.
+    stats : Occupancy
+        receives samples of the read ahead queue.
+
+    Returns
+    -------
+    bytearray
+        concatenated sha1 digests for every piece in the task.
+    """
+    spans, piece_length, mode, depth = task
+    total = sum(span[2] for span in spans)
+    digests = bytearray(-(-total // piece_length) * SHA1_SIZE)
+    index, filled, pending = 0, 0, 0
+    piece = sha1()  # nosec
+    for chunk in read_spans(spans, mode, depth, stats):
+        pos, size, zeros = 0, len(chunk), is_zeros(chunk)
+        while pos < size:
+            amount = min(size - pos, piece_length - filled)
+            if zeros and pending == filled:
+                pending += amount
+            else:
+                feed_zeros(piece, pending)
+                pending = 0
+                piece.update(chunk[pos : pos + amount])
+            pos += amount
+            filled += amount
+            if filled == piece_length:
+                if pending == filled:
+                    digest = zero_hash("sha1", filled)
+                else:
+                    digest = piece.digest()
+                digests[index : index + SHA1_SIZE] = digest
+                index += SHA1_SIZE
+                piece, filled, pending = sha1(), 0, 0  # nosec
+    if filled:
+        if pending == filled:
+            digest = zero_hash("sha1", filled)
+        else:
+            digest = piece.digest()
+        digests[index : index + SHA1_SIZE] = digest
+        index += SHA1_SIZE
+    del digests[index:]
+    return digests
+
+
+def layer_hash(blocks: list, num_blocks: int, first: bool) -> bytes:
+    """
+    Pad the block hashes of one piece and return their merkle root.
+
+    Parameters
+    ----------
+    blocks : list
+        sha256 digests of the piece's 16KiB blocks.
+    num_blocks : int
+        number of blocks in a full piece.
+    first : bool
+        the piece is the first piece of it's file.
+
+    Returns
+    -------
+    bytes
+        the piece layer hash.
+    """
+    if len(blocks) != num_blocks:
+        if first:
+            padding = next_power_2(len(blocks)) - len(blocks)
+        else:
+            padding = num_blocks - len(blocks)
+        blocks.extend([bytes(HASH_SIZE)] * padding)
+    return merkle_root(blocks)
+
+
+class PieceHasher:
+    """
+    Hash the data of one piece for both versions of the protocol.
+
+    Each view is split into 16KiB blocks for the v2 merkle tree and, for
+    hybrid torrents, the same view is fed to the v1 sha1 piece hash, so
+    the content only needs to be read once.  Blocks and pieces made only
+    of holes use the cached `zero_hash` digests.
+
+    Parameters
+    ----------
+    piece_length : int
+        size of torrent pieces.
+    hybrid : bool
+        also calculate the zero padded v1 piece hash.
+    """
+
+    def __init__(self, piece_length: int, hybrid: bool):
+        """Construct the piece hasher."""
+        self.piece_length = piece_length
+        self.num_blocks = piece_length // BLOCK_SIZE
+        self.hybrid = hybrid
+        self.blocks = []
+        self.total = 0
+        self.pending = 0
+        self.piece = sha1() if hybrid else None  # nosec
+
+    def update(self, view: memoryview) -> int:
+        """
+        Consume data from the view up to the end of the current piece.
+
+        Parameters
+        ----------
+        view : memoryview
+            file contents starting at a block boundary.
+
+        Returns
+        -------
+        int
+            number of bytes consumed.
+        """
+        amount = min(len(view), self.piece_length - self.total)
+        segment = view[:amount]
+        if is_zeros(view):
+            if self.pending == self.total:
+                self.pending += amount
+            elif self.hybrid:
+                self.piece.update(segment)
+            for pos in range(0, amount, BLOCK_SIZE):
+                size = min(BLOCK_SIZE, amount - pos)
+                self.blocks.append(zero_hash("sha256", size))
+            segment.release()
+            self.total += amount
+            return amount
+        if self.hybrid:
+            feed_zeros(self.piece, self.pending)
+            self.piece.update(segment)
+        self.pending = 0
+        for pos in range(0, amount, BLOCK_SIZE):
+            block = segment[pos : pos + BLOCK_SIZE]
+            self.blocks.append(sha256(block).digest())
+        segment.release()
+        self.total += amount
+        return amount
+
+    def digest(self, first: bool) -> tuple:
+        """
+        Finish the current piece and reset for the next one.
+
+        Parameters
+        ----------
+        first : bool
+            the piece is the first piece of it's file.
+
+        Returns
+        -------
+        tuple
+            `(layer_hash, sha1_piece, size)` for the piece.
+        """
+        piece = None
+        zeros = self.pending == self.total
+        if self.hybrid:
+            if zeros:
+                piece = zero_hash("sha1", self.piece_length)
+            else:
+                feed_zeros(self.piece, self.piece_length - self.total)
+                piece = self.piece.digest()
+            self.piece = sha1()  # nosec
+        if zeros and self.total == self.piece_length:
+            layer = zero_hash("layer", self.piece_length)
+        else:
+            layer = layer_hash(self.blocks, self.num_blocks, first)
+        size = self.total
+        self.blocks, self.total, self.pending = [], 0, 0
+        return layer, piece, size
+
+
+def hash_v2_task(task: tuple, stats=None) -> list:
+    """
+    Calculate the piece layer hashes for a range of pieces in one file.
+
+    Parameters
+    ----------
+    task : tuple
+        path, offset, length, piece length, hybrid flag, reader mode and
+        read ahead queue depth.
+    stats : Occupancy
+        receives samples of the read ahead queue.
+
+    Returns
+    -------
+    list
+        `(layer_hash, sha1_piece, size)` for each piece in the range.
+    """
+    path, offset, length, piece_length, hybrid, mode, depth = task
+    hasher = PieceHasher(piece_length, hybrid)
+    results = []
+    for chunk in read_spans([(path, offset, length)], mode, depth, stats):
+        pos = 0
+        while pos < len(chunk):
+            pos += hasher.update(chunk[pos:])
+            if hasher.total == piece_length:
+                results.append(hasher.digest(offset == 0 and not results))
+    if hasher.total:
+        results.append(hasher.digest(offset == 0 and not results))
+    return results
+
+
+def hash_formats_task(task: tuple, stats=None) -> tuple:
+    """
+    Calculate the v1, v2 and hybrid hashes for a range of one file.
+
+    The hybrid results of `hash_v2_task` also contain everything a v2
+    torrent needs.  The v1 pieces of the range are hashed from the same
+    chunks, but the pieces at either end of the range continue in the
+    neighbouring tasks, so their bytes are returned instead to be hashed
+    once the neighbouring tasks are complete.
+
+    Parameters
+    ----------
+    task : tuple
+        path, offset, length, piece length, position of the range in the
+        concatenated v1 content, reader mode and read ahead queue depth.
+    stats : Occupancy
+        receives samples of the read ahead queue.
+
+    Returns
+    -------
+    tuple
+        the hybrid results of `hash_v2_task`, the bytes that finish the
+        preceding v1 piece, the v1 digests of the whole pieces and the
+        bytes that start the next v1 piece.
+    """
+    path, offset, length, piece_length, position, mode, depth = task
+    head = min(length, -position % piece_length)
+    tail = length - (length - head) % piece_length
+    hasher = PieceHasher(piece_length, True)
+    results, digests = [], []
+    edges = (bytearray(), bytearray())
+    piece, filled, consumed = sha1(), 0, 0  # nosec
+    for chunk in read_spans([(path, offset, length)], mode, depth, stats):
+        pos = 0
+        while pos < len(chunk):
+            pos += hasher.update(chunk[pos:])
+            if hasher.total == piece_length:
+                results.append(hasher.digest(offset == 0 and not results))
+        pos = 0
+        while pos < len(chunk):
+            current = consumed + pos
+            if current < head:
+                amount = min(len(chunk) - pos, head - current)
+                edges[0].extend(chunk[pos : pos + amount])
+            elif current >= tail:
+                amount = len(chunk) - pos
+                edges[1].extend(chunk[pos:])
+            else:
+                amount = min(
+                    len(chunk) - pos, tail - current, piece_length - filled
+                )
+                piece.update(chunk[pos : pos + amount])
+                filled += amount
+                if filled == piece_length:
+                    digests.append(piece.digest())
+                    piece, filled = sha1(), 0  # nosec
+            pos += amount
+        consumed += len(chunk)
+    if hasher.total:
+        results.append(hasher.digest(offset == 0 and not results))
+    return results, bytes(edges[0]), b"".join(digests), bytes(edges[1])
+
+
+class FileHash:
+    """
+    Merkle tree results for a single file of a v2 or hybrid torrent.
+
+    Parameters
+    ----------
+    path : str
+        path to the file.
+    piece_length : int
+        size of torrent pieces.
+    """
+
+    def __init__(self, path: str, piece_length: int):
+        """Construct the empty file results."""
+        self.path = path
+        self.piece_length = piece_length
+        self.layer_hashes = []
+        self.pieces = []
+        self.piece_layer = None
+        self.padding_file = None
+        self.root = None
+
+    def add(self, layer_hash: bytes, piece: bytes, size: int):
+        """
+        Add the results for the next piece of the file.
+
+        Parameters
+        ----------
+        layer_hash : bytes
+            merkle root of the piece's blocks.
+        piece : bytes
+            sha1 digest of the zero padded piece for hybrid torrents.
+        size : int
+            number of bytes of file contents in the piece.
+        """
+        self.layer_hashes.append(layer_hash)
+        if piece is not None:
+            self.pieces.append(piece)
+            plength = self.piece_length - size
+            if plength > 0:
+                self.padding_file = {
+                    "attr": "p",
+                    "length": plength,
+                    "path": [".pad", str(plength)],
+                }
+
+    def finish(self):
+        """Calculate the piece layer and root hash for the file."""
+        self.piece_layer = b"".join(self.layer_hashes)
+        layers = list(self.layer_hashes)
+        if len(layers) > 1:
+            num_blocks = self.piece_length // BLOCK_SIZE
+            pad_piece = merkle_root([bytes(HASH_SIZE)] * num_blocks)
+            layers += [pad_piece] * (next_power_2(len(layers)) - len(layers))
+        self.root = merkle_root(layers)
+        return self
+
+
+class HashEngine:
+    """
+    Distribute piece hashing across a pool of worker processes.
+
+    Parameters
+    ----------
+    workers : int
+        number of worker processes, defaults to the number of cpu cores.
+    tracker : object
+        receives `prog_start`, `prog_update` and `prog_close` calls.
+    reader : str
+        file reader mode, one of `torrentfileQt.reader.READERS`.
+    cache : HashCache
+        persistent hash cache, pieces of unchanged files aren't rehashed.
+    checkpoint : Checkpoint
+        saves completed hashes so interrupted jobs can be resumed.
+    sizes : dict
+        file sizes from a directory scan, used instead of `os.stat`.
+    token : ControlToken
+        pause and cancel requests checked before each task is started,
+        tasks are limited to `CONTROL_TASK_SIZE` when it is given.
+    queue_depth : int
+        number of chunks read ahead of the hashing in each task, 0 reads
+        and hashes in turn.
+    dedupe : bool
+        hash files with identical contents once for v2 and hybrid
+        torrents, see `torrentfileQt.dedupe`.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        tracker=None,
+        reader: str = MMAP,
+        cache=None,
+        checkpoint=None,
+        sizes=None,
+        token=None,
+        queue_depth: int = QUEUE_DEPTH,
+        dedupe: bool = False,
+    ):
+        """Construct the hashing engine."""
+        self.workers = workers if workers else default_workers()
+        self.tracker = tracker
+        self.reader = reader
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.sizes = sizes if sizes else {}
+        self.token = token
+        self.queue_depth = queue_depth
+        self.occupancy = Occupancy()
+        self.dedupe = dedupe
+        self.skipped = 0
+
+    def check(self):
+        """
+        Wait while the job is paused and stop if it is cancelled.
+
+        The checkpoint is saved and the kept read buffers are freed
+        before waiting, so a job that is paused and never resumed can
+        still be continued later and holds no buffers meanwhile.
+        """
+        if self.token is None:
+            return
+        if self.token.paused:
+            if self.checkpoint is not None:
+                self.checkpoint.save()
+            BUFFERS.clear()
+        self.token.check()
+
+    def task_size(self, piece_length: int) -> int:
+        """
+        Return the number of bytes assigned to each task.
+
+        Tasks already submitted to the pool run to completion after a
+        pause or cancel request, so with a token attached they are cut
+        to a few pieces instead of up to `TASK_SIZE` bytes.
+
+        Parameters
+        ----------
+        piece_length : int
+            size of torrent pieces.
+
+        Returns
+        -------
+        int
+            a multiple of the piece length.
+        """
+        length = task_length(piece_length)
+        if self.token is None:
+            return length
+        return min(length, task_length(piece_length, CONTROL_TASK_SIZE))
+
+    def _map(self, func, tasks: list):
+        """
+        Apply `func` to each task and yield the results in order.
+
+        Only a few tasks per worker are submitted ahead of the results
+        being used, and none are submitted while the job is paused.  The
+        worker processes exit once the submitted tasks are done, so a
+        paused job holds no open files or read buffers, and new workers
+        continue with the next task once resumed.
+
+        Parameters
+        ----------
+        func : Callable
+            worker function.
+        tasks : list
+            arguments for the worker function.
+
+        Yields
+        ------
+        Any
+            worker function return values.
+        """
+        if self.workers < 2 or len(tasks) < 2:
+            for task in tasks:
+                self.check()
+                yield func(task, self.occupancy)
+            return
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.workers, len(tasks))
+        pending = deque()
+        remaining = iter(tasks)
+        pool = None
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    task = next(remaining, None)
+                    if task is None:
+                        break
+                    if pool is not None and self.token and self.token.paused:
+                        wait(pending)
+                        pool.shutdown()
+                        pool = None
+                    self.check()
+                    if pool is None:
+                        pool = ProcessPoolExecutor(workers, mp_context=context)
+                    pending.append(pool.submit(measured, func, task))
+                if not pending:
+                    return
+                result, stats = pending.popleft().result()
+                self.occupancy.merge(stats)
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            if pool is not None:
+                pool.shutdown()
+
+    def prog_start(self, total: int, path: str):
+        """Forward progress start to the tracker."""
+        if self.tracker:
+            self.tracker.prog_start(total, path)
+
+    def prog_update(self, amount: int):
+        """Forward progress updates to the tracker."""
+        if self.tracker:
+            self.tracker.prog_update(amount)
+
+    def prog_close(self):
+        """Forward progress completion to the tracker."""
+        if self.tracker:
+            self.tracker.prog_close()
+
+    def _v1_groups(self, segments: list, piece_length: int, saved) -> list:
+        """
+        Divide v1 content into groups of cached and uncached pieces.
+
+        Parameters
+        ----------
+        segments : list
+            `(path, length)` content segments.
+        piece_length : int
+            size of torrent pieces.
+        saved : bytes
+            piece hashes completed before the job was interrupted.
+
+        Returns
+        -------
+        list
+            `[digests, pieces]` pairs in piece order, `digests` is None
+            for groups that need to be hashed.
+        """
+        limit = self.task_size(piece_length)
+        if self.cache is None and not saved:
+            return [
+                [None, [spans]]
+                for spans in split_tasks(segments, piece_length, limit)
+            ]
+        pieces = split_tasks(segments, piece_length, piece_length)
+        if self.cache is None:
+            found = [None] * len(pieces)
+        else:
+            found = self.cache.get_pieces(pieces, piece_length)
+        for index in range(min(len(saved) // SHA1_SIZE, len(pieces))):
+            found[index] = saved[index * SHA1_SIZE : (index + 1) * SHA1_SIZE]
+        count = limit // piece_length
+        groups = []
+        for spans, digest in zip(pieces, found):
+            last = groups[-1] if groups else None
+            if digest is None:
+                if not last or last[0] is not None or len(last[1]) == count:
+                    last = [None, []]
+                    groups.append(last)
+            else:
+                if not last or last[0] is None:
+                    last = [[], []]
+                    groups.append(last)
+                last[0].append(digest)
+            last[1].append(spans)
+        return groups
+
+    def hash_v1(self, paths: list, piece_length: int, align=False) -> bytearray:
+        """
+        Calculate the v1 `pieces` value for the concatenated files.
+
+        Results are written by piece index into a `PieceStore` sized
+        from the total length of the content.
+
+        Parameters
+        ----------
+        paths : list
+            sorted list of file paths.
+        piece_length : int
+            size of torrent pieces.
+        align : bool
+            pad each file to the end of it's last piece.
+
+        Returns
+        -------
+        bytearray
+            concatenated sha1 piece hashes.
+        """
+        saved = b""
+        if self.checkpoint is not None:
+            kind = "v1-align" if align else "v1"
+            self.checkpoint.begin(kind, piece_length, paths)
+            saved = bytes(self.checkpoint.pieces)
+        segments = v1_segments(paths, piece_length, align, self.sizes)
+        groups = self._v1_groups(segments, piece_length, saved)
+        args = [
+            (merge_spans(pieces), piece_length, self.reader, self.queue_depth)
+            for digests, pieces in groups
+            if digests is None
+        ]
+        results = self._map(hash_v1_task, args)
+        total = sum(length for _, length in segments)
+        store = PieceStore(-(-total // piece_length))
+        index, current = 0, None
+        for digests, group in groups:
+            if digests is None:
+                digests = next(results)
+                if self.cache is not None:
+                    self.cache.put_pieces(
+                        group,
+                        [
+                            digests[i : i + SHA1_SIZE]
+                            for i in range(0, len(digests), SHA1_SIZE)
+                        ],
+                        piece_length,
+                    )
+            else:
+                digests = b"".join(digests)
+            store.put(index, digests)
+            index += len(digests) // SHA1_SIZE
+            if self.checkpoint is not None:
+                self.checkpoint.pieces = store.prefix()
+                self.checkpoint.update()
+            for path, _, length in merge_spans(group):
+                if path is None:
+                    continue
+                if path != current:
+                    if current:
+                        self.prog_close()
+                    current = path
+                    self.prog_start(file_size(path, self.sizes), path)
+                self.prog_update(length)
+        if current:
+            self.prog_close()
+        return store.data
+
+    def _stored_file(self, path: str, piece_length: int, hybrid: bool):
+        """
+        Rebuild the `FileHash` of a file from the checkpoint or cache.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        piece_length : int
+            size of torrent pieces.
+        hybrid : bool
+            the sha1 piece hashes are also required.
+
+        Returns
+        -------
+        FileHash
+            the file results or None if the file needs to be hashed.
+        """
+        found = None
+        if self.checkpoint is not None:
+            found = self.checkpoint.get_file(path)
+        if found is None and self.cache is not None:
+            found = self.cache.get_file(path, piece_length, hybrid)
+        if found is None:
+            return None
+        layers, pieces = found
+        size = file_size(path, self.sizes)
+        fhash = FileHash(path, piece_length)
+        for index in range(len(layers) // HASH_SIZE):
+            amount = min(piece_length, size - index * piece_length)
+            layer = layers[index * HASH_SIZE : (index + 1) * HASH_SIZE]
+            piece = None
+            if hybrid:
+                piece = pieces[index * SHA1_SIZE : (index + 1) * SHA1_SIZE]
+            fhash.add(layer, piece, amount)
+        return fhash.finish()
+
+    def _copy_file(self, fhash, path: str, hybrid: bool):
+        """
+        Reuse the results of a file for a duplicate of it.
+
+        Only links to the file that was hashed count as skipped, other
+        duplicates were read in full to compare them.
+
+        Parameters
+        ----------
+        fhash : FileHash
+            results of the file that was hashed.
+        path : str
+            path to the duplicate file.
+        hybrid : bool
+            the results include sha1 piece hashes.
+
+        Returns
+        -------
+        FileHash
+            the results for the duplicate.
+        """
+        copy = FileHash(path, fhash.piece_length)
+        copy.layer_hashes = list(fhash.layer_hashes)
+        copy.pieces = list(fhash.pieces)
+        copy.padding_file = fhash.padding_file
+        copy.finish()
+        size = file_size(path, self.sizes)
+        pieces = b"".join(copy.pieces) if hybrid else None
+        if self.cache is not None:
+            self.cache.put_file(
+                path, copy.piece_length, copy.piece_layer, pieces
+            )
+        if self.checkpoint is not None:
+            self.checkpoint.add_file(path, copy.piece_layer, pieces)
+        if os.path.samefile(path, fhash.path):
+            self.skipped += size
+        self.prog_start(size, path)
+        self.prog_update(size)
+        self.prog_close()
+        return copy
+
+    def hash_files(self, paths: list, piece_length: int, hybrid=False) -> dict:
+        """
+        Calculate the merkle trees for each file of a v2 or hybrid torrent.
+
+        Parameters
+        ----------
+        paths : list
+            file paths in the order they appear in the file tree.
+        piece_length : int
+            size of torrent pieces.
+        hybrid : bool
+            also calculate the zero padded v1 piece hashes.
+
+        Returns
+        -------
+        dict
+            map of file paths to `FileHash` results.
+        """
+        if self.checkpoint is not None:
+            kind = "hybrid" if hybrid else "v2"
+            self.checkpoint.begin(kind, piece_length, paths)
+        results, remaining = {}, []
+        for path in paths:
+            fhash = self._stored_file(path, piece_length, hybrid)
+            if fhash is None:
+                remaining.append(path)
+                continue
+            results[path] = fhash
+            size = file_size(path, self.sizes)
+            self.prog_start(size, path)
+            self.prog_update(size)
+            self.prog_close()
+        duplicates = {}
+        if self.dedupe:
+            duplicates = find_duplicates(
+                [(path, file_size(path, self.sizes)) for path in remaining],
+                self.occupancy,
+            )
+            remaining = [i for i in remaining if i not in duplicates]
+        limit = self.task_size(piece_length)
+        tasks = v2_tasks(remaining, piece_length, self.sizes, limit)
+        args = [
+            (
+                path,
+                offset,
+                length,
+                piece_length,
+                hybrid,
+                self.reader,
+                self.queue_depth,
+            )
+            for path, offset, length, _ in tasks
+        ]
+        for task, pieces in zip(tasks, self._map(hash_v2_task, args)):
+            path, offset, length, size = task
+            if offset == 0:
+                results[path] = FileHash(path, piece_length)
+                self.prog_start(size, path)
+            for layer_hash, piece, amount in pieces:
+                results[path].add(layer_hash, piece, amount)
+                self.prog_update(amount)
+            if offset + length == size:
+                fhash = results[path].finish()
+                pieces = b"".join(fhash.pieces) if hybrid else None
+                if self.cache is not None:
+                    self.cache.put_file(
+                        path, piece_length, fhash.piece_layer, pieces
+                    )
+                if self.checkpoint is not None:
+                    self.checkpoint.add_file(path, fhash.piece_layer, pieces)
+                self.prog_close()
+        for path, original in duplicates.items():
+            results[path] = self._copy_file(results[original], path, hybrid)
+        return results
+
+    def hash_formats(self, paths: list, piece_length: int) -> tuple:
+        """
+        Calculate the hashes of the v1, v2 and hybrid torrents in one read.
+
+        Every file is hashed once with `hash_formats_task`.  The results
+        are saved to the hash cache for later v2 and hybrid torrents, but
+        no checkpoint is kept since the v1 pieces span every file.
+
+        Parameters
+        ----------
+        paths : list
+            sorted list of file paths.
+        piece_length : int
+            size of torrent pieces.
+
+        Returns
+        -------
+        tuple
+            the v1 `pieces` value and the map of file paths to hybrid
+            `FileHash` results.
+        """
+        limit = self.task_size(piece_length)
+        tasks = v2_tasks(paths, piece_length, self.sizes, limit)
+        args, position = [], 0
+        for path, offset, length, _ in tasks:
+            args.append(
+                (
+                    path,
+                    offset,
+                    length,
+                    piece_length,
+                    position,
+                    self.reader,
+                    self.queue_depth,
+                )
+            )
+            position += length
+        results, store = {}, PieceStore(-(-position // piece_length))
+        piece, filled, index = sha1(), 0, 0  # nosec
+        for task, hashes in zip(tasks, self._map(hash_formats_task, args)):
+            path, offset, length, size = task
+            layers, head, digests, tail = hashes
+            piece.update(head)
+            filled += len(head)
+            if filled == piece_length:
+                store.put(index, piece.digest())
+                piece, filled, index = sha1(), 0, index + 1  # nosec
+            store.put(index, digests)
+            index += len(digests) // SHA1_SIZE
+            piece.update(tail)
+            filled += len(tail)
+            if offset == 0:
+                results[path] = FileHash(path, piece_length)
+                self.prog_start(size, path)
+            for layer_hash, sha1_piece, amount in layers:
+                results[path].add(layer_hash, sha1_piece, amount)
+                self.prog_update(amount)
+            if offset + length == size:
+                fhash = results[path].finish()
+                if self.cache is not None:
+                    self.cache.put_file(
+                        path,
+                        piece_length,
+                        fhash.piece_layer,
+                        b"".join(fhash.pieces),
+                    )
+                self.prog_close()
+        if filled:
+            store.put(index, piece.digest())
+        return store.data, results
+
+
+class SharedHashes:
+    """
+    Results of `HashEngine.hash_formats` used in place of an engine.
+
+    Each torrent creator given the shared hashes assembles it's meta file
+    from them instead of reading the content again.
+
+    Parameters
+    ----------
+    engine : HashEngine
+        the engine that calculated the hashes.
+    pieces : bytearray
+        the v1 `pieces` value.
+    files : dict
+        map of file paths to hybrid `FileHash` results.
+    """
+
+    def __init__(self, engine: HashEngine, pieces: bytearray, files: dict):
+        """Construct the shared results."""
+        self.sizes = engine.sizes
+        self.occupancy = engine.occupancy
+        self.skipped = 0
+        self.pieces = pieces
+        self.files = files
+
+    def hash_v1(self, paths: list, piece_length: int, align=False) -> bytearray:
+        """
+        Return the v1 `pieces` value.
+
+        Raises
+        ------
+        ValueError
+            piece aligned pieces were requested.
+        """
+        if align:
+            raise ValueError("shared hashes don't include aligned pieces")
+        return self.pieces
+
+    def hash_files(self, paths: list, piece_length: int, hybrid=False) -> dict:
+        """Return the `FileHash` results of the files."""
+        return {path: self.files[path] for path in paths}
@@ -0,0 +1,334 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Overlapped reading and hashing within a single hashing task.
+
+A reader thread fills a ring of preallocated buffers and queues them for
+the hashing thread, which returns each buffer to the ring once it has
+been hashed.  `hashlib` releases the GIL while hashing large buffers, so
+the next chunk is read from disk while the current one is hashed.  The
+ring is taken from a `BufferPool` and returned once the task is done,
+so the tasks run by a process reuse the same buffers.
+
+Memory mapped files aren't copied into the ring.  The reader thread
+queues views of the mapping and asks the kernel to start reading them
+with `MmapReader.prefetch`, so the hashers still get the mapped pages
+without a copy.
+
+The queue occupancy is sampled each time the hasher asks for a chunk.
+An empty queue means hashing waited on the disk, a full queue means the
+disk was waiting on hashing.  The same measurement counts the bytes that
+were read from files, leaving out holes and padding.
+"""
+
+import queue
+import threading
+
+from torrentfileQt.reader import (
+    CHUNK_SIZE,
+    MMAP,
+    data_ranges,
+    is_zeros,
+    mmap,
+    open_reader,
+    read_chunks,
+    zero_chunks,
+)
+
+QUEUE_DEPTH = 4
+MIN_LENGTH = 2 * CHUNK_SIZE  # shorter tasks are read in the hashing thread
+
+
+class Occupancy:
+    """Running measurement of how full the read ahead queue was."""
+
+    def __init__(self):
+        """Construct the empty measurement."""
+        self.filled = 0
+        self.capacity = 0
+        self.read = 0
+
+    def add(self, filled: int, depth: int):
+        """
+        Record a sample of the queue.
+
+        Parameters
+        ----------
+        filled : int
+            chunks waiting in the queue.
+        depth : int
+            size of the queue.
+        """
+        self.filled += filled
+        self.capacity += depth
+
+    def merge(self, other):
+        """Add the samples of another measurement."""
+        self.filled += other.filled
+        self.capacity += other.capacity
+        self.read += other.read
+
+    @property
+    def ratio(self) -> float:
+        """Return the average fraction of the queue that was full."""
+        return self.filled / self.capacity if self.capacity else 0.0
+
+
+class _Stopped(Exception):
+    """Raised in the reader thread when the hasher stops early."""
+
+
+def _new_buffer() -> memoryview:
+    """Allocate a page aligned buffer usable for direct reads."""
+    if mmap is not None:
+        return memoryview(mmap.mmap(-1, CHUNK_SIZE))
+    return memoryview(bytearray(CHUNK_SIZE))  # pragma: nocover
+
+
+class BufferPool:
+    """
+    Read buffers kept between the tasks run by a process.
+
+    Parameters
+    ----------
+    limit : int
+        maximum number of buffers kept.
+    """
+
+    def __init__(self, limit: int):
+        """Construct the empty pool."""
+        self.limit = limit
+        self.buffers = []
+        self.lock = threading.Lock()
+
+    def take(self) -> memoryview:
+        """Return a kept buffer, or a new one if none are left."""
+        with self.lock:
+            if self.buffers:
+                return self.buffers.pop()
+        return _new_buffer()
+
+    def give(self, buffers: list):
+        """Keep the buffers of a finished task for the next one."""
+        with self.lock:
+            room = max(0, self.limit - len(self.buffers))
+            self.buffers.extend(buffers[:room])
+
+    def clear(self):
+        """Free the kept buffers, buffers in use are kept by their task."""
+        with self.lock:
+            self.buffers.clear()
+
+
+BUFFERS = BufferPool(2 * (QUEUE_DEPTH + 2))
+
+
+def _mapped_chunks(file_reader, offset: int, length: int):
+    """
+    Yield views of a memory mapped file, prefetching each one.
+
+    Parameters
+    ----------
+    file_reader : MmapReader
+        the mapped file.
+    offset : int
+        starting position in the file.
+    length : int
+        number of bytes to read.
+
+    Yields
+    ------
+    memoryview
+        view of the mapping, holes as views of zeros.
+    """
+    fileno = file_reader.fd.fileno()
+    for start, end, data in data_ranges(fileno, offset, length):
+        if not data:
+            yield from zero_chunks(end - start)
+            continue
+        end = min(end, len(file_reader.view))
+        while start < end:
+            size = min(CHUNK_SIZE, end - start)
+            file_reader.prefetch(start, size)
+            yield file_reader.view[start : start + size]
+            start += size
+
+
+def _produce(spans: list, mode: str, ring: list, queues: tuple, stop):
+    """
+    Read the spans into free buffers and queue them for the hasher.
+
+    Memory mapped files are queued as views of the mapping, followed by
+    `(None, reader)` once every view has been queued, so the hasher can
+    close the reader after it has released them.
+
+    Parameters
+    ----------
+    spans : list
+        `(path, offset, length)` ranges, a path of None is zero padding.
+    mode : str
+        reader mode.
+    ring : list
+        buffers taken from `BUFFERS` for the task, and the mapped readers
+        the hasher hasn't closed yet.
+    queues : tuple
+        the `queue.SimpleQueue` of buffers ready to be filled, and the
+        `queue.Queue` of `(chunk, buffer)` pairs waiting to be hashed,
+        followed by None or the exception that stopped the reader.
+    stop : threading.Event
+        set when the hasher no longer wants the chunks.
+    """
+    free, filled = queues
+    buffers, mapped = ring
+
+    def put(chunk, buffer=None):
+        if stop.is_set():
+            raise _Stopped
+        filled.put((chunk, buffer))
+
+    def get_buffer():
+        if len(buffers) < filled.maxsize + 2:
+            buffers.append(BUFFERS.take())
+            return buffers[-1]
+        return free.get()
+
+    try:
+        for path, offset, length in spans:
+            if path is None:
+                for chunk in zero_chunks(length):
+                    put(chunk)
+                continue
+            file_reader = open_reader(path, mode)
+            if file_reader.mode == MMAP:
+                mapped.append(file_reader)
+                for chunk in _mapped_chunks(file_reader, offset, length):
+                    put(chunk)
+                put(None, file_reader)
+                continue
+            try:
+                fileno = file_reader.fd.fileno()
+                for start, end, data in data_ranges(fileno, offset, length):
+                    if not data:
+                        for chunk in zero_chunks(end - start):
+                            put(chunk)
+                    while data and start < end:
+                        buffer = get_buffer()
+                        chunk = file_reader.fill(buffer, start, end - start)
+                        if not chunk:
+                            free.put(buffer)
+                            break
+                        start += len(chunk)
+                        put(chunk, buffer)
+            finally:
+                file_reader.close()
+        filled.put(None)
+    except _Stopped:
+        pass
+    except BaseException as err:  # pylint: disable=broad-except
+        filled.put(err)
+
+
+def _discard(item, free):
+    """Release a chunk the hasher won't use and free it's buffer."""
+    if isinstance(item, tuple) and item[0] is not None:
+        item[0].release()
+        if item[1] is not None:
+            free.put(item[1])
+
+
+def read_spans(
+    spans: list, mode: str = MMAP, depth: int = QUEUE_DEPTH, stats=None
+):
+    """
+    Yield the contents of the spans, read ahead by a background thread.
+
+    Each chunk is only valid until the next chunk is requested, the same
+    as `read_chunks`.  Tasks shorter than `MIN_LENGTH` or a depth of 0
+    read in the calling thread.  Every view is released and every file
+    closed before the ring buffers are returned to `BUFFERS`.
+
+    Parameters
+    ----------
+    spans : list
+        `(path, offset, length)` ranges, a path of None is zero padding.
+    mode : str
+        reader mode.
+    depth : int
+        number of chunks the reader can get ahead of the hasher.
+    stats : Occupancy
+        receives a sample of the queue each time a chunk is requested,
+        and the length of each chunk read from a file.
+
+    Yields
+    ------
+    memoryview
+        file contents, holes and padding as views of zeros.
+    """
+    if depth < 1 or sum(span[2] for span in spans) < MIN_LENGTH:
+        for path, offset, length in spans:
+            for chunk in read_chunks(path, offset, length, mode):
+                if stats is not None and not is_zeros(chunk):
+                    stats.read += len(chunk)
+                yield chunk
+        return
+    free, filled = queue.SimpleQueue(), queue.Queue(depth)
+    ring = ([], [])
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_produce,
+        args=(spans, mode, ring, (free, filled), stop),
+        daemon=True,
+    )
+    thread.start()
+    try:
+        while True:
+            if stats is not None:
+                stats.add(filled.qsize(), depth)
+            item = filled.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            chunk, owner = item
+            if chunk is None:
+                owner.close()
+                ring[1].remove(owner)
+                continue
+            if stats is not None and not is_zeros(chunk):
+                stats.read += len(chunk)
+            try:
+                yield chunk
+            finally:
+                chunk.release()
+                if owner is not None:
+                    free.put(owner)
+    finally:
+        stop.set()
+        while thread.is_alive():
+            try:
+                item = filled.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            _discard(item, free)
+        thread.join()
+        while not filled.empty():
+            _discard(filled.get(), free)
+        for file_reader in ring[1]:
+            file_reader.close()
+        BUFFERS.give(ring[0])
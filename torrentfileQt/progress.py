@@ -0,0 +1,380 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Model, delegate and view for displaying the progress of many files.
+
+Rows are plain integers indexing into arrays of names, sizes and
+progress, and the progress bars are painted by a delegate, so a view of
+a torrent with hundreds of thousands of files doesn't create an object
+or widget for each row and only the visible rows are ever drawn.
+"""
+
+from array import array
+
+from PySide6.QtCore import (
+    Property,
+    QAbstractItemModel,
+    QModelIndex,
+    QRectF,
+    Qt,
+)
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import QStyledItemDelegate, QTreeView
+
+ROOT = -1
+PROGRESS_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class ProgressModel(QAbstractItemModel):
+    """
+    Tree model storing the size and progress of each file in arrays.
+
+    Parameters
+    ----------
+    parent : QWidget
+        parent widget.
+    """
+
+    def __init__(self, parent=None):
+        """Construct the empty model."""
+        super().__init__(parent)
+        self.header_data = ["Path", "Progress"]
+        self.names = []
+        self.icons = []
+        self.parents = array("q")
+        self.rows = array("q")
+        self.totals = array("q")
+        self.done = array("q")
+        self.labels = {}
+        self.children = {ROOT: []}
+
+    def clear(self):
+        """Remove every row from the model."""
+        self.beginResetModel()
+        self.names = []
+        self.icons = []
+        self.parents = array("q")
+        self.rows = array("q")
+        self.totals = array("q")
+        self.done = array("q")
+        self.labels = {}
+        self.children = {ROOT: []}
+        self.endResetModel()
+
+    def set_columns(self, names: list):
+        """
+        Change the column titles, a third column shows each row's label.
+
+        Parameters
+        ----------
+        names : list
+            title of each column.
+        """
+        self.beginResetModel()
+        self.header_data = list(names)
+        self.endResetModel()
+
+    def node_index(self, node: int, column: int = 0) -> QModelIndex:
+        """
+        Return the model index of a node.
+
+        Parameters
+        ----------
+        node : int
+            node id.
+        column : int
+            column number.
+
+        Returns
+        -------
+        QModelIndex
+            the index of the node.
+        """
+        if node == ROOT:
+            return QModelIndex()
+        return self.createIndex(self.rows[node], column, node)
+
+    def add_nodes(self, entries: list, parent: int = ROOT) -> list:
+        """
+        Append rows to a parent node.
+
+        Parameters
+        ----------
+        entries : list
+            `(name, total, icon)` for each row, a total of `None` adds a
+            folder that can contain other rows.
+        parent : int
+            id of the parent node.
+
+        Returns
+        -------
+        list
+            ids of the new nodes.
+        """
+        if not entries:
+            return []
+        siblings = self.children[parent]
+        first = len(siblings)
+        self.beginInsertRows(
+            self.node_index(parent), first, first + len(entries) - 1
+        )
+        nodes = []
+        for name, total, icon in entries:
+            node = len(self.names)
+            self.names.append(name)
+            self.icons.append(icon)
+            self.parents.append(parent)
+            self.rows.append(len(siblings))
+            self.totals.append(0 if total is None else total)
+            self.done.append(0)
+            if total is None:
+                self.children[node] = []
+            siblings.append(node)
+            nodes.append(node)
+        self.endInsertRows()
+        return nodes
+
+    def add_node(self, name: str, total, icon=None, parent: int = ROOT):
+        """
+        Append a single row to a parent node.
+
+        Parameters
+        ----------
+        name : str
+            text displayed in the first column.
+        total : int
+            size of the file or `None` for folders.
+        icon : QIcon
+            icon displayed next to the name.
+        parent : int
+            id of the parent node.
+
+        Returns
+        -------
+        int
+            id of the new node.
+        """
+        return self.add_nodes([(name, total, icon)], parent)[0]
+
+    def advance(self, node: int, amount: int):
+        """
+        Add to the progress of a file.
+
+        Parameters
+        ----------
+        node : int
+            node id.
+        amount : int
+            number of bytes completed.
+        """
+        self.advance_many({node: amount})
+
+    def advance_many(self, amounts: dict):
+        """
+        Add to the progress of many files with a single change notice.
+
+        Parameters
+        ----------
+        amounts : dict
+            number of bytes completed for each node id.
+        """
+        spans = {}
+        for node, amount in amounts.items():
+            self.done[node] = min(self.totals[node], self.done[node] + amount)
+            row, parent = self.rows[node], self.parents[node]
+            first, last = spans.get(parent, (row, row))
+            spans[parent] = (min(first, row), max(last, row))
+        for parent, (first, last) in spans.items():
+            siblings = self.children[parent]
+            self.dataChanged.emit(
+                self.node_index(siblings[first], 1),
+                self.node_index(siblings[last], 1),
+                [PROGRESS_ROLE],
+            )
+
+    def set_label(self, node: int, text: str):
+        """
+        Set the text shown in the third column of a row.
+
+        Parameters
+        ----------
+        node : int
+            node id.
+        text : str
+            text displayed when the model has a third column.
+        """
+        self.labels[node] = text
+        index = self.node_index(node, 2)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def progress(self, node: int):
+        """
+        Return the completed fraction of a file.
+
+        Parameters
+        ----------
+        node : int
+            node id.
+
+        Returns
+        -------
+        float
+            value between 0 and 1 or `None` for folders.
+        """
+        if node in self.children:
+            return None
+        if not self.totals[node]:
+            return 1.0
+        return self.done[node] / self.totals[node]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Return the column titles."""
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.header_data[section]
+        return None
+
+    def columnCount(self, _=QModelIndex()):
+        """Return the number of columns."""
+        return len(self.header_data)
+
+    def rowCount(self, parent=QModelIndex()):
+        """Return the number of rows under the parent index."""
+        if parent.column() > 0:
+            return 0
+        node = parent.internalId() if parent.isValid() else ROOT
+        return len(self.children.get(node, ()))
+
+    def index(self, row: int, column: int, parent=QModelIndex()):
+        """Return the index for the row and column of the parent index."""
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()  # pragma: nocover
+        node = parent.internalId() if parent.isValid() else ROOT
+        return self.createIndex(row, column, self.children[node][row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        """Return the index of the node's parent."""
+        if not index.isValid():
+            return QModelIndex()  # pragma: nocover
+        return self.node_index(self.parents[index.internalId()])
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        """Return the data for the index and role."""
+        if not index.isValid():
+            return None  # pragma: nocover
+        node = index.internalId()
+        if index.column() == 0:
+            if role == Qt.DisplayRole:
+                return self.names[node]
+            if role == Qt.DecorationRole:
+                return self.icons[node]
+            return None
+        if index.column() == 2:
+            return self.labels.get(node) if role == Qt.DisplayRole else None
+        value = self.progress(node)
+        if role == PROGRESS_ROLE:
+            return value
+        if role == Qt.DisplayRole and value is not None:
+            return f"{int(value * 100)}%"
+        return None
+
+
+class ProgressDelegate(QStyledItemDelegate):
+    """
+    Paint progress bars for the rows of a `ProgressModel`.
+
+    Parameters
+    ----------
+    parent : ProgressView
+        the view using the delegate.
+    """
+
+    def __init__(self, parent=None):
+        """Construct the delegate."""
+        super().__init__(parent)
+        self.bar_color = QColor("#3daee9")
+        self.border_color = QColor("#555555")
+
+    def paint(self, painter, option, index):
+        """Draw the progress bar for the index."""
+        value = index.data(PROGRESS_ROLE)
+        if value is None:
+            super().paint(painter, option, index)
+            return
+        rect = QRectF(option.rect).adjusted(2, 2, -2, -2)
+        radius = rect.height() / 2
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.bar_color)
+        if value > 0:
+            chunk = QRectF(rect)
+            chunk.setWidth(max(rect.height(), rect.width() * value))
+            painter.drawRoundedRect(chunk, radius, radius)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QPen(self.border_color, 2))
+        painter.drawRoundedRect(rect, radius, radius)
+        painter.setPen(option.palette.text().color())
+        painter.drawText(rect, Qt.AlignCenter, f"{int(value * 100)}%")
+        painter.restore()
+
+
+class ProgressView(QTreeView):
+    """
+    Tree view of a `ProgressModel` with painted progress bars.
+
+    The bar colors can be set from style sheets with
+    `qproperty-barColor` and `qproperty-barBorderColor`.
+
+    Parameters
+    ----------
+    parent : QWidget
+        parent widget.
+    """
+
+    def __init__(self, parent=None):
+        """Construct the view, model and delegate."""
+        super().__init__(parent=parent)
+        self.progress_model = ProgressModel(self)
+        self.delegate = ProgressDelegate(self)
+        self.setModel(self.progress_model)
+        self.setItemDelegateForColumn(1, self.delegate)
+        self.setUniformRowHeights(True)
+        header = self.header()
+        header.setSectionResizeMode(0, header.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        self.setColumnWidth(0, 360)
+
+    def getBarColor(self) -> QColor:
+        """Return the color of the progress bars."""
+        return self.delegate.bar_color
+
+    def setBarColor(self, color: QColor):
+        """Set the color of the progress bars."""
+        self.delegate.bar_color = QColor(color)
+
+    def getBarBorderColor(self) -> QColor:
+        """Return the border color of the progress bars."""
+        return self.delegate.border_color
+
+    def setBarBorderColor(self, color: QColor):
+        """Set the border color of the progress bars."""
+        self.delegate.border_color = QColor(color)
+
+    barColor = Property(QColor, getBarColor, setBarColor)
+    barBorderColor = Property(QColor, getBarBorderColor, setBarBorderColor)
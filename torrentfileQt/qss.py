@@ -355,27 +355,10 @@ QStatusBar {
     selection-background-color: $_18;
     color: $_1;
 }
-#CreateProgressTable QProgressBar {
-    border: 4px solid $_10;
-    border-radius: 14px;
-    background-color: transparent;
-    text-align: center;
-    color: $_1;
-}
-#CreateProgressTable QProgressBar::chunk{
-    background-color: $_19;
-    border-radius: 10px;
-}
-#checkTree QProgressBar {
-    border: 4px solid $_10;
-    border-radius: 14px;
-    background-color: transparent;
-    text-align: center;
-    color: $_1;
-}
-#checkTree QProgressBar::chunk{
-    background-color: $_19;
-    border-radius: 10px;
+#CreateProgressTable,
+#checkTree {
+    qproperty-barColor: $_19;
+    qproperty-barBorderColor: $_10;
 }
 #checkTree {
     margin-bottom: 8px;
@@ -0,0 +1,647 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+File readers that feed content to the hashers without copying it.
+
+Readers yield `memoryview` chunks of a file.  The memory mapped reader
+slices the mapping directly, the buffered reader fills one preallocated
+buffer with `readinto`.  In both cases a chunk is only valid until the
+next chunk is requested.
+
+Bulk reads can also bypass or drop the page cache, so hashing large
+content doesn't evict the cached data of other programs such as a
+running torrent client.  `"nocache"` reads through the buffered reader
+with it's own read-ahead hints and drops the pages it brought into the
+cache with `posix_fadvise` once they're hashed, leaving the pages that
+were already cached, `"direct"` reads with `O_DIRECT` into an aligned
+buffer and falls back to `"nocache"` where the file system doesn't
+support it.
+
+Holes in sparse files are found with `SEEK_DATA` and `SEEK_HOLE` where
+the platform supports them and are yielded as views of `ZEROS` instead
+of being read, so the hashers can recognise them with `is_zeros`.
+"""
+
+import errno
+import os
+
+try:
+    import mmap
+except ImportError:  # pragma: nocover
+    mmap = None
+
+try:
+    import ctypes
+
+    _mincore = ctypes.CDLL(None, use_errno=True).mincore
+    _mincore.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p)
+except (ImportError, AttributeError, OSError, TypeError):  # pragma: nocover
+    _mincore = None
+
+CHUNK_SIZE = 2**20  # 1MiB
+MMAP = "mmap"
+BUFFERED = "buffered"
+NOCACHE = "nocache"
+DIRECT = "direct"
+READERS = {
+    MMAP: "Memory Map",
+    BUFFERED: "Buffered",
+    NOCACHE: "Drop From Cache",
+    DIRECT: "Direct I/O",
+}
+DIRECT_ALIGN = 4096  # offset and buffer alignment for O_DIRECT reads
+READ_AHEAD = 2**22  # 4MiB
+ZEROS = bytes(CHUNK_SIZE)
+HOLE_ALIGN = 2**14  # holes are only skipped in whole 16KiB v2 blocks
+
+
+class BufferedReader:
+    """
+    Read file contents into a single preallocated buffer.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    chunk_size : int
+        size of the buffer.
+    """
+
+    mode = BUFFERED
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        """Open the file and allocate the buffer."""
+        self.path = path
+        self.fd = open(path, "rb", buffering=0)
+        self.buffer = bytearray(chunk_size)
+        self.view = memoryview(self.buffer)
+
+    def fill(self, buffer: memoryview, offset: int, length: int):
+        """
+        Read from the file into a buffer.
+
+        Parameters
+        ----------
+        buffer : memoryview
+            writable buffer, page aligned for direct reads.
+        offset : int
+            starting position in the file.
+        length : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the bytes read into the buffer, empty at end of file.
+        """
+        target = min(length, len(buffer))
+        filled = 0
+        self.fd.seek(offset)
+        while filled < target:
+            size = self.fd.readinto(buffer[filled:target])
+            if not size:
+                break
+            filled += size
+        return buffer[:filled]
+
+    def chunks(self, offset: int, length: int):
+        """
+        Yield the contents of the file between offset and offset + length.
+
+        Parameters
+        ----------
+        offset : int
+            starting position in the file.
+        length : int
+            number of bytes to read.
+
+        Yields
+        ------
+        memoryview
+            view of the reader's buffer.
+        """
+        while length > 0:
+            chunk = self.fill(self.view, offset, length)
+            size = len(chunk)
+            if size:
+                yield chunk
+            chunk.release()
+            if not size:
+                return
+            offset += size
+            length -= size
+
+    def close(self):
+        """Release the buffer and close the file."""
+        self.view.release()
+        self.fd.close()
+
+
+def advise(fd: int, offset: int, length: int, advice: str):
+    """
+    Pass a `posix_fadvise` hint to the kernel if the platform has it.
+
+    Parameters
+    ----------
+    fd : int
+        open file descriptor.
+    offset : int
+        start of the range.
+    length : int
+        length of the range, 0 means to the end of the file.
+    advice : str
+        name of the `os` constant, e.g. `"POSIX_FADV_DONTNEED"`.
+    """
+    if hasattr(os, "posix_fadvise") and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:  # pragma: nocover
+            pass
+
+
+def resident_pages(fd: int, offset: int, length: int):
+    """
+    Return which pages of a range of a file are in the page cache.
+
+    The range is mapped without being read and checked with `mincore`.
+
+    Parameters
+    ----------
+    fd : int
+        open file descriptor.
+    offset : int
+        start of the range, a multiple of `mmap.PAGESIZE`.
+    length : int
+        length of the range, ending at most at the end of the file.
+
+    Returns
+    -------
+    bytes
+        one byte for each page, 1 if it's cached, or None if the platform
+        can't tell.
+    """
+    if _mincore is None or mmap is None or length <= 0:
+        return None  # pragma: nocover
+    try:
+        mapping = mmap.mmap(fd, length, offset=offset, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):  # pragma: nocover
+        return None
+    pages = ctypes.create_string_buffer(-(-length // mmap.PAGESIZE))
+    try:
+        start = ctypes.c_char.from_buffer(mapping)
+        try:
+            status = _mincore(ctypes.addressof(start), length, pages)
+        finally:
+            del start
+    finally:
+        mapping.close()
+    if status:
+        return None  # pragma: nocover
+    return bytes(page & 1 for page in pages.raw)
+
+
+class NoCacheReader(BufferedReader):
+    """
+    Buffered reader that drops the pages it reads from the page cache.
+
+    The kernel's own read-ahead is turned off and the reader asks for
+    `READ_AHEAD` bytes ahead of the current chunk instead.  Before a
+    range is read or read ahead, the pages of it that are already cached
+    are found with `resident_pages`, and once a chunk is in the buffer
+    only the other pages are dropped, so the cached data of other
+    programs reading the same file stays in the cache.  Every page is
+    dropped where the platform can't tell which pages are cached.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    chunk_size : int
+        size of the buffer.
+    """
+
+    mode = NOCACHE
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        """Open the file and set the access pattern."""
+        super().__init__(path, chunk_size)
+        advise(self.fd.fileno(), 0, 0, "POSIX_FADV_RANDOM")
+        self.size = os.fstat(self.fd.fileno()).st_size
+        self.first = 0  # first page with a known residency
+        self.resident = b""
+
+    def check(self, offset: int, length: int):
+        """
+        Record which pages of a range were cached before it is read.
+
+        Pages already checked keep their recorded residency, since pages
+        read ahead by this reader are cached by the time they're read.
+
+        Parameters
+        ----------
+        offset : int
+            starting position in the file.
+        length : int
+            number of bytes that will be read or read ahead.
+        """
+        page = offset // mmap.PAGESIZE
+        known = self.first + len(self.resident)
+        if not self.first <= page <= known:
+            self.first, self.resident, known = page, b"", page
+        end = min(offset + length, self.size)
+        if end > known * mmap.PAGESIZE:
+            start = known * mmap.PAGESIZE
+            found = resident_pages(self.fd.fileno(), start, end - start)
+            if found is None:
+                found = bytes(-(-(end - start) // mmap.PAGESIZE))
+            self.resident += found
+        self.resident = self.resident[page - self.first :]
+        self.first = page
+
+    def drop(self, offset: int, length: int):
+        """
+        Drop the pages of a range that weren't cached before it was read.
+
+        Parameters
+        ----------
+        offset : int
+            starting position in the file.
+        length : int
+            number of bytes read.
+        """
+        fileno, end = self.fd.fileno(), offset + length
+        start = pos = offset
+        while pos < end:
+            page = pos // mmap.PAGESIZE
+            stop = min((page + 1) * mmap.PAGESIZE, end)
+            index = page - self.first
+            if 0 <= index < len(self.resident) and self.resident[index]:
+                if pos > start:
+                    advise(fileno, start, pos - start, "POSIX_FADV_DONTNEED")
+                start = stop
+            pos = stop
+        if end > start:
+            advise(fileno, start, end - start, "POSIX_FADV_DONTNEED")
+
+    def fill(self, buffer: memoryview, offset: int, length: int):
+        """
+        Read from the file into a buffer and drop it from the page cache.
+
+        Parameters
+        ----------
+        buffer : memoryview
+            writable buffer.
+        offset : int
+            starting position in the file.
+        length : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the bytes read into the buffer, empty at end of file.
+        """
+        if mmap is None:  # pragma: nocover
+            return super().fill(buffer, offset, length)
+        self.check(offset, min(length, len(buffer) + READ_AHEAD))
+        chunk = super().fill(buffer, offset, length)
+        size = len(chunk)
+        self.drop(offset, size)
+        if size < length:
+            ahead = min(READ_AHEAD, length - size)
+            advise(
+                self.fd.fileno(), offset + size, ahead, "POSIX_FADV_WILLNEED"
+            )
+        return chunk
+
+
+def _direct_opener(path: str, flags: int) -> int:
+    """Open the file descriptor for direct I/O."""
+    return os.open(path, flags | os.O_DIRECT)
+
+
+class DirectReader(BufferedReader):
+    """
+    Read file contents with `O_DIRECT`, bypassing the page cache.
+
+    Reads start on a multiple of `DIRECT_ALIGN` into a page aligned
+    anonymous memory map, the chunks are views into that buffer.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    chunk_size : int
+        size of the buffer, a multiple of `DIRECT_ALIGN`.
+
+    Raises
+    ------
+    OSError
+        the platform or file system doesn't support direct I/O.
+    """
+
+    mode = DIRECT
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        """Open the file and allocate the aligned buffer."""
+        if mmap is None or not hasattr(os, "O_DIRECT"):
+            raise OSError("direct I/O isn't supported")  # pragma: nocover
+        self.path = path
+        self.fd = open(path, "rb", buffering=0, opener=_direct_opener)
+        self.buffer = mmap.mmap(-1, chunk_size)
+        self.view = memoryview(self.buffer)
+        try:
+            self.fill(self.view, 0, DIRECT_ALIGN).release()
+        except OSError:  # pragma: nocover
+            self.close()
+            raise
+
+    def fill(self, buffer: memoryview, offset: int, length: int):
+        """
+        Read whole aligned blocks from the file into a buffer.
+
+        Parameters
+        ----------
+        buffer : memoryview
+            page aligned buffer, a multiple of `DIRECT_ALIGN` long.
+        offset : int
+            starting position in the file.
+        length : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the requested bytes within the buffer, empty at end
+            of file.
+        """
+        skip = offset % DIRECT_ALIGN
+        target = min(length + skip, len(buffer))
+        target = -(-target // DIRECT_ALIGN) * DIRECT_ALIGN
+        aligned = buffer[:target]
+        try:
+            filled = os.preadv(self.fd.fileno(), [aligned], offset - skip)
+        finally:
+            aligned.release()
+        return buffer[min(skip, filled) : min(filled, skip + length)]
+
+    def close(self):
+        """Release the buffer and close the file."""
+        self.view.release()
+        self.buffer.close()
+        self.fd.close()
+
+
+class MmapReader:
+    """
+    Read file contents through a read only memory map.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    chunk_size : int
+        maximum size of each yielded view.
+    """
+
+    mode = MMAP
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        """Open the file and map it into memory."""
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fd = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.fd.close()
+            raise
+        self.view = memoryview(self.map)
+
+    def prefetch(self, offset: int, length: int):
+        """
+        Ask the kernel to start reading a range of the mapping.
+
+        Parameters
+        ----------
+        offset : int
+            starting position in the file.
+        length : int
+            number of bytes that will be read.
+        """
+        advice = getattr(mmap, "MADV_WILLNEED", None)
+        if advice is None or not hasattr(self.map, "madvise"):
+            return  # pragma: nocover
+        start = offset - offset % mmap.PAGESIZE
+        end = min(offset + length, len(self.map))
+        if end > start:
+            self.map.madvise(advice, start, end - start)
+
+    def chunks(self, offset: int, length: int):
+        """
+        Yield the contents of the file between offset and offset + length.
+
+        Parameters
+        ----------
+        offset : int
+            starting position in the file.
+        length : int
+            number of bytes to read.
+
+        Yields
+        ------
+        memoryview
+            view of the mapped file.
+        """
+        end = min(offset + length, len(self.view))
+        while offset < end:
+            chunk = self.view[offset : min(end, offset + self.chunk_size)]
+            yield chunk
+            offset += len(chunk)
+            chunk.release()
+
+    def close(self):
+        """Release the map and close the file."""
+        self.view.release()
+        self.map.close()
+        self.fd.close()
+
+
+def open_reader(path: str, mode: str = MMAP):
+    """
+    Open a reader for the file, falling back to buffered reads.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    mode : str
+        one of the `READERS`.
+
+    Returns
+    -------
+    MmapReader | BufferedReader | NoCacheReader | DirectReader
+        the file reader.
+    """
+    if mode == DIRECT:
+        try:
+            return DirectReader(path)
+        except OSError:  # pragma: nocover
+            mode = NOCACHE
+    if mode == NOCACHE:
+        return NoCacheReader(path)
+    if mode == MMAP and mmap is not None and os.path.getsize(path):
+        try:
+            return MmapReader(path)
+        except (OSError, ValueError):  # pragma: nocover
+            pass
+    return BufferedReader(path)
+
+
+def zero_chunks(length: int):
+    """
+    Yield views of zero bytes used for padding.
+
+    Parameters
+    ----------
+    length : int
+        total number of zero bytes.
+
+    Yields
+    ------
+    memoryview
+        view of zero bytes.
+    """
+    view = memoryview(ZEROS)
+    while length > 0:
+        chunk = view[: min(length, CHUNK_SIZE)]
+        yield chunk
+        length -= len(chunk)
+
+
+def is_zeros(view: memoryview) -> bool:
+    """
+    Return True if the view is padding or a hole, which is all zeros.
+
+    Parameters
+    ----------
+    view : memoryview
+        chunk yielded by `read_chunks`.
+
+    Returns
+    -------
+    bool
+        the view was produced without reading the file.
+    """
+    return view.obj is ZEROS
+
+
+def data_ranges(fd: int, offset: int, length: int) -> list:
+    """
+    Split a range of a file into data and hole regions.
+
+    Parameters
+    ----------
+    fd : int
+        open file descriptor.
+    offset : int
+        starting position in the file.
+    length : int
+        number of bytes in the range.
+
+    Returns
+    -------
+    list
+        `(start, end, is_data)` for each region, a single data region if
+        the file isn't sparse or holes can't be detected.  Holes inside
+        the range start and end on multiples of `HOLE_ALIGN` so chunks
+        never split a v2 block.
+    """
+    stat = os.fstat(fd)
+    end = min(offset + length, stat.st_size)
+    blocks = getattr(stat, "st_blocks", None)
+    seekable = hasattr(os, "SEEK_DATA") and blocks is not None
+    if not seekable or blocks * 512 >= stat.st_size:
+        return [(offset, end, True)]
+    holes, pos = [], offset
+    try:
+        while pos < end:
+            try:
+                data = min(os.lseek(fd, pos, os.SEEK_DATA), end)
+            except OSError as err:
+                if err.errno != errno.ENXIO:
+                    raise
+                data = end
+            start, stop = pos, data
+            if start != offset:
+                start = -(-start // HOLE_ALIGN) * HOLE_ALIGN
+            if stop != end:
+                stop -= stop % HOLE_ALIGN
+            if stop > start:
+                holes.append((start, stop))
+            if data == end:
+                break
+            pos = min(os.lseek(fd, data, os.SEEK_HOLE), end)
+    except OSError:  # pragma: nocover
+        return [(offset, end, True)]
+    regions, pos = [], offset
+    for start, stop in holes:
+        if start > pos:
+            regions.append((pos, start, True))
+        regions.append((start, stop, False))
+        pos = stop
+    if pos < end or not regions:
+        regions.append((pos, end, True))
+    return regions
+
+
+def read_chunks(path: str, offset: int, length: int, mode: str = MMAP):
+    """
+    Yield the contents of a file, or zeros if path is None.
+
+    Holes in sparse files are yielded as zeros without being read.
+
+    Parameters
+    ----------
+    path : str
+        path to file or None for padding.
+    offset : int
+        starting position in the file.
+    length : int
+        number of bytes to read.
+    mode : str
+        reader mode.
+
+    Yields
+    ------
+    memoryview
+        view of the file contents.
+    """
+    if path is None:
+        yield from zero_chunks(length)
+        return
+    reader = open_reader(path, mode)
+    try:
+        for start, end, data in data_ranges(reader.fd.fileno(), offset, length):
+            if data:
+                yield from reader.chunks(start, end - start)
+            else:
+                yield from zero_chunks(end - start)
+    finally:
+        reader.close()
@@ -0,0 +1,937 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Piece verification for the recheck tab.
+
+The meta file is parsed and the content located by the torrentfile
+`Checker`, the hashing is done with the same tasks, readers and process
+pool used for creating torrents.  v1 content is divided into ranges of
+whole pieces and v2 content into ranges of each file's piece layer, and
+the results are yielded in order as the tasks complete.
+
+Files that are missing or have the wrong size fail without being hashed.
+Only the v1 pieces they share with other files are read, so the results
+of their neighbours are unchanged.  Pieces known to match from an earlier
+check aren't read either.
+"""
+
+import os
+from bisect import bisect_right
+from hashlib import sha256
+from itertools import accumulate, islice
+
+import pyben
+
+from torrentfileQt.hasher import (
+    HASH_SIZE,
+    HashEngine,
+    hash_v1_task,
+    hash_v2_task,
+)
+from torrentfileQt.pipeline import QUEUE_DEPTH
+from torrentfileQt.reader import MMAP
+
+SHA1 = 20
+SAMPLES = 4  # pieces sampled from each file
+
+FULL = "full"
+SIZES = "sizes"
+SAMPLED = "sampled"
+TARGETED = "targeted"
+CACHED = "cached"
+CHECK_MODES = {
+    FULL: "Full Recheck",
+    SIZES: "Quick: File Sizes",
+    SAMPLED: "Quick: Sampled Pieces",
+    TARGETED: "Quick, Then Full On Failures",
+}
+CONFIDENCE = {SIZES: "low", SAMPLED: "medium", FULL: "high", CACHED: "high"}
+
+
+def disk_size(path: str, length: int) -> int:
+    """
+    Return how many of the expected bytes exist on disk.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    length : int
+        file length recorded in the meta file.
+
+    Returns
+    -------
+    int
+        number of readable bytes up to `length`.
+    """
+    if os.path.isfile(path):
+        return min(os.path.getsize(path), length)
+    return 0
+
+
+def size_matches(path: str, length: int) -> bool:
+    """
+    Return True if a file exists with the expected length.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    length : int
+        file length recorded in the meta file.
+
+    Returns
+    -------
+    bool
+        the file exists and has the same size.
+    """
+    return os.path.isfile(path) and os.path.getsize(path) == length
+
+
+def plan_runs(runs: list, skipped: list) -> list:
+    """
+    Divide ranges of pieces into the parts that are hashed or skipped.
+
+    Parameters
+    ----------
+    runs : list
+        sorted ranges of piece indexes to check.
+    skipped : list
+        sorted ranges of piece indexes that aren't hashed.
+
+    Returns
+    -------
+    list
+        `(pieces, hashed)` for each part of the runs in order.
+    """
+    plan = []
+    first = 0
+    for run in runs:
+        while first < len(skipped) and skipped[first].stop <= run.start:
+            first += 1
+        start = run.start
+        for skip in skipped[first:]:
+            if skip.start >= run.stop:
+                break
+            if skip.start > start:
+                plan.append((range(start, skip.start), True))
+            stop = min(skip.stop, run.stop)
+            if stop > start:
+                plan.append((range(max(start, skip.start), stop), False))
+                start = stop
+        if start < run.stop:
+            plan.append((range(start, run.stop), True))
+    return plan
+
+
+def flag_runs(flags) -> list:
+    """
+    Return the ranges of consecutive set flags.
+
+    Parameters
+    ----------
+    flags : Sequence
+        1 or 0 for each piece.
+
+    Returns
+    -------
+    list
+        sorted ranges of the indexes that are set.
+    """
+    runs, start = [], None
+    for index, flag in enumerate(bytes(flags) + b"\x00"):
+        if flag and start is None:
+            start = index
+        elif not flag and start is not None:
+            runs.append(range(start, index))
+            start = None
+    return runs
+
+
+def info_hash(info: dict) -> str:
+    """
+    Return the key of a torrent in the recheck result cache.
+
+    Parameters
+    ----------
+    info : dict
+        the meta file's info dictionary.
+
+    Returns
+    -------
+    str
+        hex sha256 digest of the bencoded info dictionary.
+    """
+    return sha256(pyben.dumps(info)).hexdigest()
+
+
+def sample_pieces(pieces: range, count: int = SAMPLES) -> list:
+    """
+    Return evenly spaced pieces including the first and last.
+
+    Parameters
+    ----------
+    pieces : range
+        indexes of the pieces of a file.
+    count : int
+        number of pieces to sample.
+
+    Returns
+    -------
+    list
+        sampled piece indexes, every piece if there are no more than
+        `count`.
+    """
+    if len(pieces) <= count:
+        return list(pieces)
+    last = len(pieces) - 1
+    return [pieces[last * i // (count - 1)] for i in range(count)]
+
+
+def result_label(passed: bool, tier: str) -> str:
+    """
+    Describe the result of checking a file.
+
+    Parameters
+    ----------
+    passed : bool
+        the file passed the check.
+    tier : str
+        `SIZES`, `SAMPLED`, `FULL` or `CACHED`.
+
+    Returns
+    -------
+    str
+        text shown next to the file, with the confidence of a pass.
+    """
+    if passed:
+        return f"Passed ({CONFIDENCE[tier]} confidence)"
+    return f"Failed ({tier} check)"
+
+
+class PieceIndex:
+    """
+    Map v1 pieces to the byte ranges of the files they cover.
+
+    The start offset of each file in the concatenated content is kept in
+    a sorted list, so the files of a piece are found with a binary search
+    and results can be applied in any order.
+
+    Parameters
+    ----------
+    lengths : list
+        length of each file in torrent order.
+    piece_length : int
+        piece length of the torrent.
+    """
+
+    def __init__(self, lengths: list, piece_length: int):
+        """Build the offsets of each file."""
+        self.lengths = list(lengths)
+        self.piece_length = piece_length
+        self.offsets = [0, *accumulate(self.lengths)]
+        self.total = self.offsets[-1]
+        self.pieces = -(-self.total // piece_length)
+
+    def file_at(self, offset: int) -> int:
+        """
+        Return the index of the file containing a byte of the content.
+
+        Parameters
+        ----------
+        offset : int
+            position in the concatenated content.
+
+        Returns
+        -------
+        int
+            index of the file, empty files are never returned.
+        """
+        return bisect_right(self.offsets, offset) - 1
+
+    def ranges(self, start: int, end: int) -> list:
+        """
+        Return the parts of each file in a range of the content.
+
+        Parameters
+        ----------
+        start : int
+            first byte of the range.
+        end : int
+            end of the range.
+
+        Returns
+        -------
+        list
+            `(file index, offset in file, size)` for each file.
+        """
+        ranges = []
+        number = self.file_at(start)
+        while start < end:
+            stop = min(end, self.offsets[number + 1])
+            if stop > start:
+                offset = start - self.offsets[number]
+                ranges.append((number, offset, stop - start))
+            start = stop
+            number += 1
+        return ranges
+
+    def piece_range(self, index: int) -> tuple:
+        """
+        Return the start and end of a piece in the content.
+
+        Parameters
+        ----------
+        index : int
+            piece index.
+
+        Returns
+        -------
+        tuple
+            first byte and end of the piece.
+
+        Raises
+        ------
+        IndexError
+            the piece is outside of the content.
+        """
+        if not 0 <= index < self.pieces:
+            raise IndexError(index)
+        start = index * self.piece_length
+        return start, min(start + self.piece_length, self.total)
+
+    def spans(self, index: int) -> list:
+        """
+        Return the parts of each file covered by a piece.
+
+        Parameters
+        ----------
+        index : int
+            piece index.
+
+        Returns
+        -------
+        list
+            `(file index, offset in file, size)` for each file.
+
+        Raises
+        ------
+        IndexError
+            the piece is outside of the content.
+        """
+        return self.ranges(*self.piece_range(index))
+
+    def file_pieces(self, number: int) -> range:
+        """
+        Return the indexes of the pieces containing a file's data.
+
+        Parameters
+        ----------
+        number : int
+            index of the file.
+
+        Returns
+        -------
+        range
+            piece indexes, empty for an empty file.
+        """
+        start, end = self.offsets[number], self.offsets[number + 1]
+        if start == end:
+            return range(0)
+        return range(start // self.piece_length, -(-end // self.piece_length))
+
+    def completion(self, matched: bytearray) -> list:
+        """
+        Return how many bytes of each file are in matching pieces.
+
+        Pieces inside a file are counted together, only the pieces at
+        either end of the file are measured separately.
+
+        Parameters
+        ----------
+        matched : bytearray
+            1 for each piece that matched, 0 otherwise.
+
+        Returns
+        -------
+        list
+            matched bytes of each file.
+        """
+        results = []
+        for number in range(len(self.lengths)):
+            pieces = self.file_pieces(number)
+            if not pieces:
+                results.append(0)
+                continue
+            first, last = pieces[0], pieces[-1]
+            inner = matched.count(1, first + 1, last) if last > first else 0
+            size = inner * self.piece_length
+            for index in {first, last}:
+                if matched[index]:
+                    start = max(index * self.piece_length, self.offsets[number])
+                    end = min(
+                        (index + 1) * self.piece_length,
+                        self.offsets[number + 1],
+                    )
+                    size += end - start
+            results.append(size)
+        return results
+
+
+class PieceChecker:
+    """
+    Compare torrent contents on disk with the hashes in the meta file.
+
+    Iterating yields `(actual, expected, path, size)` for every piece,
+    the same values produced by `Checker.iter_hashes`.  When `files` is
+    given only the pieces containing those files are checked.
+
+    Parameters
+    ----------
+    checker : Checker
+        torrentfile checker with the parsed meta file and content root.
+    reader : str
+        file reader mode.
+    token : ControlToken
+        pause and cancel requests checked between pieces.
+    queue_depth : int
+        number of chunks read ahead of the hashing.
+    workers : int
+        number of hashing processes.
+    files : Iterable
+        indexes of the files to check, defaults to every file.
+    known : dict
+        file index to the flags of it's pieces, see `file_pieces`, that
+        matched in an earlier check and aren't hashed again.
+    """
+
+    def __init__(
+        self,
+        checker,
+        reader: str = MMAP,
+        token=None,
+        queue_depth: int = QUEUE_DEPTH,
+        workers: int = 1,
+        files=None,
+        known=None,
+    ):
+        """Construct the piece checker."""
+        self.checker = checker
+        self.reader = reader
+        self.token = token
+        self.queue_depth = queue_depth
+        self.engine = HashEngine(
+            workers, reader=reader, token=token, queue_depth=queue_depth
+        )
+        self.piece_length = checker.piece_length
+        self.paths = checker.paths
+        self.lengths = [
+            checker.fileinfo[i]["length"] for i in range(len(self.paths))
+        ]
+        self.files = range(len(self.paths)) if files is None else files
+        self.files = sorted(set(self.files))
+        self.index = PieceIndex(self.lengths, self.piece_length)
+        self.known = known if known else {}
+        self.result = 0
+
+    def __iter__(self):
+        """Yield the results of comparing each piece."""
+        for _, actual, expected, path, size in self.iter_pieces():
+            yield actual, expected, path, size
+
+    def iter_pieces(self, invalid=None):
+        """
+        Yield the results of comparing each piece with it's index.
+
+        Pieces containing only missing or wrong sized files aren't read
+        and are yielded with an empty actual hash, pieces that are known
+        to match aren't read and are yielded with the expected hash.
+
+        Parameters
+        ----------
+        invalid : set
+            indexes of the missing or wrong sized files, found with
+            `wrong_sizes` if not given.
+
+        Yields
+        ------
+        tuple
+            index, actual hash, expected hash, path and size of each
+            piece, the index of a v2 piece counts from the start of it's
+            file.
+        """
+        matched = consumed = 0
+        if invalid is None:
+            invalid = self.wrong_sizes()
+        if self.checker.meta_version == 1:
+            runs = self.piece_runs()
+            total = sum(self.run_range(run)[1] for run in runs)
+            total -= sum(self.run_range(run)[0] for run in runs)
+            known = self.known_pieces()
+            skipped = bytearray(known)
+            for run in self.skipped_runs(invalid):
+                skipped[run.start : run.stop] = b"\x01" * len(run)
+            results = self.iter_v1(plan_runs(runs, flag_runs(skipped)), known)
+        else:
+            total = sum(self.lengths[i] for i in self.files)
+            results = self.iter_v2(invalid)
+        for index, actual, expected, path, size in results:
+            if self.token is not None:
+                self.token.check()
+            consumed += size
+            if actual == expected:
+                matched += size
+            yield index, actual, expected, path, size
+            if actual or consumed == total:
+                self.checker.log_msg(
+                    "Processed: %s%%, Matched: %s%%",
+                    str(int(consumed / total * 100)),
+                    str(int(matched / consumed * 100)),
+                )
+        self.result = (matched / consumed) * 100 if consumed > 0 else 0
+
+    def wrong_sizes(self) -> set:
+        """
+        Return the files that are missing or have the wrong size.
+
+        Returns
+        -------
+        set
+            indexes of every file in the torrent that can't match.
+        """
+        return {
+            number
+            for number, item in enumerate(zip(self.paths, self.lengths))
+            if not size_matches(*item)
+        }
+
+    def skipped_runs(self, invalid: set) -> list:
+        """
+        Return the v1 pieces containing only files that can't match.
+
+        Parameters
+        ----------
+        invalid : set
+            indexes of the missing or wrong sized files.
+
+        Returns
+        -------
+        list
+            sorted ranges of piece indexes that don't need hashing.
+        """
+        runs, start = [], None
+        for number, length in enumerate(self.lengths + [None]):
+            if length is not None and (number in invalid or not length):
+                if start is None:
+                    start = self.index.offsets[number]
+                continue
+            if start is None:
+                continue
+            end = self.index.offsets[number]
+            first = -(-start // self.piece_length)
+            last = end // self.piece_length
+            if end == self.index.total:
+                last = self.index.pieces
+            if last > first:
+                runs.append(range(first, last))
+            start = None
+        return runs
+
+    def file_pieces(self, number: int) -> range:
+        """
+        Return the indexes of the pieces of a file used in the results.
+
+        Parameters
+        ----------
+        number : int
+            index of the file.
+
+        Returns
+        -------
+        range
+            v1 piece indexes, or the pieces counted from the start of a
+            v2 file.
+        """
+        if self.checker.meta_version == 1:
+            return self.index.file_pieces(number)
+        return range(-(-self.lengths[number] // self.piece_length))
+
+    def known_pieces(self) -> bytearray:
+        """
+        Return the v1 pieces that matched in an earlier check.
+
+        A piece shared by several files is only known if it's known for
+        every one of them.
+
+        Returns
+        -------
+        bytearray
+            1 for each known piece, 0 otherwise.
+        """
+        if not self.known:
+            return bytearray(self.index.pieces)
+        known = bytearray(b"\x01") * self.index.pieces
+        for number in range(len(self.lengths)):
+            flags = self.known.get(number, b"")
+            for pos, index in enumerate(self.index.file_pieces(number)):
+                if pos >= len(flags) or not flags[pos]:
+                    known[index] = 0
+        return known
+
+    def on_disk(self) -> list:
+        """Return how many bytes of each file exist on disk."""
+        return [disk_size(*item) for item in zip(self.paths, self.lengths)]
+
+    def content_spans(self, start: int, end: int, on_disk: list) -> list:
+        """
+        Return the spans read for a range of the v1 content.
+
+        Parameters
+        ----------
+        start : int
+            first byte of the range.
+        end : int
+            end of the range.
+        on_disk : list
+            bytes of each file that exist on disk.
+
+        Returns
+        -------
+        list
+            `(path, offset, length)` spans, missing data is replaced
+            with zeros so every piece keeps it's position.
+        """
+        spans = []
+        for number, offset, size in self.index.ranges(start, end):
+            amount = max(0, min(size, on_disk[number] - offset))
+            if amount:
+                spans.append((self.paths[number], offset, amount))
+            if size > amount:
+                spans.append((None, 0, size - amount))
+        return spans
+
+    def piece_runs(self) -> list:
+        """
+        Return the ranges of consecutive v1 pieces containing the files.
+
+        Returns
+        -------
+        list
+            ranges of piece indexes in order.
+        """
+        runs = []
+        for number in self.files:
+            pieces = self.index.file_pieces(number)
+            if not pieces:
+                continue
+            if runs and pieces.start <= runs[-1].stop:
+                stop = max(runs[-1].stop, pieces.stop)
+                runs[-1] = range(runs[-1].start, stop)
+            else:
+                runs.append(pieces)
+        return runs
+
+    def run_range(self, run: range) -> tuple:
+        """Return the start and end in the content of a range of pieces."""
+        start = run.start * self.piece_length
+        return start, min(run.stop * self.piece_length, self.index.total)
+
+    def v1_tasks(self, plan: list) -> tuple:
+        """
+        Divide the hashed ranges of a plan into tasks.
+
+        Parameters
+        ----------
+        plan : list
+            `(pieces, hashed)` ranges of consecutive piece indexes from
+            `plan_runs`.
+
+        Returns
+        -------
+        tuple
+            `hash_v1_task` arguments for each chunk of pieces hashed and
+            `(pieces, hashed)` for every chunk in order.
+        """
+        on_disk = self.on_disk()
+        count = self.engine.task_size(self.piece_length) // self.piece_length
+        tasks, chunks = [], []
+        for run, hashed in plan:
+            if not hashed:
+                chunks.append((run, False))
+                continue
+            for first in range(run.start, run.stop, count):
+                chunk = range(first, min(first + count, run.stop))
+                spans = self.content_spans(*self.run_range(chunk), on_disk)
+                tasks.append(
+                    (spans, self.piece_length, self.reader, self.queue_depth)
+                )
+                chunks.append((chunk, True))
+        return tasks, chunks
+
+    def iter_v1(self, plan: list, known: bytearray):
+        """
+        Hash ranges of the concatenated contents in piece length chunks.
+
+        Parameters
+        ----------
+        plan : list
+            `(pieces, hashed)` ranges of consecutive piece indexes from
+            `plan_runs`.
+        known : bytearray
+            1 for each piece that matched in an earlier check.
+
+        Yields
+        ------
+        tuple
+            index, actual hash, expected hash, path and size of each
+            piece, the actual hash is the expected hash for known pieces
+            and empty for other pieces not hashed.
+        """
+        tasks, chunks = self.v1_tasks(plan)
+        pieces = self.checker.info["pieces"]
+        results = self.engine._map(hash_v1_task, tasks)
+        for chunk, hashed in chunks:
+            digests = b""
+            if hashed:
+                digests = next(results, None)
+                if digests is None:
+                    return
+            for index in chunk:
+                start, end = self.index.piece_range(index)
+                path = self.paths[self.index.file_at(end - 1)]
+                pos = (index - chunk.start) * SHA1
+                actual = digests[pos : pos + SHA1]
+                expected = pieces[index * SHA1 : (index + 1) * SHA1]
+                if known[index]:
+                    actual = expected
+                yield index, actual, expected, path, end - start
+
+    def file_layer(self, number: int) -> bytes:
+        """
+        Return the piece layer of a v2 file from the meta file.
+
+        Parameters
+        ----------
+        number : int
+            index of the file.
+
+        Returns
+        -------
+        bytes
+            concatenated layer hashes, the `pieces root` of a file no
+            larger than a piece.
+        """
+        root = self.checker.fileinfo[number]["pieces root"]
+        if self.lengths[number] > self.piece_length:
+            return self.checker.meta["piece layers"][root]
+        return root
+
+    def iter_v2(self, invalid: set):
+        """
+        Hash each file and compare it's piece layer with the meta file.
+
+        Parameters
+        ----------
+        invalid : set
+            indexes of the missing or wrong sized files, which aren't
+            hashed.
+
+        Yields
+        ------
+        tuple
+            index, actual hash, expected hash, path and size of each
+            piece, the actual hash is the expected hash for known pieces.
+        """
+        files, tasks = [], []
+        for number in self.files:
+            if not self.lengths[number]:
+                continue
+            plan = [(self.file_pieces(number), True, 0)]
+            if number not in invalid:
+                plan = self.layer_plan(number, tasks)
+            files.append((number, plan))
+        results = self.engine._map(hash_v2_task, tasks)
+        for number, plan in files:
+            path, length = self.paths[number], self.lengths[number]
+            layers = self.file_layer(number)
+            for run, hashed, count in plan:
+                actual = (
+                    layer_hash
+                    for result in islice(results, count)
+                    for layer_hash, _, _ in result
+                )
+                for index in run:
+                    start = index * HASH_SIZE
+                    expected = layers[start : start + HASH_SIZE]
+                    digest = next(actual, b"") if hashed else expected
+                    size = length - index * self.piece_length
+                    size = min(self.piece_length, size)
+                    yield index, digest, expected, path, size
+
+    def layer_plan(self, number: int, tasks: list) -> list:
+        """
+        Divide the pieces of a v2 file into the known and hashed runs.
+
+        Parameters
+        ----------
+        number : int
+            index of the file.
+        tasks : list
+            the `hash_v2_task` arguments of the hashed runs are added to
+            it.
+
+        Returns
+        -------
+        list
+            `(pieces, hashed, tasks)` for each run of the file's pieces,
+            with the number of tasks added for it.
+        """
+        path, length = self.paths[number], self.lengths[number]
+        known = flag_runs(self.known.get(number, b""))
+        plan = []
+        for run, hashed in plan_runs([self.file_pieces(number)], known):
+            run_tasks = self.layer_tasks(path, length, run) if hashed else []
+            plan.append((run, hashed, len(run_tasks)))
+            tasks.extend(run_tasks)
+        return plan
+
+    def layer_tasks(self, path: str, length: int, pieces=None) -> list:
+        """
+        Return the tasks hashing the piece layer of the data on disk.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        length : int
+            file length recorded in the meta file.
+        pieces : range
+            pieces of the file to hash, defaults to every piece.
+
+        Returns
+        -------
+        list
+            `hash_v2_task` arguments for each range of the file that
+            exists on disk.
+        """
+        start, end = 0, disk_size(path, length)
+        if pieces is not None:
+            start = pieces.start * self.piece_length
+            end = min(end, pieces.stop * self.piece_length)
+        limit = self.engine.task_size(self.piece_length)
+        args = (self.piece_length, False, self.reader, self.queue_depth)
+        return [
+            (path, offset, min(limit, end - offset), *args)
+            for offset in range(start, end, limit)
+        ]
+
+    def check_sizes(self) -> dict:
+        """
+        Compare the size of each file on disk with the meta file.
+
+        No file data is read.
+
+        Returns
+        -------
+        dict
+            file index to `True` if the file exists with it's length.
+        """
+        return {
+            number: size_matches(self.paths[number], self.lengths[number])
+            for number in self.files
+        }
+
+    def check_samples(self, files: list) -> dict:
+        """
+        Hash a sample of the pieces of each file.
+
+        Parameters
+        ----------
+        files : list
+            indexes of the files to sample.
+
+        Returns
+        -------
+        dict
+            file index to `True` if every sampled piece matched.
+        """
+        tasks, owners = [], []
+        if self.checker.meta_version == 1:
+            on_disk = self.on_disk()
+            for number in files:
+                for index in sample_pieces(self.index.file_pieces(number)):
+                    piece = self.index.piece_range(index)
+                    spans = self.content_spans(*piece, on_disk)
+                    task = (spans, self.piece_length, self.reader)
+                    tasks.append(task + (self.queue_depth,))
+                    owners.append((number, index))
+            func = hash_v1_task
+        else:
+            for number in files:
+                path, length = self.paths[number], self.lengths[number]
+                count = -(-length // self.piece_length)
+                for index in sample_pieces(range(count)):
+                    offset = index * self.piece_length
+                    size = min(self.piece_length, length - offset)
+                    task = (path, offset, size, self.piece_length, False)
+                    tasks.append(task + (self.reader, self.queue_depth))
+                    owners.append((number, index))
+            func = hash_v2_task
+        results = {number: True for number in files}
+        pieces = self.checker.info.get("pieces")
+        hashes = self.engine._map(func, tasks)
+        for (number, index), result in zip(owners, hashes):
+            if func is hash_v1_task:
+                actual = bytes(result)
+                expected = pieces[index * SHA1 : (index + 1) * SHA1]
+            else:
+                actual = result[0][0]
+                layers = self.file_layer(number)
+                expected = layers[index * HASH_SIZE : (index + 1) * HASH_SIZE]
+            if actual != expected:
+                results[number] = False
+        return results
+
+    def quick_check(self, sample: bool = True) -> dict:
+        """
+        Check the files without hashing all of their contents.
+
+        File sizes are compared first, then a sample of the pieces of
+        each file with the right size is hashed.
+
+        Parameters
+        ----------
+        sample : bool
+            hash sampled pieces of the files with the right size.
+
+        Returns
+        -------
+        dict
+            file index to `(passed, tier)`, the tier being `SIZES` or
+            `SAMPLED` for the last check the file went through.
+        """
+        results = {
+            number: (passed, SIZES)
+            for number, passed in self.check_sizes().items()
+        }
+        if sample:
+            passed = [number for number, (ok, _) in results.items() if ok]
+            for number, ok in self.check_samples(passed).items():
+                results[number] = (ok, SAMPLED)
+        return results
@@ -0,0 +1,155 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Single pass directory scan shared by the create tab and the creators.
+
+The tree is walked once with `os.scandir`, recording the sorted contents
+of each directory and the size of each file.  The result provides the
+file lists and sizes needed for every torrent version, so creating a
+torrent after selecting it's contents doesn't walk the tree again.
+"""
+
+import os
+
+from torrentfile import utils
+
+from torrentfileQt.control import Cancelled
+
+
+class ScanCancelled(Cancelled):
+    """Raised when a scan is stopped before it completes."""
+
+
+class ScanResult:
+    """
+    Contents of a file or directory tree.
+
+    Parameters
+    ----------
+    path : str
+        the scanned path.
+    """
+
+    def __init__(self, path: str):
+        """Construct the empty result."""
+        self.path = path
+        self.children = {}
+        self.sizes = {}
+        self.total = 0
+
+    def tree_order(self, path: str = None) -> list:
+        """
+        Return file paths in the order they appear in a v2 file tree.
+
+        Parameters
+        ----------
+        path : str
+            starting directory, defaults to the scanned path.
+
+        Returns
+        -------
+        list
+            file paths.
+        """
+        path = self.path if path is None else path
+        if path in self.sizes:
+            return [path]
+        paths = []
+        for name in self.children.get(path, ()):
+            paths.extend(self.tree_order(os.path.join(path, name)))
+        return paths
+
+    def file_list(self) -> list:
+        """
+        Return file paths in the order used for v1 torrents.
+
+        Returns
+        -------
+        list
+            sorted file paths.
+        """
+        return sorted(self.sizes)
+
+    def is_file(self, path: str) -> bool:
+        """Return True if the scanned path is a file."""
+        return path in self.sizes
+
+    def apply(self):
+        """
+        Share the result with the torrentfile utilities.
+
+        `torrentfile.utils.filelist_total` memoizes it's result for each
+        path, seeding it means calculating the piece length and creating
+        the torrent reuse this scan instead of walking the tree again.
+        """
+        utils.filelist_total.cache[self.path] = (self.total, self.file_list())
+
+
+def scan_tree(path: str, callback=None, cancelled=None) -> ScanResult:
+    """
+    Walk a file or directory tree recording it's contents.
+
+    Parameters
+    ----------
+    path : str
+        path to file or directory.
+    callback : Callable
+        called with the running file count and total size after each file.
+    cancelled : Callable
+        returns True if the scan should stop.
+
+    Returns
+    -------
+    ScanResult
+        the scanned tree.
+
+    Raises
+    ------
+    ScanCancelled
+        the scan was stopped.
+    """
+    result = ScanResult(path)
+    if os.path.isfile(path):
+        result.sizes[path] = os.path.getsize(path)
+        result.total = result.sizes[path]
+        if callback:
+            callback(1, result.total)
+        return result
+    stack = [path] if os.path.isdir(path) else []
+    while stack:
+        if cancelled and cancelled():
+            raise ScanCancelled(path)
+        current = stack.pop()
+        names, subdirs = [], []
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    size = entry.stat().st_size
+                    result.sizes[entry.path] = size
+                    result.total += size
+                    if callback:
+                        callback(len(result.sizes), result.total)
+                else:
+                    continue
+                names.append(entry.name)
+        result.children[current] = sorted(names)
+        stack.extend(sorted(subdirs, reverse=True))
+    return result
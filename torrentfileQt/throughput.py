@@ -0,0 +1,177 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Record of the hashing throughput measured for each mounted file system.
+
+The sustained throughput of each completed job is saved under the mount
+point of it's content, so the duration of a new job can be predicted
+from it's size before it starts.  Jobs smaller than `MIN_BYTES` are
+mostly served from the page cache and aren't recorded.
+"""
+
+import json
+import os
+import threading
+
+from torrentfileQt.cache import config_dir
+
+MIN_BYTES = 2**26  # 64MiB
+SMOOTHING = 0.5  # weight of the newest measurement
+
+_lock = threading.Lock()
+
+
+def throughput_path() -> str:
+    """
+    Return the default location of the throughput record.
+
+    Returns
+    -------
+    str
+        path to the JSON file.
+    """
+    return os.path.join(config_dir(), "throughput.json")
+
+
+def mount_point(path: str) -> str:
+    """
+    Return the mount point of the file system containing path.
+
+    Parameters
+    ----------
+    path : str
+        path to file or directory.
+
+    Returns
+    -------
+    str
+        the nearest parent directory that is a mount point.
+    """
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class ThroughputLog:
+    """
+    Measured bytes per second of hashing for each mount point.
+
+    Parameters
+    ----------
+    path : str
+        path to the JSON file, defaults to `throughput_path()`.
+    """
+
+    def __init__(self, path: str = None):
+        """Read the saved measurements."""
+        self.path = path if path else throughput_path()
+        self.rates = self.load()
+
+    def load(self) -> dict:
+        """
+        Read the measurements from the file.
+
+        Returns
+        -------
+        dict
+            mount point to bytes per second, empty if the file is missing
+            or invalid.
+        """
+        try:
+            with open(self.path, "rt", encoding="utf8") as fd:
+                rates = json.load(fd)
+        except (OSError, ValueError):
+            return {}
+        return rates if isinstance(rates, dict) else {}
+
+    def rate(self, path: str):
+        """
+        Return the recorded throughput of the file system holding path.
+
+        Parameters
+        ----------
+        path : str
+            path to torrent content.
+
+        Returns
+        -------
+        float
+            bytes per second or None if nothing was recorded.
+        """
+        return self.rates.get(mount_point(path))
+
+    def estimate(self, path: str, total: int):
+        """
+        Predict the number of seconds needed to hash the content.
+
+        Parameters
+        ----------
+        path : str
+            path to torrent content.
+        total : int
+            size of the content.
+
+        Returns
+        -------
+        float
+            predicted duration or None if it can't be predicted.
+        """
+        rate = self.rate(path)
+        if not rate or not total:
+            return None
+        return total / rate
+
+    def record(self, path: str, total: int, seconds: float):
+        """
+        Add the throughput of a completed job to the record.
+
+        The measurement is averaged with the recorded value and the file
+        is read again before saving, so jobs completing at the same time
+        don't discard each other's measurements.
+
+        Parameters
+        ----------
+        path : str
+            path to torrent content.
+        total : int
+            number of bytes hashed.
+        seconds : float
+            time taken to hash them.
+        """
+        if total < MIN_BYTES or seconds <= 0:
+            return
+        mount = mount_point(path)
+        measured = total / seconds
+        with _lock:
+            self.rates = self.load()
+            previous = self.rates.get(mount)
+            if previous:
+                measured = previous + SMOOTHING * (measured - previous)
+            self.rates[mount] = measured
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            temp = self.path + ".tmp"
+            with open(temp, "wt", encoding="utf8") as fd:
+                json.dump(self.rates, fd)
+            os.replace(temp, self.path)
@@ -0,0 +1,594 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Copyright 2020 AlexPDev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+"""
+Torrent file creators that hash their contents with the `HashEngine`.
+
+The classes extend the torrentfile creators and only replace the hashing
+step, so the resulting meta files are identical to the originals.
+"""
+
+import os
+
+from torrentfile import torrent, utils
+
+from torrentfileQt import bencode
+from torrentfileQt.hasher import HashEngine, SharedHashes, file_size
+from torrentfileQt.pipeline import QUEUE_DEPTH
+from torrentfileQt.reader import MMAP
+
+
+def walk_tree(path: str) -> list:
+    """
+    Return file paths in the order they appear in a v2 file tree.
+
+    Parameters
+    ----------
+    path : str
+        path to file or directory.
+
+    Returns
+    -------
+    list
+        file paths.
+    """
+    if os.path.isfile(path):
+        return [path]
+    paths = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            paths.extend(walk_tree(os.path.join(path, name)))
+    return paths
+
+
+def use_scan(scan, path):
+    """
+    Return the directory scan if it matches the content path.
+
+    A matching scan is shared with `torrentfile.utils.filelist_total` so
+    the torrentfile creators don't walk the tree a second time.
+
+    Parameters
+    ----------
+    scan : ScanResult
+        result of a previous directory scan or None.
+    path : str
+        path to the torrent content.
+
+    Returns
+    -------
+    ScanResult
+        the scan or None if it is for a different path.
+    """
+    if scan is None or scan.path != path:
+        return None
+    scan.apply()
+    return scan
+
+
+def is_file(path: str, scan) -> bool:
+    """
+    Return True if the path is a file.
+
+    Parameters
+    ----------
+    path : str
+        path to file or directory.
+    scan : ScanResult
+        result of a previous directory scan or None.
+
+    Returns
+    -------
+    bool
+        True if the path is a file.
+    """
+    if scan is not None:
+        return scan.is_file(path)
+    return os.path.isfile(path)
+
+
+def list_dir(path: str, scan) -> list:
+    """
+    Return the sorted names in a directory.
+
+    Parameters
+    ----------
+    path : str
+        path to directory.
+    scan : ScanResult
+        result of a previous directory scan or None.
+
+    Returns
+    -------
+    list
+        sorted file and directory names.
+    """
+    if scan is not None:
+        return scan.children.get(path, [])
+    if os.path.isdir(path):
+        return sorted(os.listdir(path))
+    return []
+
+
+class MetaWriter:
+    """
+    Write meta files with the streaming bencode encoder.
+
+    Placed before the torrentfile creator in the bases of each creator so
+    it's `write` replaces the one encoding the whole file in memory.
+    """
+
+    def write(self, outfile=None) -> tuple:
+        """
+        Write the meta dictionary to the .torrent file.
+
+        Parameters
+        ----------
+        outfile : str
+            path or directory the torrent file is written to, defaults to
+            the `outfile` given to the creator.
+
+        Returns
+        -------
+        tuple
+            where the torrent file was written and the meta dictionary.
+        """
+        if outfile:
+            self.outfile = outfile
+        if not self.outfile:
+            self.outfile = os.path.join(os.getcwd(), self.name) + ".torrent"
+        if str(self.outfile)[-1] in "\\/":
+            self.outfile = str(self.outfile) + self.name + ".torrent"
+        self.meta = self.sort_meta()
+        bencode.dump(self.meta, self.outfile)
+        return self.outfile, self.meta
+
+
+class TorrentFile(MetaWriter, torrent.TorrentFile):
+    """
+    Bittorrent v1 meta file creator.
+
+    Parameters
+    ----------
+    workers : int
+        number of hashing processes.
+    tracker : object
+        progress tracker passed to the `HashEngine`.
+    reader : str
+        file reader mode passed to the `HashEngine`.
+    cache : HashCache
+        persistent hash cache passed to the `HashEngine`.
+    checkpoint : Checkpoint
+        resumable hashing state passed to the `HashEngine`.
+    scan : ScanResult
+        contents of the path found by `scan_tree`.
+    token : ControlToken
+        pause and cancel requests passed to the `HashEngine`.
+    queue_depth : int
+        read ahead queue depth passed to the `HashEngine`.
+    engine : HashEngine
+        hashes used instead of building an engine, such as the
+        `SharedHashes` of `TorrentFormats`.
+    **kwargs : dict
+        torrent file options.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        tracker=None,
+        reader=MMAP,
+        cache=None,
+        checkpoint=None,
+        scan=None,
+        token=None,
+        queue_depth=QUEUE_DEPTH,
+        engine=None,
+        **kwargs,
+    ):
+        """Construct the v1 creator."""
+        self.scan = use_scan(scan, kwargs.get("path"))
+        sizes = self.scan.sizes if self.scan else None
+        self.engine = engine
+        if engine is None:
+            self.engine = HashEngine(
+                workers,
+                tracker,
+                reader,
+                cache,
+                checkpoint,
+                sizes,
+                token,
+                queue_depth,
+            )
+        super().__init__(**kwargs)
+
+    def assemble(self):
+        """Assemble components of torrent metafile."""
+        info = self.meta["info"]
+        size, filelist = utils.filelist_total(self.path)
+        if os.path.isfile(self.path):
+            info["length"] = size
+        else:
+            info["files"] = []
+            for path in filelist:
+                filesize = file_size(path, self.engine.sizes)
+                info["files"].append(
+                    {
+                        "length": filesize,
+                        "path": os.path.relpath(path, self.path).split(os.sep),
+                    }
+                )
+                if not self.align:
+                    continue
+                if filesize < self.piece_length:
+                    remainder = self.piece_length - filesize
+                else:
+                    remainder = filesize % self.piece_length
+                if remainder:
+                    info["files"].append(
+                        {
+                            "attr": "p",
+                            "length": remainder,
+                            "path": [".pad", str(remainder)],
+                        }
+                    )
+        info["pieces"] = self.engine.hash_v1(
+            filelist, self.piece_length, self.align
+        )
+
+
+class TorrentFileV2(MetaWriter, torrent.TorrentFileV2):
+    """
+    Bittorrent v2 meta file creator.
+
+    Parameters
+    ----------
+    workers : int
+        number of hashing processes.
+    tracker : object
+        progress tracker passed to the `HashEngine`.
+    reader : str
+        file reader mode passed to the `HashEngine`.
+    cache : HashCache
+        persistent hash cache passed to the `HashEngine`.
+    checkpoint : Checkpoint
+        resumable hashing state passed to the `HashEngine`.
+    scan : ScanResult
+        contents of the path found by `scan_tree`.
+    token : ControlToken
+        pause and cancel requests passed to the `HashEngine`.
+    queue_depth : int
+        read ahead queue depth passed to the `HashEngine`.
+    dedupe : bool
+        hash files with identical contents once.
+    engine : HashEngine
+        hashes used instead of building an engine, such as the
+        `SharedHashes` of `TorrentFormats`.
+    **kwargs : dict
+        torrent file options.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        tracker=None,
+        reader=MMAP,
+        cache=None,
+        checkpoint=None,
+        scan=None,
+        token=None,
+        queue_depth=QUEUE_DEPTH,
+        dedupe=False,
+        engine=None,
+        **kwargs,
+    ):
+        """Construct the v2 creator."""
+        self.scan = use_scan(scan, kwargs.get("path"))
+        sizes = self.scan.sizes if self.scan else None
+        self.engine = engine
+        if engine is None:
+            self.engine = HashEngine(
+                workers,
+                tracker,
+                reader,
+                cache,
+                checkpoint,
+                sizes,
+                token,
+                queue_depth,
+                dedupe,
+            )
+        self.results = {}
+        super().__init__(**kwargs)
+
+    def assemble(self):
+        """Hash every file and then assemble the meta dictionary."""
+        if self.scan:
+            paths = self.scan.tree_order()
+        else:
+            paths = walk_tree(self.path)
+        paths = [i for i in paths if file_size(i, self.engine.sizes)]
+        self.results = self.engine.hash_files(paths, self.piece_length)
+        super().assemble()
+
+    def _traverse(self, path: str) -> dict:
+        """
+        Walk directory tree.
+
+        Parameters
+        ----------
+        path : str
+            Path to file or directory.
+        """
+        if is_file(path, self.scan):
+            size = file_size(path, self.engine.sizes)
+            if size == 0:
+                return {"": {"length": size}}
+            fhash = self.results[path]
+            if size > self.piece_length:
+                self.piece_layers[fhash.root] = fhash.piece_layer
+            return {"": {"length": size, "pieces root": fhash.root}}
+        file_tree = {}
+        for name in list_dir(path, self.scan):
+            file_tree[name] = self._traverse(os.path.join(path, name))
+        return file_tree
+
+
+class TorrentFileHybrid(MetaWriter, torrent.TorrentFileHybrid):
+    """
+    Bittorrent v1 and v2 hybrid meta file creator.
+
+    Parameters
+    ----------
+    workers : int
+        number of hashing processes.
+    tracker : object
+        progress tracker passed to the `HashEngine`.
+    reader : str
+        file reader mode passed to the `HashEngine`.
+    cache : HashCache
+        persistent hash cache passed to the `HashEngine`.
+    checkpoint : Checkpoint
+        resumable hashing state passed to the `HashEngine`.
+    scan : ScanResult
+        contents of the path found by `scan_tree`.
+    token : ControlToken
+        pause and cancel requests passed to the `HashEngine`.
+    queue_depth : int
+        read ahead queue depth passed to the `HashEngine`.
+    dedupe : bool
+        hash files with identical contents once.
+    engine : HashEngine
+        hashes used instead of building an engine, such as the
+        `SharedHashes` of `TorrentFormats`.
+    **kwargs : dict
+        torrent file options.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        tracker=None,
+        reader=MMAP,
+        cache=None,
+        checkpoint=None,
+        scan=None,
+        token=None,
+        queue_depth=QUEUE_DEPTH,
+        dedupe=False,
+        engine=None,
+        **kwargs,
+    ):
+        """Construct the hybrid creator."""
+        self.scan = use_scan(scan, kwargs.get("path"))
+        sizes = self.scan.sizes if self.scan else None
+        self.engine = engine
+        if engine is None:
+            self.engine = HashEngine(
+                workers,
+                tracker,
+                reader,
+                cache,
+                checkpoint,
+                sizes,
+                token,
+                queue_depth,
+                dedupe,
+            )
+        self.results = {}
+        super().__init__(**kwargs)
+
+    def assemble(self):
+        """Hash every file and then assemble the meta dictionary."""
+        if self.scan:
+            paths = self.scan.tree_order()
+        else:
+            paths = walk_tree(self.path)
+        paths = [i for i in paths if file_size(i, self.engine.sizes)]
+        self.results = self.engine.hash_files(
+            paths, self.piece_length, hybrid=True
+        )
+        return super().assemble()
+
+    def _traverse(self, path: str) -> dict:
+        """
+        Build meta dictionary while walking directory.
+
+        Parameters
+        ----------
+        path : str
+            Path to target file.
+        """
+        if is_file(path, self.scan):
+            size = file_size(path, self.engine.sizes)
+            self.files.append(
+                {
+                    "length": size,
+                    "path": os.path.relpath(path, self.path).split(os.sep),
+                }
+            )
+            if size == 0:
+                return {"": {"length": size}}
+            file_hash = self.results[path]
+            if size > self.piece_length:
+                self.piece_layers[file_hash.root] = file_hash.piece_layer
+            self.hashes.append(file_hash)
+            self.pieces.extend(file_hash.pieces)
+            if file_hash.padding_file:
+                self.files.append(file_hash.padding_file)
+            return {"": {"length": size, "pieces root": file_hash.root}}
+        tree = {}
+        for name in list_dir(path, self.scan):
+            tree[name] = self._traverse(os.path.join(path, name))
+        return tree
+
+
+FORMATS = {
+    "v1": TorrentFile,
+    "v2": TorrentFileV2,
+    "hybrid": TorrentFileHybrid,
+}
+
+
+def format_outfile(outfile, name: str, version: str) -> str:
+    """
+    Return the path of the torrent file written for one format.
+
+    Parameters
+    ----------
+    outfile : str
+        output path for the torrent, a directory or None for the default.
+    name : str
+        name of the torrent.
+    version : str
+        key of the format in `FORMATS`.
+
+    Returns
+    -------
+    str
+        the output path with the version added before the extension.
+    """
+    if not outfile:
+        outfile = os.path.join(os.getcwd(), name)
+    elif str(outfile)[-1] in "\\/":
+        outfile = str(outfile) + name
+    base = str(outfile)
+    if base.endswith(".torrent"):
+        base = base[: -len(".torrent")]
+    return f"{base}.{version}.torrent"
+
+
+class TorrentFormats:
+    """
+    Create v1, v2 and hybrid meta files from one read of the content.
+
+    The content is scanned and hashed once with `HashEngine.hash_formats`
+    and each of the `FORMATS` creators assembles it's meta file from the
+    shared hashes.  The v2 meta file uses the merkle trees calculated for
+    the hybrid meta file, the v1 meta file has it's own pieces since they
+    aren't padded to the end of each file.
+
+    Parameters
+    ----------
+    workers : int
+        number of hashing processes.
+    tracker : object
+        progress tracker passed to the `HashEngine`.
+    reader : str
+        file reader mode passed to the `HashEngine`.
+    cache : HashCache
+        persistent hash cache the file results are saved to.
+    checkpoint : Checkpoint
+        checked for pause requests, shared hashing isn't resumable.
+    scan : ScanResult
+        contents of the path found by `scan_tree`.
+    token : ControlToken
+        pause and cancel requests passed to the `HashEngine`.
+    queue_depth : int
+        read ahead queue depth passed to the `HashEngine`.
+    **kwargs : dict
+        torrent file options, `outfile` gets the version of each format
+        added before it's extension.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        tracker=None,
+        reader=MMAP,
+        cache=None,
+        checkpoint=None,
+        scan=None,
+        token=None,
+        queue_depth=QUEUE_DEPTH,
+        **kwargs,
+    ):
+        """Hash the content and construct the creator of each format."""
+        path = kwargs.get("path")
+        self.scan = use_scan(scan, path)
+        sizes = self.scan.sizes if self.scan else None
+        self.engine = HashEngine(
+            workers,
+            tracker,
+            reader,
+            cache,
+            checkpoint,
+            sizes,
+            token,
+            queue_depth,
+        )
+        if kwargs.get("piece_length"):
+            self.piece_length = utils.normalize_piece_length(
+                kwargs["piece_length"]
+            )
+        else:
+            self.piece_length = utils.path_piece_length(path)
+        if self.scan:
+            paths = self.scan.file_list()
+        else:
+            paths = utils.filelist_total(path)[1]
+        pieces, files = self.engine.hash_formats(paths, self.piece_length)
+        shared = SharedHashes(self.engine, pieces, files)
+        parent, name = os.path.split(path)
+        name = name if name else os.path.basename(parent)
+        self.torrents = {}
+        for version, creator in FORMATS.items():
+            options = dict(kwargs, piece_length=self.piece_length)
+            options["outfile"] = format_outfile(
+                kwargs.get("outfile"), name, version
+            )
+            self.torrents[version] = creator(
+                scan=self.scan, engine=shared, **options
+            )
+
+    def write(self) -> tuple:
+        """
+        Write the torrent file of every format.
+
+        Returns
+        -------
+        tuple
+            lists of the output paths and the meta dictionaries.
+        """
+        outfiles, metas = [], []
+        for torrent_file in self.torrents.values():
+            outfile, meta = torrent_file.write()
+            outfiles.append(outfile)
+            metas.append(meta)
+        return outfiles, metas
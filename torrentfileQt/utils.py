@@ -310,6 +310,7 @@ class DropGroupBox(QGroupBox):
     """Drag and drop class."""
 
     pathSelected = Signal(str)
+    pathsSelected = Signal(list)
 
     def __init__(self, parent: QWidget = None):
         """
@@ -327,6 +328,7 @@ class DropGroupBox(QGroupBox):
         self._label = QLabel("")
         self._label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self._path = None
+        self.accept_many = False
         self.layout.addWidget(self._label)
         self.hlayout = QHBoxLayout()
         self.layout.addLayout(self.hlayout)
@@ -370,6 +372,13 @@ class DropGroupBox(QGroupBox):
     def dropEvent(self, event: QMouseEvent) -> bool:
         """Drag drop event for widgit."""
         urls = event.mimeData().urls()
+        if self.accept_many and len(urls) > 1:
+            paths = [os.path.normpath(url.toLocalFile()) for url in urls]
+            paths = [path for path in paths if os.path.exists(path)]
+            if paths:
+                self.pathsSelected.emit(paths)
+                return True
+            return False
         path = urls[0].toLocalFile()
         if os.path.exists(path):
             path = os.path.normpath(path)
@@ -237,6 +237,12 @@ class Window(QMainWindow):
         super().resizeEvent(event)
         self.updateGrips()
 
+    def closeEvent(self, event):
+        """Stop running hashing threads before the window closes."""
+        self.tabs.createWidget.shutdown()
+        self.tabs.checkWidget.treeWidget.stop()
+        super().closeEvent(event)
+
 
 class TabWidget(QWidget):
     """Qt Widget subclass for the tab widget."""